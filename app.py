@@ -81,6 +81,11 @@ def run_server(port: int = None):
         browser_thread.daemon = True
         browser_thread.start()
         
+        # Keep the leaderboard materialized view fresh off the request path
+        from src.services.leaderboard_refresh_service import leaderboard_refresh_service
+        if leaderboard_refresh_service:
+            leaderboard_refresh_service.start()
+        
         # Start server
         server.serve_forever()
         
@@ -23,9 +23,16 @@ class Config:
     SUPABASE_URL = os.getenv('SUPABASE_URL', '')
     SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY', '')
     SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY', '')
+    # Optional direct Postgres DSN (Supabase connection pooler) for high-volume writes
+    SUPABASE_DB_URL = os.getenv('SUPABASE_DB_URL', '')
+    # Optional Redis (requires the `redis` package) shared by instances for hot caches
+    REDIS_URL = os.getenv('REDIS_URL', '')
     
     # API Configuration
     ETHERSCAN_API_KEY = os.getenv('ETHERSCAN_API_KEY', '')
+    # Requests/sec across all Etherscan calls in the process, which share one limiter
+    # (the API key's free tier caps at 5 req/s)
+    ETHERSCAN_RPS = float(os.getenv('ETHERSCAN_RPS', '4'))
     ALCHEMY_API_KEY = os.getenv('ALCHEMY_API_KEY', '')
     ETH_RPC_URL = os.getenv('ETH_RPC_URL', f'https://eth-mainnet.g.alchemy.com/v2/{os.getenv("ALCHEMY_API_KEY", "")}')
     # 0x Swap API key (optional for higher rate limits)
@@ -48,11 +55,17 @@ class Config:
     SMART_MONEY_DISCOVERY_TIME_BUDGET_SEC = int(os.getenv('SMART_MONEY_DISCOVERY_TIME_BUDGET_SEC', '60'))
     SMART_MONEY_REQUEST_TIMEOUT_SEC = float(os.getenv('SMART_MONEY_REQUEST_TIMEOUT_SEC', '5'))
     SMART_MONEY_DISABLE_NETWORK = os.getenv('SMART_MONEY_DISABLE_NETWORK', '0') in ('1', 'true', 'True')
+    # Concurrent Etherscan scans; paced by the process-wide limiter (ETHERSCAN_RPS)
+    SMART_MONEY_SCAN_WORKERS = int(os.getenv('SMART_MONEY_SCAN_WORKERS', '4'))
+    # Log each discovered DEX tx to dex_interactions (pricing and coverage read them); when off,
+    # discovery only merges per-address aggregates into address_activity
+    SMART_MONEY_LOG_INTERACTIONS = os.getenv('SMART_MONEY_LOG_INTERACTIONS', '1') in ('1', 'true', 'True')
 
     # Backfill controls
     SMART_MONEY_BACKFILL_REQUEST_TIMEOUT_SEC = float(os.getenv('SMART_MONEY_BACKFILL_REQUEST_TIMEOUT_SEC', '8'))
     SMART_MONEY_BACKFILL_MAX_TX = int(os.getenv('SMART_MONEY_BACKFILL_MAX_TX', '2500'))  # per-address cap
     SMART_MONEY_BACKFILL_TIME_BUDGET_SEC = int(os.getenv('SMART_MONEY_BACKFILL_TIME_BUDGET_SEC', '120'))
+    SMART_MONEY_LEADERBOARD_REFRESH_MIN = int(os.getenv('SMART_MONEY_LEADERBOARD_REFRESH_MIN', '5'))
     
     # Caching
     WHALE_CACHE_DURATION_MINUTES = 5
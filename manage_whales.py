@@ -26,6 +26,7 @@ def add_whale(address: str, label: str, entity_type: str = "Unknown", category:
         )
         
         if success:
+            whale_repository.refresh_top_whales()
             print(f"✅ Added whale: {label} ({address})")
         else:
             print(f"⚠️  Whale may already exist: {address}")
@@ -89,6 +90,8 @@ def import_from_json(filename: str):
                 failed += 1
                 print(f"❌ Error: {e}")
         
+        if successful:
+            whale_repository.refresh_top_whales()
         print(f"\n📊 Import complete: {successful} added, {failed} failed/skipped")
         return successful > 0
         
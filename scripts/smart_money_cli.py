@@ -19,7 +19,7 @@ from config import config
 from src.services.smart_money_discovery import smart_money_discovery
 from src.services.ens_service import ens_service
 from src.data.smart_money_repository import smart_money_repository
-from src.services.pricing_service import pricing_service
+from src.services.pricing_service import get_pricing_service
 from src.services.metrics_service import metrics_service
 from src.services.smart_money_discovery import smart_money_discovery
 
@@ -188,6 +188,7 @@ def cmd_backfill(args: argparse.Namespace):
 def cmd_price(args: argparse.Namespace):
     """Price trades for addresses and update coverage (D-019 skeleton)."""
     require_repo()
+    pricing_service = get_pricing_service()
     if not pricing_service:
         print("❌ Pricing service not available")
         return
@@ -284,6 +285,9 @@ def cmd_metrics(args: argparse.Namespace):
     started = time.time()
     for i, addr in enumerate(addresses, 1):
         m = metrics_service.compute_for_address(addr, days=args.days)
+        if not m:
+            print(f"  ⚠️  Skipping invalid address: {addr}")
+            continue
         if not args.quiet:
             print(f"  ✓ {addr[:10]}... metrics: pnl={m.get('pnl_usd_90d')} win={m.get('win_rate')} sharpe={m.get('sharpe_90d')} cov={m.get('coverage_pct')}%")
         if i % 25 == 0:
@@ -331,6 +335,7 @@ def cmd_refresh(args: argparse.Namespace):
     3) Backfill address_activity (dex swaps, last_activity_at) (lookback: --activity-days)
     """
     require_repo()
+    pricing_service = get_pricing_service()
     if not pricing_service or not metrics_service or not smart_money_discovery:
         print("❌ Required services not available")
         return
@@ -394,12 +399,8 @@ def cmd_refresh(args: argparse.Namespace):
 
     # 3) Metrics
     print(f"📈 Metrics step: window={args.metrics_days}d")
-    for i, addr in enumerate(addresses, 1):
-        _ = metrics_service.compute_for_address(addr, days=args.metrics_days)
-        if not args.quiet and i % 25 == 0:
-            print(f"   {i}/{total} metrics updated")
-        time.sleep(0.05)
-    print("   ✔ metrics updated")
+    _ = metrics_service.compute_for_addresses(addresses, days=args.metrics_days)
+    print(f"   ✔ metrics updated for {total} addresses")
 
     # 4) Activity backfill (populate last_activity_at / counts summaries)
     print(f"📒 Activity step: window={args.activity_days}d")
@@ -545,14 +546,11 @@ def build_parser() -> argparse.ArgumentParser:
             print("ℹ️  No addresses to resolve")
             return
         print(f"🔎 Resolving ENS for {len(addrs)} addresses...")
-        for i, a in enumerate(addrs, 1):
-            name = ens_service.resolve(a, force=bool(args.force))
-            if name:
-                print(f"  ✓ {a[:10]}... → {name}")
-            elif i % 25 == 0:
-                print(f"   {i}/{len(addrs)}...")
-            time.sleep(0.05)
-        print("✅ ENS resolution complete")
+        names = ens_service.resolve_bulk(addrs, force=bool(args.force))
+        for a in addrs:
+            if names.get(a):
+                print(f"  ✓ {a[:10]}... → {names[a]}")
+        print(f"✅ ENS resolution complete ({sum(1 for n in names.values() if n)}/{len(addrs)} named)")
     sp.set_defaults(func=_cmd_ens)
 
     return p
@@ -16,7 +16,7 @@ from src.services.whale_scanner_service import whale_scanner_service
 from src.data.whale_repository import whale_repository
 from src.data.smart_money_repository import smart_money_repository
 from src.data.supabase_client import supabase_client
-from src.services.pricing_service import pricing_service
+from src.services.pricing_service import get_pricing_service
 from src.services.metrics_service import metrics_service
 from src.services.smart_money_discovery import smart_money_discovery
 import os
@@ -178,7 +178,8 @@ class WhaleAPIHandler(BaseHTTPRequestHandler):
                 min_coverage=min_coverage,
                 min_priced_trades=min_priced_trades
             )
-        self.send_json_response({'items': data, 'count': len(data), 'limit': limit, **meta})
+        items = [row.to_dict() for row in data]
+        self.send_json_response({'items': items, 'count': len(items), 'limit': limit, **meta})
     
     def serve_health(self):
         """Health check endpoint for monitoring and debugging"""
@@ -395,24 +396,17 @@ class WhaleAPIHandler(BaseHTTPRequestHandler):
 
         try:
             client = supabase_client.get_client()
-            # Strict
-            s = client.table('smart_money_candidates').select('id', count='exact') \
-                .gte('priced_trades_count', strict_trades) \
-                .gte('coverage_pct', strict_cov).execute()
-            # Loose
-            l = client.table('smart_money_candidates').select('id', count='exact') \
-                .gte('priced_trades_count', loose_trades) \
-                .gte('coverage_pct', loose_cov).execute()
-            # Watchlist strict
-            ws = client.table('smart_money_candidates').select('id', count='exact') \
-                .eq('qualifies_smart_money', True) \
-                .gte('priced_trades_count', strict_trades) \
-                .gte('coverage_pct', strict_cov).execute()
+            # Strict, loose and watchlist-strict counts in one pass (see candidate_gate_counts())
+            res = client.rpc('candidate_gate_counts', {
+                'strict_trades': strict_trades, 'strict_cov': strict_cov,
+                'loose_trades': loose_trades, 'loose_cov': loose_cov,
+            }).execute()
+            row = (res.data or [{}])[0]
 
             self.send_json_response({
-                'qualified_strict': s.count or 0,
-                'qualified_loose': l.count or 0,
-                'watchlist_strict': ws.count or 0,
+                'qualified_strict': row.get('qualified_strict') or 0,
+                'qualified_loose': row.get('qualified_loose') or 0,
+                'watchlist_strict': row.get('watchlist_strict') or 0,
                 'strict_trades': strict_trades,
                 'strict_cov': strict_cov,
                 'loose_trades': loose_trades,
@@ -431,6 +425,7 @@ class WhaleAPIHandler(BaseHTTPRequestHandler):
             return
 
         # Preconditions
+        pricing_service = get_pricing_service()
         if not (smart_money_repository and pricing_service and metrics_service and smart_money_discovery):
             self.send_json_response({'error': 'Services unavailable'}, status=503)
             return
@@ -521,10 +516,7 @@ class WhaleAPIHandler(BaseHTTPRequestHandler):
             summary['checked'] = checked
 
             # 3) Metrics
-            for i, addr in enumerate(addresses, 1):
-                _ = metrics_service.compute_for_address(addr, days=metrics_days)
-                if i % 25 == 0:
-                    time.sleep(0.03)
+            _ = metrics_service.compute_for_addresses(addresses, days=metrics_days)
 
             # 4) Activity rollup
             for i, addr in enumerate(addresses, 1):
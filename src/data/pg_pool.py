@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Direct Postgres Pool
+Optional psycopg2 connection pool for high-volume writes when SUPABASE_DB_URL is set.
+PostgREST (supabase_client) remains the default path for everything else.
+"""
+
+from contextlib import contextmanager
+from typing import List, Sequence
+from config import config
+
+try:
+    from psycopg2.pool import ThreadedConnectionPool
+    from psycopg2.extras import execute_values, Json
+except ImportError:  # psycopg2 is optional at runtime
+    ThreadedConnectionPool = None
+    execute_values = None
+    Json = None
+
+
+class PgPool:
+    """Thread-safe pool of direct Postgres connections"""
+
+    def __init__(self, dsn: str, minconn: int = 1, maxconn: int = 20):
+        self._pool = ThreadedConnectionPool(minconn, maxconn, dsn=dsn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success, rolls back on error."""
+        conn = self._pool.getconn()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.putconn(conn)
+
+    def execute_values(self, sql: str, rows: List[Sequence], page_size: int = 500) -> int:
+        """Run one multi-row statement (`VALUES %s`) in a single transaction; returns rows sent."""
+        if not rows:
+            return 0
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                execute_values(cur, sql, rows, page_size=page_size)
+        return len(rows)
+
+
+def _create_pool():
+    if not config.SUPABASE_DB_URL or ThreadedConnectionPool is None:
+        return None
+    try:
+        return PgPool(config.SUPABASE_DB_URL)
+    except Exception as e:
+        print(f"⚠️  Direct Postgres pool unavailable, using PostgREST only: {e}")
+        return None
+
+
+# Create singleton instance
+pg_pool = _create_pool()
@@ -4,9 +4,172 @@ Smart Money Repository
 Database operations for smart money discovery and tracking
 """
 
-from typing import List, Dict, Optional
-from datetime import datetime
+import atexit
+import queue
+import threading
+import time
+from dataclasses import dataclass, asdict, fields
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from cachetools import TTLCache
 from .supabase_client import supabase_client
+from .pg_pool import pg_pool, Json
+from ..utils.logging_utils import get_rate_limited_logger
+
+log = get_rate_limited_logger(__name__)
+
+# Max values per in_() filter; keeps PostgREST GET URLs well under server limits
+IN_CHUNK_SIZE = 100
+# PostgREST default max-rows per response
+PAGE_SIZE = 1000
+# Rows per insert request for historical backfills
+BACKFILL_CHUNK_SIZE = 500
+
+
+def _chunk(lst: List, n: int = IN_CHUNK_SIZE) -> List[List]:
+    """Split a list into consecutive slices of at most n items."""
+    return [lst[i:i + n] for i in range(0, len(lst), n)]
+
+
+def _has_usd_leg(trade: Dict) -> bool:
+    """False for priced_trades rows with neither usd_in nor usd_out; metrics skip those."""
+    return trade.get('usd_in') is not None or trade.get('usd_out') is not None
+
+
+@dataclass(slots=True)
+class LeaderboardRow:
+    """One leaderboard/watchlist entry as read from sm_leaderboard()."""
+    address: str
+    status: str = 'candidate'
+    dex_swaps_90d: int = 0
+    unique_protocols_90d: Optional[int] = None
+    last_activity_at: Optional[str] = None
+    total_gas_spent_eth: Optional[float] = None
+    sharpe_ratio: Optional[float] = None
+    win_rate: Optional[float] = None
+    pnl_usd_90d: Optional[float] = None
+    volume_90d_usd: Optional[float] = None
+    coverage_pct: Optional[float] = None
+    priced_trades_count: Optional[int] = None
+    confidence_score: Optional[float] = None
+    qualifies_smart_money: Optional[bool] = None
+    last_evaluated_at: Optional[str] = None
+    ens: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'LeaderboardRow':
+        return cls(**{name: row[name] for name in _LEADERBOARD_FIELDS if row.get(name) is not None})
+
+    def to_dict(self) -> Dict:
+        """Serialize for the API; ens/pnl are omitted when unknown, as before."""
+        out = asdict(self)
+        for col in ('ens', 'pnl_usd_90d'):
+            if out[col] is None:
+                del out[col]
+        return out
+
+
+_LEADERBOARD_FIELDS = tuple(f.name for f in fields(LeaderboardRow))
+
+
+class _UpsertBuffer:
+    """Accumulate per-tx rows and upsert them in one request per flush.
+
+    Flushes when max_rows are buffered or the oldest row is max_age_sec old
+    (checked on add); callers flush() at the end of a batch. Rows are keyed by
+    the conflict column(s) so a batch never touches the same row twice.
+    """
+
+    def __init__(self, client, table: str, on_conflict: str,
+                 max_rows: int = BACKFILL_CHUNK_SIZE, max_age_sec: float = 0.1):
+        self.client = client
+        self.table = table
+        self.on_conflict = on_conflict
+        self._key_columns = tuple(c.strip() for c in on_conflict.split(','))
+        self.max_rows = max_rows
+        self.max_age_sec = max_age_sec
+        self._rows: Dict[Tuple, Dict] = {}
+        self._first_at = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, row: Dict) -> int:
+        """Buffer a row; returns the number of rows written if this triggered a flush."""
+        with self._lock:
+            if not self._rows:
+                self._first_at = time.monotonic()
+            self._rows[tuple(row[c] for c in self._key_columns)] = row
+            due = len(self._rows) >= self.max_rows or time.monotonic() - self._first_at >= self.max_age_sec
+        return self.flush() if due else 0
+
+    def flush(self) -> int:
+        """Write all buffered rows; returns how many were written."""
+        with self._lock:
+            rows, self._rows = list(self._rows.values()), {}
+        if not rows:
+            return 0
+        try:
+            self.client.table(self.table).upsert(rows, on_conflict=self.on_conflict, returning='minimal').execute()
+            return len(rows)
+        except Exception as e:
+            log.warning("Error flushing %s buffer (%d rows): %s", self.table, len(rows), e)
+            return 0
+
+
+class _BackgroundWriter:
+    """Fire-and-forget upserts drained by a daemon thread in batches.
+
+    put() only blocks when maxsize rows are pending (backpressure). Pending rows
+    are drained at interpreter exit so short-lived CLI runs don't drop writes.
+    """
+
+    def __init__(self, client, maxsize: int = 10_000, batch_size: int = BACKFILL_CHUNK_SIZE):
+        self.client = client
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def put(self, table: str, on_conflict: str, row: Dict) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._drain, name='repo-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self._queue.join)
+        self._queue.put((table, on_conflict, row))
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                log.warning("Error writing queued batch (%d rows): %s", len(batch), e)
+            finally:
+                # Always settle the batch so the atexit join() can't hang
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: List[Tuple[str, str, Dict]]):
+        # One upsert per (table, conflict key); last write per key wins
+        groups: Dict[Tuple[str, str], Dict] = {}
+        for table, key, row in batch:
+            try:
+                groups.setdefault((table, key), {})[row[key]] = row
+            except (KeyError, TypeError) as e:
+                log.warning("Skipping queued %s row without conflict key %s: %s", table, key, e)
+        for (table, key), rows in groups.items():
+            try:
+                self.client.table(table).upsert(list(rows.values()), on_conflict=key, returning='minimal').execute()
+            except Exception as e:
+                log.warning("Error writing queued %s rows (%d): %s", table, len(rows), e)
+
 
 class SmartMoneyRepository:
     """Repository for smart money data operations"""
@@ -15,7 +178,58 @@ class SmartMoneyRepository:
         if not supabase_client:
             raise ValueError("Supabase client not initialized")
         self.client = supabase_client.get_client()
+        # Hot token prices keyed by (address, ts_bucket); positive hits only
+        self._price_cache = TTLCache(maxsize=200_000, ttl=600)
+        # Per-tx priced trades are batched into one upsert per flush
+        self._priced_trades_buffer = _UpsertBuffer(self.client, 'priced_trades', 'tx_hash')
+        # Each price follows a slow 0x fetch, so allow a longer age before flushing
+        self._token_prices_buffer = _UpsertBuffer(self.client, 'token_prices', 'address,ts_bucket', max_age_sec=5.0)
+        # Low-priority writes (activity rollups) leave the caller's critical path
+        self._writer = _BackgroundWriter(self.client)
     
+    def _select_in(self, table: str, columns: str, values: List[str], column: str = 'address',
+                   filters: Dict = None, gte: Dict = None, order: str = None,
+                   tiebreak: str = 'id') -> List[Dict]:
+        """Select rows where `column` is in `values`, chunked and fetched in parallel.
+
+        `filters` are equality filters, `gte` lower bounds. With `order` (desc), each
+        chunk is paged by PAGE_SIZE so many-rows-per-value tables aren't truncated
+        at the PostgREST max-rows cap; `tiebreak` must be a unique column so rows
+        sharing an `order` value keep a stable position across pages.
+        """
+        chunks = _chunk(list(values))
+        if not chunks:
+            return []
+
+        def build(chunk: List[str]):
+            # Builders accumulate params, so each request gets a fresh one
+            query = self.client.table(table).select(columns)
+            for key, val in (filters or {}).items():
+                query = query.eq(key, val)
+            for key, val in (gte or {}).items():
+                query = query.gte(key, val)
+            return query.in_(column, chunk)
+
+        def fetch(chunk: List[str]) -> List[Dict]:
+            if not order:
+                return build(chunk).execute().data or []
+            rows: List[Dict] = []
+            # One combined order param ("block_ts.desc,id.desc"): chained .order() calls
+            # emit repeated params on older postgrest-py
+            order_by = f'{order}.desc,{tiebreak}'
+            while True:
+                page = build(chunk).order(order_by, desc=True).range(
+                    len(rows), len(rows) + PAGE_SIZE - 1
+                ).execute().data or []
+                rows.extend(page)
+                if len(page) < PAGE_SIZE:
+                    return rows
+
+        if len(chunks) == 1:
+            return fetch(chunks[0])
+        with ThreadPoolExecutor(max_workers=min(8, len(chunks))) as executor:
+            return [row for rows in executor.map(fetch, chunks) for row in rows]
+
     # DEX Router Management
     def get_dex_routers(self, active_only: bool = True) -> List[Dict]:
         """Get all DEX router addresses from database"""
@@ -26,7 +240,7 @@ class SmartMoneyRepository:
             result = query.execute()
             return result.data
         except Exception as e:
-            print(f"Error getting DEX routers: {e}")
+            log.warning("Error getting DEX routers: %s", e)
             return []
     
     def add_dex_router(self, address: str, name: str, version: str = None) -> bool:
@@ -41,7 +255,7 @@ class SmartMoneyRepository:
             result = self.client.table('dex_routers').insert(data).execute()
             return len(result.data) > 0
         except Exception as e:
-            print(f"Error adding DEX router: {e}")
+            log.warning("Error adding DEX router: %s", e)
             return False
     
     # CEX Address Management
@@ -54,7 +268,7 @@ class SmartMoneyRepository:
             result = query.execute()
             return result.data
         except Exception as e:
-            print(f"Error getting CEX addresses: {e}")
+            log.warning("Error getting CEX addresses: %s", e)
             return []
     
     def add_cex_address(self, address: str, exchange_name: str, address_type: str = 'hot_wallet') -> bool:
@@ -69,7 +283,7 @@ class SmartMoneyRepository:
             result = self.client.table('cex_addresses').insert(data).execute()
             return len(result.data) > 0
         except Exception as e:
-            print(f"Error adding CEX address: {e}")
+            log.warning("Error adding CEX address: %s", e)
             return False
     
     # Contract Exclusion Management
@@ -79,7 +293,7 @@ class SmartMoneyRepository:
             result = self.client.table('known_contracts').select('address').eq('should_exclude', True).execute()
             return [row['address'] for row in result.data]
         except Exception as e:
-            print(f"Error getting excluded contracts: {e}")
+            log.warning("Error getting excluded contracts: %s", e)
             return []
     
     def add_known_contract(self, address: str, contract_type: str, name: str = None, should_exclude: bool = True) -> bool:
@@ -94,25 +308,28 @@ class SmartMoneyRepository:
             result = self.client.table('known_contracts').insert(data).execute()
             return len(result.data) > 0
         except Exception as e:
-            print(f"Error adding known contract: {e}")
+            log.warning("Error adding known contract: %s", e)
             return False
     
     # Address Activity Tracking
+    @staticmethod
+    def _activity_row(address: str, activity_data: Dict) -> Dict:
+        return {
+            'address': address.lower(),
+            'dex_swap_count': activity_data.get('dex_swap_count', 0),
+            'unique_protocols': activity_data.get('unique_protocols', 0),
+            'total_gas_spent_eth': activity_data.get('total_gas_spent_eth', 0),
+            'first_seen_at': activity_data.get('first_seen_at'),
+            'last_activity_at': activity_data.get('last_activity_at'),
+            'withdrew_from_cex': activity_data.get('withdrew_from_cex', False),
+            'uses_defi': activity_data.get('uses_defi', False),
+            'is_contract': activity_data.get('is_contract', False)
+        }
+
     def update_address_activity(self, address: str, activity_data: Dict) -> bool:
         """Update or insert address activity metrics"""
         try:
-            data = {
-                'address': address.lower(),
-                'dex_swap_count': activity_data.get('dex_swap_count', 0),
-                'unique_protocols': activity_data.get('unique_protocols', 0),
-                'total_gas_spent_eth': activity_data.get('total_gas_spent_eth', 0),
-                'first_seen_at': activity_data.get('first_seen_at'),
-                'last_activity_at': activity_data.get('last_activity_at'),
-                'withdrew_from_cex': activity_data.get('withdrew_from_cex', False),
-                'uses_defi': activity_data.get('uses_defi', False),
-                'is_contract': activity_data.get('is_contract', False),
-                'updated_at': datetime.utcnow().isoformat()
-            }
+            data = self._activity_row(address, activity_data)
             
             result = self.client.table('address_activity').upsert(
                 data,
@@ -120,18 +337,44 @@ class SmartMoneyRepository:
             ).execute()
             return len(result.data) > 0
         except Exception as e:
-            print(f"Error updating address activity: {e}")
+            log.warning("Error updating address activity: %s", e)
             return False
     
+    def queue_address_activity(self, address: str, activity_data: Dict) -> None:
+        """Queue an activity upsert for the background writer; returns immediately."""
+        self._writer.put('address_activity', 'address', self._activity_row(address, activity_data))
+
     def get_address_activity(self, address: str) -> Optional[Dict]:
         """Get activity metrics for an address"""
         try:
             result = self.client.table('address_activity').select('*').eq('address', address.lower()).execute()
             return result.data[0] if result.data else None
         except Exception as e:
-            print(f"Error getting address activity: {e}")
+            log.warning("Error getting address activity: %s", e)
             return None
     
+    def upsert_address_activity_bulk(self, rows: List[Dict]) -> int:
+        """Merge per-run aggregates (address, dex_swaps, protocols, gas_eth, first_ts, last_ts;
+        epochs) into address_activity via merge_address_activity(); returns rows merged.
+        Counts are added, so rows must only cover txs newer than the stored last_activity_at."""
+        merged = 0
+        for chunk in _chunk(rows, BACKFILL_CHUNK_SIZE):
+            try:
+                res = self.client.rpc('merge_address_activity', {'p_rows': chunk}).execute()
+                merged += int(res.data or 0)
+            except Exception as e:
+                log.warning("Error merging address activity (%d rows): %s", len(chunk), e)
+        return merged
+
+    def get_address_activity_bulk(self, addresses: List[str]) -> Dict[str, Dict]:
+        """Activity rows for many addresses, keyed by lowercased address"""
+        try:
+            rows = self._select_in('address_activity', '*', [a.lower() for a in addresses])
+            return {r['address']: r for r in rows}
+        except Exception as e:
+            log.warning("Error getting address activity in bulk: %s", e)
+            return {}
+
     # DEX Interaction Logging
     def log_dex_interaction(self, address: str, router_address: str, tx_data: Dict) -> bool:
         """Log a DEX interaction with idempotency on tx_hash."""
@@ -155,10 +398,101 @@ class SmartMoneyRepository:
             # Treat duplicate key as benign
             msg = str(e)
             if 'duplicate key value violates unique constraint' in msg or '23505' in msg:
+                log.debug("Duplicate DEX interaction tx=%s", tx_data.get('tx_hash'))
                 return True
-            print(f"Error logging DEX interaction: {e}")
+            log.warning("Error logging DEX interaction tx=%s: %s", tx_data.get('tx_hash'), e)
             return False
     
+    def _backfill_insert(self, table: str, rows: List[Dict], on_conflict: str = 'tx_hash') -> int:
+        """Insert-only bulk write for backfills; existing rows are skipped, not updated."""
+        written = 0
+        for chunk in _chunk(rows, BACKFILL_CHUNK_SIZE):
+            try:
+                self.client.table(table).upsert(
+                    chunk,
+                    on_conflict=on_conflict,
+                    ignore_duplicates=True,
+                    returning='minimal'
+                ).execute()
+                written += len(chunk)
+            except Exception as e:
+                log.warning("Error backfilling %s (%d rows): %s", table, len(chunk), e)
+        return written
+
+    def backfill_dex_interactions(self, rows: List[Dict]) -> int:
+        """Bulk insert historical DEX interactions (ON CONFLICT DO NOTHING on tx_hash)."""
+        data = [{
+            'address': r['address'].lower(),
+            'router_address': r['router_address'].lower(),
+            'tx_hash': r.get('tx_hash'),
+            'block_number': r.get('block_number'),
+            'timestamp': r.get('timestamp'),
+            'gas_spent_eth': r.get('gas_spent_eth', 0)
+        } for r in rows if r.get('tx_hash')]
+        written = self._backfill_insert('dex_interactions', data)
+        self.refresh_address_activity({d['address'] for d in data})
+        return written
+
+    def log_dex_interactions_bulk(self, rows: List[Dict]) -> int:
+        """Log many DEX interactions (same dicts as log_dex_interaction plus address/router_address)
+        in one statement; existing tx_hashes are skipped. Returns rows written."""
+        data = [{
+            'address': r['address'].lower(),
+            'router_address': r['router_address'].lower(),
+            'tx_hash': r.get('tx_hash'),
+            'block_number': r.get('block_number'),
+            'timestamp': r.get('timestamp'),
+            'gas_spent_eth': r.get('gas_spent_eth', 0)
+        } for r in rows if r.get('tx_hash')]
+        if not data:
+            return 0
+        written = None
+        if pg_pool:
+            try:
+                written = pg_pool.execute_values(
+                    "insert into public.dex_interactions (address, router_address, tx_hash, block_number,"
+                    " timestamp, gas_spent_eth) values %s on conflict (tx_hash) do nothing",
+                    [(d['address'], d['router_address'], d['tx_hash'], d['block_number'],
+                      d['timestamp'], d['gas_spent_eth']) for d in data]
+                )
+            except Exception as e:
+                log.warning("Direct insert of DEX interactions failed, using PostgREST: %s", e)
+        if written is None:
+            written = self._backfill_insert('dex_interactions', data)
+        self.refresh_address_activity({d['address'] for d in data})
+        return written
+
+    def refresh_address_activity(self, addresses, days: int = 90) -> int:
+        """Recompute address_activity aggregates server-side for addresses just written to
+        dex_interactions (refresh_address_activity()); returns rows refreshed."""
+        if not addresses:
+            return 0
+        try:
+            res = self.client.rpc('refresh_address_activity', {
+                'p_addresses': list(addresses), 'p_days': days
+            }).execute()
+            return int(res.data or 0)
+        except Exception as e:
+            log.warning("Error refreshing address activity: %s", e)
+            return 0
+
+    def get_address_aggregates(self, address: str, days: int = 90) -> Optional[Dict]:
+        """Swap count, distinct routers, gas and first/last activity over the last N days,
+        aggregated server-side (dex_activity_aggregates()); None on error."""
+        try:
+            res = self.client.rpc('dex_activity_aggregates', {'p_address': address.lower(), 'p_days': days}).execute()
+            row = (res.data or [{}])[0]
+            return {
+                'dex_swap_count': int(row.get('dex_swap_count') or 0),
+                'unique_protocols': int(row.get('unique_protocols') or 0),
+                'total_gas_spent_eth': float(row.get('total_gas_spent_eth') or 0),
+                'first_seen_at': row.get('first_seen_at'),
+                'last_activity_at': row.get('last_activity_at'),
+            }
+        except Exception as e:
+            log.warning("Error getting DEX activity aggregates: %s", e)
+            return None
+
     def get_dex_interactions(self, address: str, days: int = 90) -> List[Dict]:
         """Get DEX interactions for an address in the last N days"""
         try:
@@ -171,7 +505,7 @@ class SmartMoneyRepository:
             
             return result.data
         except Exception as e:
-            print(f"Error getting DEX interactions: {e}")
+            log.warning("Error getting DEX interactions: %s", e)
             return []
 
     # Pricing Schema (D-019.1)
@@ -181,27 +515,73 @@ class SmartMoneyRepository:
             res = self.client.table('tx_receipts_cache').select('*').eq('tx_hash', tx_hash).limit(1).execute()
             return res.data[0] if res.data else None
         except Exception as e:
-            print(f"Error fetching cached receipt: {e}")
+            log.warning("Error fetching cached receipt: %s", e)
             return None
 
+    def get_cached_receipts_bulk(self, tx_hashes: List[str], columns: str = '*') -> Dict[str, Dict]:
+        """tx_hash -> cached receipt row for every hash present in tx_receipts_cache."""
+        try:
+            rows = self._select_in('tx_receipts_cache', columns, list(dict.fromkeys(tx_hashes)), column='tx_hash')
+            return {r['tx_hash']: r for r in rows}
+        except Exception as e:
+            log.warning("Error fetching cached receipts: %s", e)
+            return {}
+
+    @staticmethod
+    def _receipt_row(tx_hash: str, block_ts: str, status: int, logs_json: Dict, meta: Dict = None) -> Dict:
+        return {
+            'tx_hash': tx_hash,
+            'block_ts': block_ts,
+            'status': status,
+            'logs_json': logs_json,
+            'block_number': (meta or {}).get('block_number'),
+            'from_address': (meta or {}).get('from_address'),
+            'to_address': (meta or {}).get('to_address'),
+            'value_wei': (meta or {}).get('value_wei'),
+        }
+
     def upsert_receipt_cache(self, tx_hash: str, block_ts: str, status: int, logs_json: Dict, meta: Dict = None) -> bool:
         try:
-            data = {
-                'tx_hash': tx_hash,
-                'block_ts': block_ts,
-                'status': status,
-                'logs_json': logs_json,
-                'block_number': (meta or {}).get('block_number'),
-                'from_address': (meta or {}).get('from_address'),
-                'to_address': (meta or {}).get('to_address'),
-                'fetched_at': datetime.utcnow().isoformat(),
-            }
+            data = self._receipt_row(tx_hash, block_ts, status, logs_json, meta)
             self.client.table('tx_receipts_cache').upsert(data, on_conflict='tx_hash').execute()
             return True
         except Exception as e:
-            print(f"Error upserting receipt cache: {e}")
+            log.warning("Error upserting receipt cache: %s", e)
             return False
 
+    def upsert_receipt_cache_bulk(self, rows: List[Dict]) -> int:
+        """Upsert many tx_receipts_cache rows (see _receipt_row) in chunked requests."""
+        written = 0
+        for i in range(0, len(rows), BACKFILL_CHUNK_SIZE):
+            chunk = rows[i:i + BACKFILL_CHUNK_SIZE]
+            try:
+                self.client.table('tx_receipts_cache').upsert(
+                    chunk, on_conflict='tx_hash', returning='minimal'
+                ).execute()
+                written += len(chunk)
+            except Exception as e:
+                log.warning("Error upserting receipt cache batch: %s", e)
+        return written
+
+    def get_receipt_transfers_bulk(self, tx_hashes: List[str]) -> Dict[str, List[Dict]]:
+        """tx_hash -> decoded Transfer rows (log_index order) for hashes that have any."""
+        out: Dict[str, List[Dict]] = {}
+        try:
+            rows = self._select_in(
+                'receipt_transfers', 'tx_hash,log_index,token,from_addr,to_addr,amount_wei',
+                list(dict.fromkeys(tx_hashes)), column='tx_hash'
+            )
+        except Exception as e:
+            log.warning("Error fetching receipt transfers: %s", e)
+            return out
+        for r in sorted(rows, key=lambda r: r['log_index']):
+            out.setdefault(r['tx_hash'], []).append(r)
+        return out
+
+    def save_receipt_transfers(self, rows: List[Dict]) -> int:
+        """Insert decoded Transfer rows; rows already stored for a (tx_hash, log_index) are kept."""
+        return self._backfill_insert('receipt_transfers', rows, on_conflict='tx_hash,log_index')
+
     # priced_trades helpers
     def upsert_priced_trade(self, trade: Dict) -> bool:
         try:
@@ -213,10 +593,21 @@ class SmartMoneyRepository:
         except Exception as e:
             # Ignore duplicate unique violations
             if 'duplicate key' in str(e) or '23505' in str(e):
+                log.debug("Duplicate priced trade tx=%s", trade.get('tx_hash'))
                 return True
-            print(f"Error upserting priced trade: {e}")
+            log.warning("Error upserting priced trade tx=%s: %s", trade.get('tx_hash'), e)
             return False
 
+    def queue_priced_trade(self, trade: Dict) -> int:
+        """Buffer a priced trade for batched upsert; returns rows written by any triggered flush."""
+        if not trade.get('tx_hash'):
+            return 0
+        return self._priced_trades_buffer.add(trade)
+
+    def flush_priced_trades(self) -> int:
+        """Write any buffered priced trades; returns rows written."""
+        return self._priced_trades_buffer.flush()
+
     def count_priced_trades(self, address: str, days: int = 90) -> int:
         try:
             from datetime import timedelta
@@ -224,43 +615,52 @@ class SmartMoneyRepository:
             res = self.client.table('priced_trades').select('id', count='exact').eq('address', address.lower()).gte('block_ts', cutoff).execute()
             return res.count or 0
         except Exception as e:
-            print(f"Error counting priced trades: {e}")
+            log.warning("Error counting priced trades: %s", e)
             return 0
 
     def get_recent_interactions_for_address(self, address: str, days: int = 90, limit: int = 2000) -> List[Dict]:
         try:
             from datetime import timedelta
             cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
-            res = self.client.table('dex_interactions').select('tx_hash,router_address,timestamp').eq('address', address.lower()).gte('timestamp', cutoff).order('timestamp', desc=True).limit(limit).execute()
+            res = self.client.table('dex_interactions').select('tx_hash,router_address,block_number,timestamp').eq('address', address.lower()).gte('timestamp', cutoff).order('timestamp', desc=True).limit(limit).execute()
             return res.data or []
         except Exception as e:
-            print(f"Error fetching recent interactions: {e}")
+            log.warning("Error fetching recent interactions: %s", e)
             return []
 
     def update_coverage_for_address(self, address: str, days: int = 90) -> Dict:
         """Compute coverage_pct and priced_trades_count for an address and update candidates row."""
         try:
-            priced = self.count_priced_trades(address, days=days)
-            # Compute total_swaps within the same lookback window to match priced count
-            from datetime import timedelta
-            cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
-            di = self.client.table('dex_interactions').select('id', count='exact').eq('address', address.lower()).gte('timestamp', cutoff).execute()
-            total_swaps = di.count or 0
-            coverage = 0.0
-            if total_swaps > 0:
-                coverage = round(min(100.0, 100.0 * priced / float(total_swaps)), 2)
-            # Update candidate row
-            self.client.table('smart_money_candidates').upsert({
-                'address': address.lower(),
-                'priced_trades_count': priced,
-                'coverage_pct': coverage,
-                'last_priced_at': datetime.utcnow().isoformat(),
-            }, on_conflict='address').execute()
-            return {'priced_trades_count': priced, 'coverage_pct': coverage, 'total_swaps': total_swaps}
+            # Both counts and the candidate upsert run in one statement (see update_coverage())
+            res = self.client.rpc('update_coverage', {'p_address': address.lower(), 'p_days': days}).execute()
+            row = (res.data or [{}])[0]
+            return {
+                'priced_trades_count': int(row.get('priced_trades_count') or 0),
+                'coverage_pct': float(row.get('coverage_pct') or 0.0),
+                'total_swaps': int(row.get('total_swaps') or 0),
+            }
         except Exception as e:
-            print(f"Error updating coverage: {e}")
+            log.warning("Error updating coverage: %s", e)
             return {'priced_trades_count': 0, 'coverage_pct': 0.0, 'total_swaps': 0}
 
+    def update_coverage_bulk(self, addresses: List[str], days: int = 90) -> Dict[str, Dict]:
+        """Set-based update_coverage_for_address; returns coverage keyed by lowercased address."""
+        try:
+            res = self.client.rpc('update_coverage_bulk', {
+                'p_addresses': [a.lower() for a in addresses], 'p_days': days
+            }).execute()
+            return {
+                row['address']: {
+                    'priced_trades_count': int(row.get('priced_trades_count') or 0),
+                    'coverage_pct': float(row.get('coverage_pct') or 0.0),
+                    'total_swaps': int(row.get('total_swaps') or 0),
+                }
+                for row in res.data or []
+            }
+        except Exception as e:
+            log.warning("Error updating coverage in bulk: %s", e)
+            return {}
+
     # Trader metrics (D-020)
     def get_priced_trades_for_address(self, address: str, days: int = 90) -> List[Dict]:
         try:
@@ -269,9 +669,69 @@ class SmartMoneyRepository:
             res = self.client.table('priced_trades').select('usd_in,usd_out,block_ts').eq('address', address.lower()).gte('block_ts', cutoff).order('block_ts', desc=True).execute()
             return res.data or []
         except Exception as e:
-            print(f"Error fetching priced trades: {e}")
+            log.warning("Error fetching priced trades: %s", e)
             return []
 
+    def get_priced_trades_arrays(self, address: str, days: int = 90) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Columnar view of get_priced_trades_for_address: (usd_in, usd_out, block_ts epoch seconds)."""
+        data = [r for r in self.get_priced_trades_for_address(address, days=days) if _has_usd_leg(r)]
+        n = len(data)
+        usd_in = np.fromiter((float(r.get('usd_in') or 0) for r in data), dtype=np.float64, count=n)
+        usd_out = np.fromiter((float(r.get('usd_out') or 0) for r in data), dtype=np.float64, count=n)
+        block_ts = np.fromiter(
+            (int(datetime.fromisoformat(str(r['block_ts']).replace('Z', '+00:00')).timestamp()) if r.get('block_ts') else 0
+             for r in data),
+            dtype=np.int64, count=n
+        )
+        return usd_in, usd_out, block_ts
+
+    def get_priced_trades_arrays_bulk(self, addresses: List[str], days: int = 90) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Per-address (usd_in, usd_out) arrays, newest first, from one chunked in_() query."""
+        try:
+            from datetime import timedelta
+            cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+            rows = self._select_in(
+                'priced_trades', 'address,usd_in,usd_out,block_ts',
+                [a.lower() for a in addresses], gte={'block_ts': cutoff}, order='block_ts'
+            )
+        except Exception as e:
+            log.warning("Error fetching priced trades in bulk: %s", e)
+            rows = []
+        grouped: Dict[str, List[Dict]] = {}
+        for r in rows:
+            if _has_usd_leg(r):
+                grouped.setdefault(r['address'], []).append(r)
+        out = {}
+        for addr, trades in grouped.items():
+            n = len(trades)
+            out[addr] = (
+                np.fromiter((float(t.get('usd_in') or 0) for t in trades), dtype=np.float64, count=n),
+                np.fromiter((float(t.get('usd_out') or 0) for t in trades), dtype=np.float64, count=n),
+            )
+        return out
+
+    def upsert_trader_metrics_bulk(self, rows: List[Dict], window: str = '90d') -> bool:
+        """Upsert many trader_metrics rows ({'address': ..., **metrics}) in one request."""
+        try:
+            data = [{
+                'address': r['address'].lower(),
+                'metrics_window': window,
+                'priced_trades_count': int(r.get('priced_trades_count', 0)),
+                'coverage_pct': r.get('coverage_pct'),
+                'pnl_usd_90d': r.get('pnl_usd_90d'),
+                'win_rate': r.get('win_rate'),
+                'sharpe_90d': r.get('sharpe_90d'),
+                'max_drawdown_usd': r.get('max_drawdown_usd'),
+            } for r in rows]
+            if data:
+                self.client.table('trader_metrics').upsert(
+                    data, on_conflict='address,metrics_window', returning='minimal'
+                ).execute()
+            return True
+        except Exception as e:
+            log.warning("Error upserting trader metrics in bulk: %s", e)
+            return False
+
     def upsert_trader_metrics(self, address: str, metrics: Dict, window: str = '90d') -> bool:
         try:
             data = {
@@ -283,23 +743,24 @@ class SmartMoneyRepository:
                 'win_rate': metrics.get('win_rate'),
                 'sharpe_90d': metrics.get('sharpe_90d'),
                 'max_drawdown_usd': metrics.get('max_drawdown_usd'),
-                'updated_at': datetime.utcnow().isoformat(),
             }
             self.client.table('trader_metrics').upsert(data, on_conflict='address,metrics_window').execute()
             return True
         except Exception as e:
-            print(f"Error upserting trader metrics: {e}")
+            log.warning("Error upserting trader metrics: %s", e)
             return False
 
     def get_trader_metrics_bulk(self, addresses: List[str], window: str = '90d') -> Dict[str, Dict]:
         try:
             if not addresses:
                 return {}
-            res = self.client.table('trader_metrics').select('*').eq('metrics_window', window).in_('address', [a.lower() for a in addresses]).execute()
-            rows = res.data or []
+            rows = self._select_in(
+                'trader_metrics', 'address,sharpe_90d,win_rate,pnl_usd_90d',
+                [a.lower() for a in addresses], filters={'metrics_window': window}
+            )
             return {r['address']: r for r in rows}
         except Exception as e:
-            print(f"Error fetching trader metrics bulk: {e}")
+            log.warning("Error fetching trader metrics bulk: %s", e)
             return {}
 
     # Token metadata / price cache
@@ -308,7 +769,7 @@ class SmartMoneyRepository:
             res = self.client.table('token_metadata').select('*').eq('address', address.lower()).limit(1).execute()
             return res.data[0] if res.data else None
         except Exception as e:
-            print(f"Error getting token metadata: {e}")
+            log.warning("Error getting token metadata: %s", e)
             return None
 
     def upsert_token_metadata(self, meta: Dict) -> bool:
@@ -318,49 +779,107 @@ class SmartMoneyRepository:
             self.client.table('token_metadata').upsert(meta, on_conflict='address').execute()
             return True
         except Exception as e:
-            print(f"Error upserting token metadata: {e}")
+            log.warning("Error upserting token metadata: %s", e)
             return False
 
     def get_cached_token_price(self, address: str, ts_bucket: str) -> Optional[float]:
+        key = (address.lower(), ts_bucket)
+        hit = self._price_cache.get(key)
+        if hit is not None:
+            return hit
         try:
-            res = self.client.table('token_prices').select('usd').eq('address', address.lower()).eq('ts_bucket', ts_bucket).limit(1).execute()
+            res = self.client.table('token_prices').select('usd,expires_at').eq('address', key[0]).eq(
+                'ts_bucket', ts_bucket
+            ).or_(f"expires_at.is.null,expires_at.gt.{datetime.utcnow().isoformat()}").limit(1).execute()
             if res.data:
-                return float(res.data[0]['usd'])
+                price = float(res.data[0]['usd'])
+                # Short-lived (live bucket) prices stay out of the long-TTL process cache
+                if res.data[0].get('expires_at') is None:
+                    self._price_cache[key] = price
+                return price
             return None
         except Exception as e:
-            print(f"Error getting cached token price: {e}")
+            log.warning("Error getting cached token price: %s", e)
             return None
 
-    def upsert_token_price(self, address: str, ts_bucket: str, usd: float, source: str = 'coingecko') -> bool:
+    def get_cached_token_prices_bulk(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+        """Resolve many (address, ts_bucket) pairs: in-process cache first, then one fetch_prices RPC."""
+        out: Dict[Tuple[str, str], float] = {}
+        misses = []
+        for addr, bucket in set((a.lower(), b) for a, b in pairs):
+            hit = self._price_cache.get((addr, bucket))
+            if hit is not None:
+                out[(addr, bucket)] = hit
+            else:
+                misses.append({'address': addr, 'ts_bucket': bucket})
+        if not misses:
+            return out
         try:
-            data = {
-                'address': address.lower(),
-                'ts_bucket': ts_bucket,
-                'usd': usd,
-                'source': source,
-                'fetched_at': datetime.utcnow().isoformat(),
-            }
+            res = self.client.rpc('fetch_prices', {'pairs': misses}).execute()
+            for r in (res.data or []):
+                key = (r['address'], r['ts_bucket'])
+                out[key] = float(r['usd'])
+                if r.get('expires_at') is None:
+                    self._price_cache[key] = out[key]
+        except Exception as e:
+            log.warning("Error getting cached token prices: %s", e)
+        return out
+
+    @staticmethod
+    def _token_price_row(address: str, ts_bucket: str, usd: float, source: str, ttl_sec: Optional[int]) -> Dict:
+        # ttl_sec=None means the price never expires (historical buckets)
+        expires_at = (datetime.utcnow() + timedelta(seconds=ttl_sec)).isoformat() if ttl_sec else None
+        return {
+            'address': address.lower(),
+            'ts_bucket': ts_bucket,
+            'usd': usd,
+            'source': source,
+            'expires_at': expires_at,
+        }
+
+    def upsert_token_price(self, address: str, ts_bucket: str, usd: float, source: str = 'coingecko',
+                           ttl_sec: Optional[int] = None) -> bool:
+        try:
+            data = self._token_price_row(address, ts_bucket, usd, source, ttl_sec)
             self.client.table('token_prices').upsert(data, on_conflict='address,ts_bucket').execute()
+            if ttl_sec is None:
+                self._price_cache[(data['address'], ts_bucket)] = float(usd)
             return True
         except Exception as e:
-            print(f"Error upserting token price: {e}")
+            log.warning("Error upserting token price: %s", e)
             return False
+
+    def queue_token_price(self, address: str, ts_bucket: str, usd: float, source: str = 'coingecko',
+                          ttl_sec: Optional[int] = None) -> int:
+        """Buffer a token price for batched upsert; non-expiring prices are readable from the price cache immediately."""
+        data = self._token_price_row(address, ts_bucket, usd, source, ttl_sec)
+        if ttl_sec is None:
+            self._price_cache[(data['address'], ts_bucket)] = float(usd)
+        return self._token_prices_buffer.add(data)
+
+    def flush_token_prices(self) -> int:
+        """Write any buffered token prices; returns rows written."""
+        return self._token_prices_buffer.flush()
     
     # Smart Money Candidate Management
+    @staticmethod
+    def _candidate_row(address: str, metrics: Dict) -> Dict:
+        return {
+            'address': address.lower(),
+            'status': metrics.get('status', 'candidate'),
+            'dex_swaps_90d': metrics.get('dex_swaps_90d', 0),
+            'volume_90d_usd': metrics.get('volume_90d_usd'),
+            'sharpe_ratio': metrics.get('sharpe_ratio'),
+            'win_rate': metrics.get('win_rate'),
+            'confidence_score': metrics.get('confidence_score'),
+            'qualifies_smart_money': metrics.get('qualifies_smart_money', False),
+            'last_evaluated_at': datetime.utcnow().isoformat()
+        }
+
     def update_smart_money_candidate(self, address: str, metrics: Dict) -> bool:
         """Update or insert smart money candidate"""
         try:
-            data = {
-                'address': address.lower(),
-                'status': metrics.get('status', 'candidate'),
-                'dex_swaps_90d': metrics.get('dex_swaps_90d', 0),
-                'volume_90d_usd': metrics.get('volume_90d_usd'),
-                'sharpe_ratio': metrics.get('sharpe_ratio'),
-                'win_rate': metrics.get('win_rate'),
-                'confidence_score': metrics.get('confidence_score'),
-                'qualifies_smart_money': metrics.get('qualifies_smart_money', False),
-                'last_evaluated_at': datetime.utcnow().isoformat()
-            }
+            data = self._candidate_row(address, metrics)
             
             result = self.client.table('smart_money_candidates').upsert(
                 data,
@@ -368,9 +887,24 @@ class SmartMoneyRepository:
             ).execute()
             return len(result.data) > 0
         except Exception as e:
-            print(f"Error updating smart money candidate: {e}")
+            log.warning("Error updating smart money candidate: %s", e)
             return False
     
+    def update_smart_money_candidates_bulk(self, results: List[Dict]) -> int:
+        """Upsert many candidates (update_smart_money_candidate rows keyed by 'address') in
+        BACKFILL_CHUNK_SIZE requests; returns rows written."""
+        data = [self._candidate_row(r['address'], r) for r in results if r.get('address')]
+        written = 0
+        for chunk in _chunk(data, BACKFILL_CHUNK_SIZE):
+            try:
+                self.client.table('smart_money_candidates').upsert(
+                    chunk, on_conflict='address', returning='minimal'
+                ).execute()
+                written += len(chunk)
+            except Exception as e:
+                log.warning("Error updating %d smart money candidates: %s", len(chunk), e)
+        return written
+
     def get_smart_money_watchlist(self, min_sharpe: float = 1.0, limit: int = 100) -> List[Dict]:
         """Get smart money traders that qualify for the watchlist"""
         try:
@@ -382,25 +916,26 @@ class SmartMoneyRepository:
             
             return result.data
         except Exception as e:
-            print(f"Error getting smart money watchlist: {e}")
+            log.warning("Error getting smart money watchlist: %s", e)
             return []
     
     def get_candidate_funnel_stats(self) -> Dict:
         """Get statistics on the candidate funnel"""
         try:
-            # Count candidates at each stage
-            all_candidates = self.client.table('smart_money_candidates').select('id', count='exact').execute()
-            scored = self.client.table('smart_money_candidates').select('id', count='exact').eq('status', 'scored').execute()
-            watchlist = self.client.table('smart_money_candidates').select('id', count='exact').eq('status', 'watchlist').execute()
+            # Count candidates at each stage in a single pass (see funnel_stats())
+            res = self.client.rpc('funnel_stats').execute()
+            row = (res.data or [{}])[0]
+            total = row.get('total') or 0
+            watchlist = row.get('watchlist') or 0
             
             return {
-                'total_candidates': all_candidates.count or 0,
-                'scored_traders': scored.count or 0,
-                'watchlist_traders': watchlist.count or 0,
-                'conversion_rate': (watchlist.count / all_candidates.count * 100) if all_candidates.count else 0
+                'total_candidates': total,
+                'scored_traders': row.get('scored') or 0,
+                'watchlist_traders': watchlist,
+                'conversion_rate': (watchlist / total * 100) if total else 0
             }
         except Exception as e:
-            print(f"Error getting funnel stats: {e}")
+            log.warning("Error getting funnel stats: %s", e)
             return {
                 'total_candidates': 0,
                 'scored_traders': 0,
@@ -412,231 +947,74 @@ class SmartMoneyRepository:
     def get_recent_traders(self, hours_back: int = 24, limit: int = 500) -> List[str]:
         """Return distinct addresses seen in dex_interactions within the lookback window."""
         try:
-            from datetime import datetime, timedelta
-            cutoff = (datetime.utcnow() - timedelta(hours=hours_back)).isoformat()
-            # Fetch most recent interactions, then distinct addresses in code
-            res = self.client.table('dex_interactions').select('address,timestamp').gte(
-                'timestamp', cutoff
-            ).order('timestamp', desc=True).limit(max(limit * 5, 1000)).execute()
-            rows = res.data or []
-            seen = []
-            added = set()
-            for r in rows:
-                addr = (r.get('address') or '').lower()
-                if addr and addr not in added:
-                    added.add(addr)
-                    seen.append(addr)
-                    if len(seen) >= limit:
-                        break
-            return seen
-        except Exception as e:
-            print(f"Error getting recent traders: {e}")
+            res = self.client.rpc('recent_traders', {'hours_back': hours_back, 'lim': limit}).execute()
+            return [r['address'] for r in (res.data or []) if r.get('address')]
+        except Exception as e:
+            log.warning("Error getting recent traders: %s", e)
             return []
 
     # Leaderboard Aggregation (fallback without DB views)
+    def _ranked_rows(self, limit: int, sort: str, **params) -> (List[LeaderboardRow], bool):
+        """Call sm_leaderboard(); gating and ordering happen server-side.
+
+        Returns (rows, fallback): fallback is True when a sharpe/pnl sort was
+        requested but no row has the metric, so the activity ordering applies.
+        """
+        s = (sort or 'auto').lower()
+        data = self.client.rpc('sm_leaderboard', {'p_limit': limit, 'p_sort': s, **params}).execute().data or []
+        rows = [LeaderboardRow.from_row(r) for r in data]
+        # Nulls sort last, so a null lead row means no row has the metric
+        key = {'sharpe': 'sharpe_ratio', 'auto': 'sharpe_ratio', 'pnl': 'pnl_usd_90d'}.get(s)
+        fallback = bool(key and rows and getattr(rows[0], key) is None)
+        return rows, fallback
+
     def get_smart_money_leaderboard(self, limit: int = 50, min_dex_swaps: int = 10,
                                     active_within_days: int = 30,
                                     sort: str = 'auto',
                                     priced_only: bool = False,
                                     min_coverage: float = None,
-                                    min_priced_trades: int = None) -> (List[Dict], bool):
-        """Assemble a lightweight leaderboard by joining candidates with activity in app code.
+                                    min_priced_trades: int = None) -> (List[LeaderboardRow], bool):
+        """Read the leaderboard from smart_money_leaderboard_mv (pre-joined, refreshed in background).
 
         Sorting preference:
-        - If sharpe_ratio present and >= 10 priced trades coverage in future, sort by sharpe_ratio desc
+        - If sharpe_ratio present, sort by sharpe_ratio desc
         - Otherwise fallback to dex_swap_count desc, last_activity_at desc
         """
         try:
-            # Fetch candidate rows (oversample to allow filtering)
-            cand_res = self.client.table('smart_money_candidates').select('*').order(
-                'dex_swaps_90d', desc=True
-            ).limit(max(limit * 4, 100)).execute()
-            candidates = cand_res.data or []
-
-            if not candidates:
-                return [], False
-
-            # Gather addresses for bulk activity query
-            addresses = [c['address'] for c in candidates if c.get('address')]
-            # Bulk fetch activity
-            act_query = self.client.table('address_activity').select('*')
-            # Supabase Python client supports in_ filter
-            act_res = act_query.in_('address', addresses).execute()
-            activities = {a['address']: a for a in (act_res.data or [])}
-
-            # Combine and filter
-            combined: List[Dict] = []
             from datetime import timedelta
-            cutoff = (datetime.utcnow() - timedelta(days=active_within_days)).isoformat()
-
-            for c in candidates:
-                addr = c.get('address')
-                a = activities.get(addr, {})
-                dex_swaps = a.get('dex_swap_count', c.get('dex_swaps_90d', 0) or 0)
-                last_activity = a.get('last_activity_at')
-
-                if dex_swaps < min_dex_swaps:
-                    continue
-                if last_activity and last_activity < cutoff:
-                    continue
-
-                row = {
-                    'address': addr,
-                    'status': c.get('status', 'candidate'),
-                    'dex_swaps_90d': dex_swaps,
-                    'unique_protocols_90d': a.get('unique_protocols'),
-                    'last_activity_at': last_activity,
-                    'total_gas_spent_eth': a.get('total_gas_spent_eth'),
-                    'sharpe_ratio': c.get('sharpe_ratio'),
-                    'win_rate': c.get('win_rate'),
-                    'volume_90d_usd': c.get('volume_90d_usd'),
-                    # Placeholders for D-019 coverage metrics
-                    'coverage_pct': c.get('coverage_pct'),
-                    'priced_trades_count': c.get('priced_trades_count'),
-                }
-                # Apply priced-only gating if requested
-                if priced_only:
-                    cov = row.get('coverage_pct') or 0
-                    pct_min = min_coverage if min_coverage is not None else 60
-                    pt_min = min_priced_trades if min_priced_trades is not None else 10
-                    if (row.get('priced_trades_count') or 0) < pt_min or cov < pct_min:
-                        continue
-                combined.append(row)
-
-            # Attach ENS from whales labels (simple heuristic) and ens_cache
-            try:
-                lbl_res = self.client.table('whales').select('address,label').in_('address', addresses).execute()
-                labels = {w['address']: w.get('label') for w in (lbl_res.data or [])}
-                ens_rows = self.client.table('ens_cache').select('address,ens').in_('address', addresses).execute()
-                ens_map = {e['address']: e.get('ens') for e in (ens_rows.data or [])}
-            except Exception:
-                labels, ens_map = {}, {}
-
-            # Attach trader metrics (D-020)
-            metrics = self.get_trader_metrics_bulk([r['address'] for r in combined])
-            for r in combined:
-                m = metrics.get(r['address']) or {}
-                if m:
-                    if m.get('sharpe_90d') is not None:
-                        r['sharpe_ratio'] = m.get('sharpe_90d')
-                    if m.get('win_rate') is not None:
-                        r['win_rate'] = m.get('win_rate')
-                    if m.get('pnl_usd_90d') is not None:
-                        r['pnl_usd_90d'] = m.get('pnl_usd_90d')
-                # ENS from label if present
-                lbl = labels.get(r['address'])
-                if lbl and '.eth' in lbl:
-                    r['ens'] = lbl
-                elif ens_map.get(r['address']):
-                    r['ens'] = ens_map.get(r['address'])
-
-            # Sorting
-            fallback = False
-            s = (sort or 'auto').lower()
-            if s in ('sharpe', 'auto'):
-                sharpe_present = any((r.get('sharpe_ratio') is not None) for r in combined)
-                if sharpe_present:
-                    combined.sort(key=lambda r: (-(r.get('sharpe_ratio') or 0), -(r.get('dex_swaps_90d') or 0)))
-                else:
-                    fallback = True
-                    combined.sort(key=lambda r: (-(r.get('dex_swaps_90d') or 0), (r.get('last_activity_at') or '')))
-            elif s == 'pnl':
-                pnl_present = any((r.get('pnl_usd_90d') is not None) for r in combined)
-                if pnl_present:
-                    combined.sort(key=lambda r: (-(r.get('pnl_usd_90d') or 0)))
-                else:
-                    fallback = True
-                    combined.sort(key=lambda r: (-(r.get('dex_swaps_90d') or 0), (r.get('last_activity_at') or '')))
-            elif s == 'win_rate':
-                combined.sort(key=lambda r: (-(r.get('win_rate') or 0)))
-            elif s == 'last_activity':
-                combined.sort(key=lambda r: (r.get('last_activity_at') or ''), reverse=True)
-            elif s == 'activity':
-                combined.sort(key=lambda r: (-(r.get('dex_swaps_90d') or 0), (r.get('last_activity_at') or '')))
-            else:
-                combined.sort(key=lambda r: (-(r.get('dex_swaps_90d') or 0), (r.get('last_activity_at') or '')))
-
-            return combined[:limit], fallback
+            params = {
+                'p_min_swaps': min_dex_swaps,
+                'p_active_since': (datetime.utcnow() - timedelta(days=active_within_days)).isoformat(),
+            }
+            if priced_only:
+                params['p_min_coverage'] = min_coverage if min_coverage is not None else 60
+                params['p_min_priced'] = min_priced_trades if min_priced_trades is not None else 10
+            return self._ranked_rows(limit, sort, **params)
         except Exception as e:
-            print(f"Error assembling smart money leaderboard: {e}")
+            log.warning("Error reading smart money leaderboard: %s", e)
             return [], False
 
+    def refresh_leaderboard_mv(self) -> bool:
+        """Refresh smart_money_leaderboard_mv concurrently (readers are not blocked)."""
+        try:
+            self.client.rpc('refresh_leaderboard_mv').execute()
+            return True
+        except Exception as e:
+            log.warning("Error refreshing leaderboard view: %s", e)
+            return False
+
     def get_watchlist_sorted(self, min_sharpe: float = 0.0, limit: int = 100,
                               sort: str = 'auto', priced_only: bool = False,
-                              min_coverage: float = None, min_priced_trades: int = None) -> (List[Dict], bool):
+                              min_coverage: float = None, min_priced_trades: int = None) -> (List[LeaderboardRow], bool):
         """Get watchlist traders with flexible sorting and optional priced-only gating."""
         try:
-            result = self.client.table('smart_money_candidates').select('*').eq(
-                'qualifies_smart_money', True
-            ).limit(max(limit * 4, 200)).execute()
-            rows = result.data or []
-            # Apply gating
+            params = {'p_qualified_only': True}
             if priced_only:
-                gated = []
-                pct_min = min_coverage if min_coverage is not None else 60
-                pt_min = min_priced_trades if min_priced_trades is not None else 10
-                for r in rows:
-                    cov = (r.get('coverage_pct') or 0)
-                    if (r.get('priced_trades_count') or 0) >= pt_min and cov >= pct_min:
-                        gated.append(r)
-                rows = gated
-
-            # Attach ENS via whales/ens_cache
-            try:
-                addresses = [r['address'] for r in rows if r.get('address')]
-                lbl_res = self.client.table('whales').select('address,label').in_('address', addresses).execute()
-                labels = {w['address']: w.get('label') for w in (lbl_res.data or [])}
-                ens_rows = self.client.table('ens_cache').select('address,ens').in_('address', addresses).execute()
-                ens_map = {e['address']: e.get('ens') for e in (ens_rows.data or [])}
-                for r in rows:
-                    lbl = labels.get(r['address'])
-                    if lbl and '.eth' in lbl:
-                        r['ens'] = lbl
-                    elif ens_map.get(r['address']):
-                        r['ens'] = ens_map.get(r['address'])
-            except Exception:
-                pass
-
-            # Attach trader metrics (D-020)
-            metrics = self.get_trader_metrics_bulk([r['address'] for r in rows])
-            for r in rows:
-                m = metrics.get(r['address']) or {}
-                if m:
-                    if m.get('sharpe_90d') is not None:
-                        r['sharpe_ratio'] = m.get('sharpe_90d')
-                    if m.get('win_rate') is not None:
-                        r['win_rate'] = m.get('win_rate')
-                    if m.get('pnl_usd_90d') is not None:
-                        r['pnl_usd_90d'] = m.get('pnl_usd_90d')
-
-            fallback = False
-            s = (sort or 'auto').lower()
-            if s in ('sharpe', 'auto'):
-                sharpe_present = any((r.get('sharpe_ratio') is not None) for r in rows)
-                if sharpe_present:
-                    rows.sort(key=lambda r: (-(r.get('sharpe_ratio') or 0), -(r.get('dex_swaps_90d') or 0)))
-                else:
-                    fallback = True
-                    rows.sort(key=lambda r: (-(r.get('dex_swaps_90d') or 0), (r.get('last_activity_at') or '')))
-            elif s == 'pnl':
-                pnl_present = any((r.get('pnl_usd_90d') is not None) for r in rows)
-                if pnl_present:
-                    rows.sort(key=lambda r: (-(r.get('pnl_usd_90d') or 0)))
-                else:
-                    fallback = True
-                    rows.sort(key=lambda r: (-(r.get('dex_swaps_90d') or 0), (r.get('last_activity_at') or '')))
-            elif s == 'win_rate':
-                rows.sort(key=lambda r: (-(r.get('win_rate') or 0)))
-            elif s == 'last_activity':
-                rows.sort(key=lambda r: (r.get('last_activity_at') or ''), reverse=True)
-            elif s == 'activity':
-                rows.sort(key=lambda r: (-(r.get('dex_swaps_90d') or 0), (r.get('last_activity_at') or '')))
-            else:
-                rows.sort(key=lambda r: (-(r.get('dex_swaps_90d') or 0), (r.get('last_activity_at') or '')))
-
-            return rows[:limit], fallback
+                params['p_min_coverage'] = min_coverage if min_coverage is not None else 60
+                params['p_min_priced'] = min_priced_trades if min_priced_trades is not None else 10
+            return self._ranked_rows(limit, sort, **params)
         except Exception as e:
-            print(f"Error getting smart money watchlist: {e}")
+            log.warning("Error getting smart money watchlist: %s", e)
             return [], False
     
     # Bootstrap Discovery Methods
@@ -644,22 +1022,54 @@ class SmartMoneyRepository:
                                 discovery_method: str, validation_data: Dict = None) -> bool:
         """Save a newly discovered contract with confidence score"""
         try:
+            now = datetime.utcnow().isoformat()
             data = {
                 'address': address.lower(),
                 'contract_type': contract_type,
                 'confidence_score': confidence,
                 'discovery_method': discovery_method,
                 'validation_data': validation_data or {},
-                'first_seen': datetime.utcnow().isoformat(),
-                'last_validated': datetime.utcnow().isoformat(),
+                'first_seen': now,
+                'last_validated': now,
                 'is_verified': False
             }
             result = self.client.table('discovered_contracts').insert(data).execute()
             return len(result.data) > 0
         except Exception as e:
-            print(f"Error saving discovered contract: {e}")
+            log.warning("Error saving discovered contract: %s", e)
             return False
     
+    def save_discovered_contracts_bulk(self, rows: List[Dict]) -> int:
+        """Insert many discoveries (address, contract_type, confidence, discovery_method,
+        validation_data); existing addresses are left untouched. Returns rows written."""
+        if not rows:
+            return 0
+        if pg_pool:
+            now = datetime.utcnow()
+            try:
+                return pg_pool.execute_values(
+                    "insert into public.discovered_contracts (address, contract_type, confidence_score,"
+                    " discovery_method, validation_data, first_seen, last_validated, is_verified)"
+                    " values %s on conflict do nothing",
+                    [(r['address'].lower(), r['contract_type'], r['confidence'], r['discovery_method'],
+                      Json(r.get('validation_data') or {}), now, now, False) for r in rows]
+                )
+            except Exception as e:
+                log.warning("Direct insert of discovered contracts failed, using PostgREST: %s", e)
+        now = datetime.utcnow().isoformat()
+        data = [{
+            'address': r['address'].lower(),
+            'contract_type': r['contract_type'],
+            'confidence_score': r['confidence'],
+            'discovery_method': r['discovery_method'],
+            'validation_data': r.get('validation_data') or {},
+            'first_seen': now,
+            'last_validated': now,
+            'is_verified': False
+        } for r in rows]
+        # resolution=ignore-duplicates: one request per BACKFILL_CHUNK_SIZE rows
+        return self._backfill_insert('discovered_contracts', data, on_conflict='address')
+
     def get_discovery_candidates(self, contract_type: str = None, min_confidence: float = 0.7) -> List[Dict]:
         """Get discovered contracts that meet confidence threshold"""
         try:
@@ -669,9 +1079,21 @@ class SmartMoneyRepository:
             result = query.order('confidence_score', desc=True).execute()
             return result.data
         except Exception as e:
-            print(f"Error getting discovery candidates: {e}")
+            log.warning("Error getting discovery candidates: %s", e)
             return []
     
+    def _insert_new_seeds(self, table: str, discoveries: List[Dict], build_row) -> int:
+        """Insert rows for discoveries whose address is not yet in `table` (one lookup, one insert)."""
+        by_address = {d['address'].lower(): d for d in discoveries if d.get('address')}
+        if not by_address:
+            return 0
+        existing = {r['address'] for r in self._select_in(table, 'address', list(by_address))}
+        rows = [build_row(addr, d) for addr, d in by_address.items() if addr not in existing]
+        if not rows:
+            return 0
+        result = self.client.table(table).insert(rows).execute()
+        return len(result.data or [])
+
     def bootstrap_populate_seeds(self, min_confidence: float = 0.8) -> Dict[str, int]:
         """Populate seed tables from high-confidence discoveries"""
         try:
@@ -679,34 +1101,25 @@ class SmartMoneyRepository:
             
             # Add DEX routers
             dex_discoveries = self.get_discovery_candidates('dex_router', min_confidence)
-            for discovery in dex_discoveries:
-                # Check if already exists
-                existing = self.client.table('dex_routers').select('address').eq('address', discovery['address']).execute()
-                if not existing.data:
-                    success = self.add_dex_router(
-                        discovery['address'], 
-                        discovery['validation_data'].get('name', f"Router-{discovery['address'][:8]}"),
-                        discovery['validation_data'].get('version')
-                    )
-                    if success:
-                        stats['routers_added'] += 1
+            stats['routers_added'] = self._insert_new_seeds('dex_routers', dex_discoveries, lambda addr, d: {
+                'address': addr,
+                'name': d['validation_data'].get('name', f"Router-{addr[:8]}"),
+                'version': d['validation_data'].get('version'),
+                'is_active': True
+            })
             
             # Add CEX addresses  
             cex_discoveries = self.get_discovery_candidates('cex_wallet', min_confidence)
-            for discovery in cex_discoveries:
-                existing = self.client.table('cex_addresses').select('address').eq('address', discovery['address']).execute()
-                if not existing.data:
-                    success = self.add_cex_address(
-                        discovery['address'],
-                        discovery['validation_data'].get('exchange_name', f"CEX-{discovery['address'][:8]}"),
-                        discovery['validation_data'].get('address_type', 'hot_wallet')
-                    )
-                    if success:
-                        stats['cex_added'] += 1
+            stats['cex_added'] = self._insert_new_seeds('cex_addresses', cex_discoveries, lambda addr, d: {
+                'address': addr,
+                'exchange_name': d['validation_data'].get('exchange_name', f"CEX-{addr[:8]}"),
+                'address_type': d['validation_data'].get('address_type', 'hot_wallet'),
+                'is_active': True
+            })
             
             return stats
         except Exception as e:
-            print(f"Error populating seeds: {e}")
+            log.warning("Error populating seeds: %s", e)
             return {'routers_added': 0, 'cex_added': 0}
     
     def save_discovery_pattern(self, pattern_type: str, pattern_data: Dict, success_rate: float = 1.0) -> bool:
@@ -721,7 +1134,7 @@ class SmartMoneyRepository:
             result = self.client.table('discovery_patterns').insert(data).execute()
             return len(result.data) > 0
         except Exception as e:
-            print(f"Error saving discovery pattern: {e}")
+            log.warning("Error saving discovery pattern: %s", e)
             return False
     
     def clear_discovery_cache(self, older_than_hours: int = 24) -> bool:
@@ -731,7 +1144,7 @@ class SmartMoneyRepository:
             result = self.client.table('discovered_contracts').delete().lt('first_seen', cutoff).execute()
             return True
         except Exception as e:
-            print(f"Error clearing discovery cache: {e}")
+            log.warning("Error clearing discovery cache: %s", e)
             return False
 
 # Create singleton instance
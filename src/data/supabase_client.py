@@ -7,8 +7,12 @@ Manages connection and operations with Supabase PostgreSQL
 from supabase import create_client, Client
 from typing import List, Dict, Optional, Any
 import os
+import httpx
 from config import config
 
+# Keep-alive pool shared by every repository query (one client per process)
+HTTP_POOL_LIMITS = httpx.Limits(max_keepalive_connections=50, max_connections=100)
+
 class SupabaseClient:
     """Supabase database client wrapper"""
     
@@ -23,6 +27,35 @@ class SupabaseClient:
             config.SUPABASE_URL,
             key
         )
+        self._configure_http_session()
+
+    def _configure_http_session(self) -> None:
+        """Swap the PostgREST session for a pooled keep-alive client (HTTP/2 when h2 is installed).
+
+        supabase-py builds its httpx session with default pool limits; every
+        `.execute()` goes through this one session, so sizing it here lets hot
+        paths reuse warm TLS connections instead of handshaking per request.
+        """
+        try:
+            postgrest = self.client.postgrest
+            old_session = postgrest.session
+            try:
+                import h2  # noqa: F401
+                http2 = True
+            except ImportError:
+                http2 = False
+            postgrest.session = httpx.Client(
+                base_url=old_session.base_url,
+                headers=old_session.headers,
+                timeout=old_session.timeout,
+                follow_redirects=True,
+                http2=http2,
+                limits=HTTP_POOL_LIMITS,
+            )
+            old_session.close()
+        except Exception as e:
+            # Keep the library default session if internals differ
+            print(f"⚠️  Could not configure pooled Supabase HTTP session: {e}")
     
     def get_client(self) -> Client:
         """Get Supabase client instance"""
@@ -4,9 +4,28 @@ Whale Repository
 Data access layer for whale operations using Supabase
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 from datetime import datetime
+from cachetools import TTLCache
 from .supabase_client import supabase_client
+from ..utils.logging_utils import get_rate_limited_logger
+
+log = get_rate_limited_logger(__name__)
+
+# Pre-bound to skip the attribute lookup in per-row save paths
+_utcnow = datetime.utcnow
+
+# whale_roi_scores columns carried by top_whales_mv
+ROI_COLUMNS = ('composite_score', 'total_trades', 'avg_roi_percent', 'win_rate_percent',
+               'total_volume_usd', 'sharpe_ratio')
+
+# Optional whale_roi_scores columns save_roi_score passes through from kwargs
+ROI_EXTRA_COLUMNS = frozenset(('roi_score', 'volume_score', 'consistency_score', 'risk_score',
+                               'activity_score', 'efficiency_score', 'sharpe_ratio',
+                               'max_drawdown_percent'))
+
+# Rows per upsert request in the bulk save paths
+SAVE_CHUNK_SIZE = 500
 
 class WhaleRepository:
     """Repository for whale data operations"""
@@ -15,88 +34,174 @@ class WhaleRepository:
         if not supabase_client:
             raise ValueError("Supabase client not initialized")
         self.client = supabase_client.get_client()
+        # whale id by address exactly as stored/queried (whales.address matches case-sensitively);
+        # batch ROI/tx ingestion resolves the same whale repeatedly
+        self._id_cache = TTLCache(maxsize=50_000, ttl=300)
+    
+    @staticmethod
+    def _whale_row(address: str, label: str, balance_eth: float,
+                   entity_type: str = None, category: str = None) -> Dict:
+        """whales row as written by save_whale / save_whales_bulk"""
+        return {
+            'address': address,
+            'label': label,
+            'balance_eth': balance_eth,
+            'balance_usd': balance_eth * 2000,  # Placeholder ETH price
+            'entity_type': entity_type,
+            'category': category,
+            'last_updated_at': _utcnow().isoformat()
+        }
     
     def save_whale(self, address: str, label: str, balance_eth: float,
                    entity_type: str = None, category: str = None) -> bool:
         """Save or update whale data"""
         try:
-            # Calculate USD balance (rough estimate)
-            balance_usd = balance_eth * 2000  # Placeholder ETH price
-            
-            whale_data = {
-                'address': address,
-                'label': label,
-                'balance_eth': balance_eth,
-                'balance_usd': balance_usd,
-                'entity_type': entity_type,
-                'category': category,
-                'last_updated_at': datetime.utcnow().isoformat()
-            }
+            whale_data = self._whale_row(address, label, balance_eth, entity_type, category)
             
             # Upsert whale (insert or update if exists)
             result = self.client.table('whales').upsert(
                 whale_data, 
                 on_conflict='address'
             ).execute()
+            self._id_cache.pop(address, None)
             
             return len(result.data) > 0
             
         except Exception as e:
-            print(f"Error saving whale {address}: {e}")
+            log.warning("Error saving whale %s: %s", address, e)
             return False
     
-    def get_whale_by_address(self, address: str) -> Optional[Dict]:
-        """Get whale by address"""
+    def save_whales_bulk(self, rows: List[Dict]) -> Set[str]:
+        """Upsert many whales (save_whale kwargs per row) in one request per SAVE_CHUNK_SIZE rows.
+        
+        Returns the lowercased addresses written; the returned ids warm the id cache so a
+        following save_roi_scores_bulk needs no lookups.
+        """
+        saved = set()
+        for i in range(0, len(rows), SAVE_CHUNK_SIZE):
+            chunk = [self._whale_row(**r) for r in rows[i:i + SAVE_CHUNK_SIZE]]
+            try:
+                result = self.client.table('whales').upsert(chunk, on_conflict='address').execute()
+            except Exception as e:
+                log.warning("Error bulk saving %d whales: %s", len(chunk), e)
+                continue
+            for row in result.data or []:
+                saved.add(row['address'].lower())
+                if row.get('id') is not None:
+                    self._id_cache[row['address']] = row['id']
+        return saved
+    
+    def get_whale_by_address(self, address: str, columns: str = '*') -> Optional[Dict]:
+        """Get whale by address (pass `columns` to fetch only what the caller reads)"""
         try:
-            result = self.client.table('whales').select('*').eq('address', address).execute()
+            result = self.client.table('whales').select(columns).eq('address', address).limit(1).execute()
             return result.data[0] if result.data else None
         except Exception as e:
-            print(f"Error getting whale {address}: {e}")
+            log.warning("Error getting whale %s: %s", address, e)
+            return None
+    
+    def _get_whale_id(self, address: str) -> Optional[int]:
+        """Whale id for address, cached for a few minutes.
+        
+        Keyed on the raw address like the eq() query, so a cached and a cold lookup of the
+        same spelling always agree.
+        """
+        whale_id = self._id_cache.get(address)
+        if whale_id is not None:
+            return whale_id
+        try:
+            result = self.client.table('whales').select('id').eq('address', address).limit(1).execute()
+        except Exception as e:
+            log.warning("Error getting whale id %s: %s", address, e)
+            return None
+        if not result.data:
+            return None
+        whale_id = result.data[0]['id']
+        self._id_cache[address] = whale_id
+        return whale_id
+    
+    def whale_exists(self, address: str) -> bool:
+        """Existence check via the cached id lookup"""
+        return self._get_whale_id(address) is not None
+    
+    def get_all_addresses(self, page_size: int = 1000) -> Optional[List[str]]:
+        """Every tracked whale address, paged by id; None if the read fails"""
+        addresses, offset = [], 0
+        try:
+            while True:
+                page = self.client.table('whales').select('address') \
+                    .order('id').range(offset, offset + page_size - 1).execute()
+                rows = page.data or []
+                addresses.extend(r['address'] for r in rows if r.get('address'))
+                if len(rows) < page_size:
+                    return addresses
+                offset += page_size
+        except Exception as e:
+            log.warning("Error loading whale addresses: %s", e)
             return None
     
     def get_top_whales(self, limit: int = 50) -> List[Dict]:
-        """Get top whales with ROI scores"""
+        """Get top whales with ROI scores (from top_whales_mv, one ordered index scan)"""
         try:
-            result = self.client.table('whales').select(
-                '''
-                *,
-                whale_roi_scores(*)
-                '''
-            ).order('balance_eth', desc=True).limit(limit).execute()
+            result = self.client.table('top_whales_mv').select('*').order(
+                'balance_eth', desc=True
+            ).limit(limit).execute()
             
-            return result.data
+            # Keep the embedded shape callers expect: whale_roi_scores is a 0/1-item list
+            whales = []
+            for row in result.data or []:
+                roi = {k: row.pop(k) for k in ROI_COLUMNS}
+                row['whale_roi_scores'] = [roi] if roi['composite_score'] is not None else []
+                whales.append(row)
+            return whales
         except Exception as e:
-            print(f"Error getting top whales: {e}")
+            log.warning("Error getting top whales: %s", e)
             return []
     
+    def refresh_top_whales(self) -> bool:
+        """Refresh top_whales_mv after whale/ROI writes"""
+        try:
+            self.client.rpc('refresh_top_whales_mv').execute()
+            return True
+        except Exception as e:
+            log.warning("Error refreshing top whales view: %s", e)
+            return False
+    
+    @staticmethod
+    def _roi_row(whale_id: int, address: str, composite_score: float, total_trades: int,
+                 avg_roi_percent: float, win_rate_percent: float,
+                 total_volume_usd: float, **kwargs) -> Dict:
+        """whale_roi_scores row; extra kwargs are kept only if they're known score columns"""
+        roi_data = {
+            'whale_id': whale_id,
+            'whale_address': address,  # Changed from 'address' to 'whale_address'
+            'composite_score': composite_score,
+            'total_trades': total_trades,
+            'avg_roi_percent': avg_roi_percent,
+            'win_rate_percent': win_rate_percent,
+            'total_volume_usd': total_volume_usd,
+            'updated_at': _utcnow().isoformat()
+        }
+        
+        # Add any additional ROI metrics
+        for key, value in kwargs.items():
+            if key in ROI_EXTRA_COLUMNS:
+                roi_data[key] = value
+        return roi_data
+    
     def save_roi_score(self, address: str, composite_score: float, total_trades: int,
                        avg_roi_percent: float, win_rate_percent: float, 
                        total_volume_usd: float, **kwargs) -> bool:
         """Save ROI score for whale"""
         try:
             # First get whale ID
-            whale = self.get_whale_by_address(address)
-            if not whale:
-                print(f"Whale {address} not found for ROI score")
+            whale_id = self._get_whale_id(address)
+            if whale_id is None:
+                log.info("Whale %s not found for ROI score", address)
                 return False
             
-            roi_data = {
-                'whale_id': whale['id'],
-                'whale_address': address,  # Changed from 'address' to 'whale_address'
-                'composite_score': composite_score,
-                'total_trades': total_trades,
-                'avg_roi_percent': avg_roi_percent,
-                'win_rate_percent': win_rate_percent,
-                'total_volume_usd': total_volume_usd,
-                'updated_at': datetime.utcnow().isoformat()
-            }
-            
-            # Add any additional ROI metrics
-            for key, value in kwargs.items():
-                if key in ['roi_score', 'volume_score', 'consistency_score', 
-                          'risk_score', 'activity_score', 'efficiency_score',
-                          'sharpe_ratio', 'max_drawdown_percent']:
-                    roi_data[key] = value
+            roi_data = self._roi_row(whale_id, address, composite_score, total_trades,
+                                     avg_roi_percent, win_rate_percent, total_volume_usd, **kwargs)
             
             # Upsert ROI score
             result = self.client.table('whale_roi_scores').upsert(
@@ -107,29 +212,54 @@ class WhaleRepository:
             return len(result.data) > 0
             
         except Exception as e:
-            print(f"Error saving ROI score for {address}: {e}")
+            log.warning("Error saving ROI score for %s: %s", address, e)
             return False
     
+    def save_roi_scores_bulk(self, scores: Dict[str, Dict]) -> int:
+        """Upsert ROI scores ({address: save_roi_score kwargs}) in SAVE_CHUNK_SIZE batches.
+        
+        Whales without an id (not saved yet) are skipped, as in save_roi_score. Returns rows written.
+        """
+        rows = []
+        for address, roi in scores.items():
+            whale_id = self._get_whale_id(address)
+            if whale_id is None:
+                log.info("Whale %s not found for ROI score", address)
+                continue
+            rows.append(self._roi_row(whale_id, address, **roi))
+        
+        written = 0
+        for i in range(0, len(rows), SAVE_CHUNK_SIZE):
+            chunk = rows[i:i + SAVE_CHUNK_SIZE]
+            try:
+                self.client.table('whale_roi_scores').upsert(
+                    chunk, on_conflict='whale_address', returning='minimal'
+                ).execute()
+                written += len(chunk)
+            except Exception as e:
+                log.warning("Error bulk saving %d ROI scores: %s", len(chunk), e)
+        return written
+    
     def save_transaction(self, whale_address: str, tx_data: Dict) -> bool:
         """Save whale transaction"""
         try:
             # Get whale ID
-            whale = self.get_whale_by_address(whale_address)
-            if not whale:
+            whale_id = self._get_whale_id(whale_address)
+            if whale_id is None:
                 return False
             
             transaction_data = {
-                'whale_id': whale['id'],
+                'whale_id': whale_id,
                 'address': whale_address,
                 **tx_data,
-                'created_at': datetime.utcnow().isoformat()
+                'created_at': _utcnow().isoformat()
             }
             
             result = self.client.table('whale_transactions').insert(transaction_data).execute()
             return len(result.data) > 0
             
         except Exception as e:
-            print(f"Error saving transaction for {whale_address}: {e}")
+            log.warning("Error saving transaction for %s: %s", whale_address, e)
             return False
     
     def get_whale_transactions(self, address: str, limit: int = 100) -> List[Dict]:
@@ -141,27 +271,21 @@ class WhaleRepository:
             
             return result.data
         except Exception as e:
-            print(f"Error getting transactions for {address}: {e}")
+            log.warning("Error getting transactions for %s: %s", address, e)
             return []
     
     def get_stats(self) -> Dict[str, int]:
         """Get database statistics"""
         try:
-            # Count whales
-            whales_result = self.client.table('whales').select('id', count='exact').execute()
-            total_whales = whales_result.count or 0
-            
-            # Count whales with ROI scores  
-            roi_result = self.client.table('whale_roi_scores').select('id', count='exact').execute()
-            whales_with_roi = roi_result.count or 0
-            
-            # Calculate average ROI score manually
-            avg_roi_score = 0
-            if whales_with_roi > 0:
-                roi_scores = self.client.table('whale_roi_scores').select('composite_score').execute()
-                if roi_scores.data:
-                    total_score = sum(row['composite_score'] for row in roi_scores.data if row['composite_score'])
-                    avg_roi_score = total_score / len(roi_scores.data) if roi_scores.data else 0
+            try:
+                res = self.client.rpc('get_whale_stats').execute()
+                row = (res.data or [{}])[0]
+            except Exception as e:
+                log.warning("get_whale_stats RPC unavailable, paging instead: %s", e)
+                row = self._get_stats_paged()
+            total_whales = row.get('total_whales') or 0
+            whales_with_roi = row.get('whales_with_roi') or 0
+            avg_roi_score = row.get('avg_roi_score') or 0
             
             return {
                 'total_whales': total_whales,
@@ -169,8 +293,35 @@ class WhaleRepository:
                 'avg_roi_score': round(float(avg_roi_score), 2)
             }
         except Exception as e:
-            print(f"Error getting stats: {e}")
+            log.warning("Error getting stats: %s", e)
             return {'total_whales': 0, 'whales_with_roi': 0, 'avg_roi_score': 0}
 
+    def _get_stats_paged(self, page_size: int = 1000) -> Dict:
+        """Fallback for get_stats: exact counts plus a streamed mean of composite_score"""
+        whales_result = self.client.table('whales').select('id', count='exact').limit(1).execute()
+        roi_result = self.client.table('whale_roi_scores').select('id', count='exact').limit(1).execute()
+        
+        # Running mean over pages so the score column is never held in memory at once
+        n, mean, offset = 0, 0.0, 0
+        while True:
+            page = self.client.table('whale_roi_scores').select('composite_score') \
+                .order('id').range(offset, offset + page_size - 1).execute()
+            rows = page.data or []
+            for r in rows:
+                x = r.get('composite_score')
+                if x is None:
+                    continue
+                n += 1
+                mean += (float(x) - mean) / n
+            if len(rows) < page_size:
+                break
+            offset += page_size
+        
+        return {
+            'total_whales': whales_result.count or 0,
+            'whales_with_roi': roi_result.count or 0,
+            'avg_roi_score': mean if n else 0,
+        }
+
 # Create singleton instance
 whale_repository = WhaleRepository() if supabase_client else None
\ No newline at end of file
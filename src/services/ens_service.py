@@ -6,11 +6,42 @@ Falls back to cached results; no-op when network disabled.
 """
 
 from __future__ import annotations
-from typing import Optional, Dict, List
+import asyncio
+import json
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
 
+import httpx
+import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+
+try:
+    import redis
+except ImportError:  # optional shared cache tier
+    redis = None
+
 from config import config
-from ..data.smart_money_repository import smart_money_repository
+from ..utils.address_utils import Address, try_normalize_address
+from ..data.smart_money_repository import smart_money_repository, IN_CHUNK_SIZE
+
+ENS_RESOLVE_URL = "https://api.ensideas.com/ens/resolve/{}"
+# In-flight resolver GETs per aresolve_bulk; matches the client's connection limit so queued
+# lookups wait on the semaphore, not on the pool (whose wait counts against the timeout)
+ENS_CONCURRENCY = 32
+_MISS = object()
+
+
+def _create_redis():
+    """Shared cache tier across instances; None unless REDIS_URL is set and redis is installed."""
+    url = getattr(config, 'REDIS_URL', '')
+    if not url or redis is None:
+        return None
+    try:
+        return redis.Redis.from_url(url, socket_timeout=0.5)
+    except Exception as e:
+        print(f"⚠️  Redis unavailable for ENS cache: {e}")
+        return None
 
 
 class ENSService:
@@ -21,71 +52,191 @@ class ENSService:
         self.disable_network = getattr(config, 'SMART_MONEY_DISABLE_NETWORK', False)
         # TTL for cache refresh
         self.ttl_days = 30
+        # Process-local front for ens_cache rows; None records "no row" so misses aren't re-queried
+        self._mem = TTLCache(maxsize=200_000, ttl=3600)
+        # Lookup order: memory -> Redis (shared, optional) -> ens_cache table
+        self._redis = _create_redis()
+        # Keep-alive pool for sync lookups so each resolve doesn't pay a TCP/TLS handshake
+        self._http = requests.Session()
+        self._http.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=32))
+
+    def _redis_get_many(self, addresses: List[str]) -> Dict[str, Dict]:
+        if not self._redis or not addresses:
+            return {}
+        try:
+            values = self._redis.mget([f"ens:{a}" for a in addresses])
+        except Exception:
+            return {}
+        return {a: json.loads(v) for a, v in zip(addresses, values) if v}
 
-    def _get_cached_row(self, address: str) -> Optional[Dict]:
+    def _redis_set_many(self, rows: List[Dict]) -> None:
+        if not self._redis or not rows:
+            return
         try:
-            client = self.repo.client
-            res = client.table('ens_cache').select('*').eq('address', address.lower()).limit(1).execute()
-            if not res.data:
+            pipe = self._redis.pipeline(transaction=False)
+            for row in rows:
+                pipe.setex(f"ens:{row['address']}", self.ttl_days * 86400, json.dumps(row, default=str))
+            pipe.execute()
+        except Exception:
+            pass
+
+    def _remember(self, address: str, ens: Optional[str], last_resolved: str) -> Dict:
+        row = {'address': address, 'ens': ens, 'last_resolved': last_resolved}
+        self._mem[address] = row
+        return row
+
+    def _get_cached_row(self, address: Address) -> Optional[Dict]:
+        row = self._mem.get(address, _MISS)
+        if row is not _MISS:
+            return row
+        row = self._redis_get_many([address]).get(address)
+        if row is None:
+            try:
+                client = self.repo.client
+                res = client.table('ens_cache').select('address,ens,last_resolved').eq('address', address).limit(1).execute()
+            except Exception:
                 return None
-            return res.data[0]
+            row = res.data[0] if res.data else None
+            if row:
+                self._redis_set_many([row])
+        self._mem[address] = row
+        return row
+
+    def _get_cached_rows_bulk(self, addresses: List[str]) -> Dict[str, Dict]:
+        """Fetch ens_cache rows for many addresses (memory, then Redis, then one in_() query per chunk)."""
+        out: Dict[str, Dict] = {}
+        misses = []
+        for addr in addresses:
+            row = self._mem.get(addr, _MISS)
+            if row is _MISS:
+                misses.append(addr)
+            elif row is not None:
+                out[addr] = row
+        shared = self._redis_get_many(misses)
+        for addr, row in shared.items():
+            out[addr] = self._mem[addr] = row
+        misses = [a for a in misses if a not in shared]
+        try:
+            for i in range(0, len(misses), IN_CHUNK_SIZE):
+                chunk = misses[i:i + IN_CHUNK_SIZE]
+                res = self.repo.client.table('ens_cache').select('address,ens,last_resolved').in_(
+                    'address', chunk
+                ).execute()
+                for row in res.data or []:
+                    out[row['address']] = row
+                for addr in chunk:
+                    self._mem[addr] = out.get(addr)
+                self._redis_set_many(res.data or [])
         except Exception:
-            return None
+            pass
+        return out
+
+    def _is_fresh(self, row: Dict) -> bool:
+        last = row.get('last_resolved')
+        if not last:
+            return False
+        try:
+            last_dt = datetime.fromisoformat(str(last).replace('Z', '+00:00')).replace(tzinfo=None)
+        except ValueError:
+            # If parsing fails, trust the cached value
+            return True
+        return datetime.utcnow() - last_dt < timedelta(days=self.ttl_days)
+
+    def _fetch_remote(self, address: str) -> Tuple[bool, Optional[str]]:
+        """Query the public resolver; returns (ok, ens). ok=False means keep the cache."""
+        try:
+            resp = self._http.get(ENS_RESOLVE_URL.format(address), timeout=5)
+            if resp.status_code != 200:
+                return False, None
+            data = resp.json()
+            return True, (data.get('name') or data.get('reverse') or None)
+        except Exception:
+            return False, None
+
+    async def _afetch_remote(self, client: httpx.AsyncClient, sem: asyncio.Semaphore,
+                             address: str) -> Tuple[bool, Optional[str]]:
+        """Async _fetch_remote on a shared keep-alive client."""
+        try:
+            async with sem:
+                resp = await client.get(ENS_RESOLVE_URL.format(address))
+            if resp.status_code != 200:
+                return False, None
+            data = resp.json()
+            return True, (data.get('name') or data.get('reverse') or None)
+        except Exception:
+            return False, None
 
     def cache_update(self, address: str, ens: Optional[str]) -> None:
+        address = try_normalize_address(address)
+        if address is None:
+            return
+        row = self._remember(address, ens or None, datetime.utcnow().isoformat())
+        self._redis_set_many([row])
         try:
-            self.repo.client.table('ens_cache').upsert({
-                'address': address.lower(),
-                'ens': ens or None,
-                'last_resolved': datetime.utcnow().isoformat(),
-            }, on_conflict='address').execute()
+            self.repo.client.table('ens_cache').upsert(row, on_conflict='address').execute()
         except Exception:
             pass
 
     def get_cached(self, address: str) -> Optional[str]:
+        address = try_normalize_address(address)
+        if address is None:
+            return None
         row = self._get_cached_row(address)
         return row.get('ens') if row else None
 
     def resolve(self, address: str, force: bool = False) -> Optional[str]:
-        address = address.lower()
+        # Malformed addresses resolve to None, as in aresolve_bulk
+        address = try_normalize_address(address)
+        if address is None:
+            return None
         # Check cache and TTL
         cached_row = self._get_cached_row(address)
-        if cached_row and not force:
-            try:
-                last = cached_row.get('last_resolved')
-                if last:
-                    last_dt = datetime.fromisoformat(str(last).replace('Z', '+00:00'))
-                    if datetime.utcnow() - last_dt < timedelta(days=self.ttl_days):
-                        return cached_row.get('ens')
-            except Exception:
-                # If parsing fails, return cached value
-                return cached_row.get('ens')
+        if cached_row and not force and self._is_fresh(cached_row):
+            return cached_row.get('ens')
         if self.disable_network:
             return cached_row.get('ens') if cached_row else None
 
         # Try public ENS resolver API
-        try:
-            import requests
-            url = f"https://api.ensideas.com/ens/resolve/{address}"
-            resp = requests.get(url, timeout=5)
-            if resp.status_code != 200:
-                return self.get_cached(address)
-            data = resp.json()
-            ens = data.get('name') or data.get('reverse')
-            if ens:
-                self.cache_update(address, ens)
-                return ens
-            # Cache negative result to avoid repeated calls
-            self.cache_update(address, None)
-            return None
-        except Exception:
+        ok, ens = self._fetch_remote(address)
+        if not ok:
             return cached_row.get('ens') if cached_row else None
+        # Negative results are cached too, to avoid repeated calls
+        self.cache_update(address, ens)
+        return ens
+
+    async def aresolve_bulk(self, addresses: List[str], force: bool = False) -> Dict[str, Optional[str]]:
+        """Resolve many addresses: one cache read, concurrent lookups for stale ones, one upsert."""
+        # Malformed entries map to None in the result rather than failing the batch
+        keys = {addr: try_normalize_address(addr) for addr in addresses}
+        unique = list(dict.fromkeys(k for k in keys.values() if k is not None))
+        cached = self._get_cached_rows_bulk(unique)
+        resolved: Dict[str, Optional[str]] = {a: (cached.get(a) or {}).get('ens') for a in unique}
+
+        stale = [a for a in unique if force or a not in cached or not self._is_fresh(cached[a])]
+        if stale and not self.disable_network:
+            limits = httpx.Limits(max_connections=ENS_CONCURRENCY)
+            async with httpx.AsyncClient(timeout=5, limits=limits) as client:
+                sem = asyncio.Semaphore(ENS_CONCURRENCY)
+                results = await asyncio.gather(*(self._afetch_remote(client, sem, a) for a in stale))
+            now = datetime.utcnow().isoformat()
+            rows = []
+            for addr, (ok, ens) in zip(stale, results):
+                if not ok:
+                    continue
+                resolved[addr] = ens
+                # Negative results are cached too, to avoid repeated calls
+                rows.append(self._remember(addr, ens, now))
+            if rows:
+                self._redis_set_many(rows)
+                try:
+                    self.repo.client.table('ens_cache').upsert(rows, on_conflict='address').execute()
+                except Exception:
+                    pass
+        return {addr: resolved.get(key) if key is not None else None for addr, key in keys.items()}
 
     def resolve_bulk(self, addresses: List[str], force: bool = False) -> Dict[str, Optional[str]]:
-        out: Dict[str, Optional[str]] = {}
-        for addr in addresses:
-            out[addr] = self.resolve(addr, force=force)
-        return out
+        """Sync entry point for aresolve_bulk."""
+        return asyncio.run(self.aresolve_bulk(addresses, force=force))
 
 
 ens_service = ENSService() if smart_money_repository else None
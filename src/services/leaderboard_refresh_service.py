@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Leaderboard Refresh Service
+Background refresh of smart_money_leaderboard_mv so reads never pay for the join
+"""
+
+import threading
+from typing import Optional
+from config import config
+from ..data.smart_money_repository import smart_money_repository
+
+
+class LeaderboardRefreshService:
+    """Refreshes the leaderboard materialized view every N minutes on a daemon thread."""
+
+    def __init__(self):
+        self.repo = smart_money_repository
+        self.interval_min = max(1, config.SMART_MONEY_LEADERBOARD_REFRESH_MIN)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        # Refresh immediately on start, then on each interval until stopped
+        while not self._stop.is_set():
+            self.repo.refresh_leaderboard_mv()
+            self._stop.wait(self.interval_min * 60)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='leaderboard-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# Global instance
+leaderboard_refresh_service = LeaderboardRefreshService() if smart_money_repository else None
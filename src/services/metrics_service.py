@@ -6,10 +6,30 @@ Computes rolling 90d metrics for traders from priced_trades and updates trader_m
 
 from __future__ import annotations
 from typing import Dict, List
-from datetime import datetime
-import math
+
+import numpy as np
 
 from ..data.smart_money_repository import smart_money_repository
+from ..utils.address_utils import try_normalize_address
+
+
+def _trade_stats(nets: np.ndarray) -> Dict:
+    """PnL, win rate, Sharpe proxy and max drawdown for per-trade net USD (in query order)."""
+    n = nets.size
+    if n == 0:
+        return {'pnl': 0.0, 'win_rate': 0.0, 'sharpe': 0.0, 'max_dd': 0.0}
+    # Sharpe: mean/std of per-trade net USD as a simple proxy
+    std = float(nets.std(ddof=1)) if n > 1 else 0.0
+    sharpe = float(nets.mean()) / std if std > 0 else 0.0
+    # Max drawdown on cumulative net; the running peak starts at 0
+    cum = np.cumsum(nets)
+    peaks = np.maximum(np.maximum.accumulate(cum), 0.0)
+    return {
+        'pnl': float(nets.sum()),
+        'win_rate': float((nets > 0).mean()),
+        'sharpe': sharpe,
+        'max_dd': float((peaks - cum).max(initial=0.0)),
+    }
 
 
 class MetricsService:
@@ -18,54 +38,50 @@ class MetricsService:
             raise ValueError("Repository not available")
         self.repo = smart_money_repository
 
-    def compute_for_address(self, address: str, days: int = 90) -> Dict:
-        address = address.lower()
-        trades = self.repo.get_priced_trades_for_address(address, days=days)
-        nets: List[float] = []
-        for t in trades:
-            try:
-                nets.append(float(t.get('usd_in', 0)) - float(t.get('usd_out', 0)))
-            except Exception:
-                continue
-        priced_count = len(nets)
-        pnl = sum(nets) if nets else 0.0
-        win_rate = 0.0
-        sharpe = 0.0
-        max_dd = 0.0
-        if priced_count > 0:
-            wins = sum(1 for n in nets if n > 0)
-            win_rate = wins / priced_count
-            # Sharpe: mean/std of per-trade net USD as a simple proxy
-            mean = pnl / priced_count
-            var = 0.0
-            if priced_count > 1:
-                var = sum((n - mean) ** 2 for n in nets) / (priced_count - 1)
-            std = math.sqrt(var)
-            sharpe = (mean / std) if std > 0 else 0.0
-            # Max drawdown on cumulative net
-            cum = 0.0
-            peak = 0.0
-            for n in nets:
-                cum += n
-                if cum > peak:
-                    peak = cum
-                dd = peak - cum
-                if dd > max_dd:
-                    max_dd = dd
+    @staticmethod
+    def _metrics(usd_in: np.ndarray, usd_out: np.ndarray, cov: Dict) -> Dict:
+        stats = _trade_stats(usd_in - usd_out)
+        return {
+            'priced_trades_count': int(usd_in.size),
+            'coverage_pct': cov.get('coverage_pct', 0.0),
+            'pnl_usd_90d': stats['pnl'],
+            'win_rate': round(stats['win_rate'], 4),
+            'sharpe_90d': round(stats['sharpe'], 4),
+            'max_drawdown_usd': round(stats['max_dd'], 2),
+        }
 
+    def compute_for_address(self, address: str, days: int = 90) -> Dict:
+        """Compute and store metrics for one address; {} if the address is malformed."""
+        address = try_normalize_address(address)
+        if address is None:
+            return {}
+        usd_in, usd_out, _ = self.repo.get_priced_trades_arrays(address, days=days)
         # coverage from candidates table (precomputed)
         cov = self.repo.update_coverage_for_address(address, days=days)
-        metrics = {
-            'priced_trades_count': priced_count,
-            'coverage_pct': cov.get('coverage_pct', 0.0),
-            'pnl_usd_90d': pnl,
-            'win_rate': round(win_rate, 4),
-            'sharpe_90d': round(sharpe, 4),
-            'max_drawdown_usd': round(max_dd, 2),
-        }
+        metrics = self._metrics(usd_in, usd_out, cov)
         self.repo.upsert_trader_metrics(address, metrics, window='90d')
         return metrics
 
+    def compute_for_addresses(self, addresses: List[str], days: int = 90) -> Dict[str, Dict]:
+        """Batch compute_for_address: one trades read, one coverage RPC, one metrics upsert."""
+        normalized = [try_normalize_address(a) for a in addresses]
+        # Skip malformed entries instead of failing the whole batch
+        skipped = [a for a, n in zip(addresses, normalized) if n is None]
+        if skipped:
+            print(f"⚠️  Skipping {len(skipped)} invalid address(es): {skipped[:5]}")
+        addresses = list(dict.fromkeys(n for n in normalized if n is not None))
+        if not addresses:
+            return {}
+        trades = self.repo.get_priced_trades_arrays_bulk(addresses, days=days)
+        coverage = self.repo.update_coverage_bulk(addresses, days=days)
+        empty = np.empty(0, dtype=np.float64)
+        out = {}
+        for addr in addresses:
+            usd_in, usd_out = trades.get(addr, (empty, empty))
+            out[addr] = self._metrics(usd_in, usd_out, coverage.get(addr, {}))
+        self.repo.upsert_trader_metrics_bulk([{'address': a, **m} for a, m in out.items()], window='90d')
+        return out
+
 
 metrics_service = MetricsService() if smart_money_repository else None
 
@@ -8,11 +8,118 @@ Current implementation provides structure with safe fallbacks when network is di
 from __future__ import annotations
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+import asyncio
+import functools
+import json
 import time
 
+import httpx
+import requests
+from cachetools import LRUCache, TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # optional faster JSON decode
+    orjson = None
+
 from config import config
 from ..data.smart_money_repository import smart_money_repository
 
+# Max calls per JSON-RPC batch POST (common provider limit)
+RPC_BATCH_SIZE = 100
+# Max in-flight RPC POSTs per price_address run
+RPC_CONCURRENCY = 32
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+_MISS = object()
+# Response/log decoding; orjson parses large receipt payloads several times faster
+_json_loads = orjson.loads if orjson else json.loads
+# Trade side keyed by (usd_out > usd_in, usd_in > usd_out)
+SIDE_TABLE = {(True, False): 'buy', (False, True): 'sell', (False, False): 'route'}
+# Hour buckets younger than this are "live": their cached prices expire after LIVE_PRICE_TTL_SEC,
+# while older buckets are cached indefinitely
+LIVE_BUCKET_HOURS = 2
+LIVE_PRICE_TTL_SEC = 60
+# tx_receipts_cache columns needed for pricing when decoded transfers are stored
+RECEIPT_META_COLUMNS = 'tx_hash,block_number,block_ts,status,from_address,to_address,value_wei'
+
+
+# Hardcoded stablecoins for mainnet (address -> decimals)
+STABLECOINS: Dict[str, int] = {
+    '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48': 6,   # USDC
+    '0xdac17f958d2ee523a2206206994597c13d831ec7': 6,   # USDT
+    '0x6b175474e89094c44da98b954eedeac495271d0f': 18,  # DAI
+}
+# Leading tokens (address -> decimals) used for parsing logs.
+# Pricing without external APIs will fall back to stable legs only.
+TOKEN_INFO: Dict[str, Tuple[int, str]] = {
+    '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2': (18, ''),  # WETH
+    '0x2260fac5e5542a773aa44fbcfedf7c193bc2c599': (8, ''),   # WBTC
+    '0x514910771af9ca656af840dff83e8264ecf986ca': (18, ''),  # LINK
+    '0x1f9840a85d5af5bf1d1762f925bdaddc4201f984': (18, ''),  # UNI
+    '0x7fc66500c84a76ad7e9c93437bfc5ac33e2ddae9': (18, ''),  # AAVE
+    '0x5a98fcbea516cf06857215779fd812ca3bef1b32': (18, ''),  # LDO
+    '0xae7ab96520de3a18e5e111b5eaab095312d7fe84': (18, ''),  # stETH
+    '0xae78736cd615f374d3085123a210448e74fc6393': (18, ''),  # rETH
+    '0x9f8f72aa9304c8b593d555f12ef6589cc3a579a2': (18, ''),  # MKR
+    '0xc011a72400e58ecd99ee497cf89e3775d4bd732f': (18, ''),  # SNX
+    '0xd533a949740bb3306d119cc777fa900ba034cd52': (18, ''),  # CRV
+    '0xba100000625a3754423978a60c9317c58a424e3d': (18, ''),  # BAL
+    '0x95ad61b0a150d79219dcf64e1e6cc01f0b64c4ce': (18, ''),  # SHIB
+    '0x6982508145454ce325ddbe47a25d4ec3d2311933': (18, ''),  # PEPE
+    '0x912ce59144191c1204e64559fe8253a0e49e6548': (18, ''),  # ARB
+    '0x0a3f6849f78076aefaDf113F5BED87720274dDC0': (18, ''),  # OP
+}
+# Flattened lookups for the per-log loop (keys lowercased to match decoded tokens)
+_STABLE_SET = frozenset(a.lower() for a in STABLECOINS)
+_DECIMALS: Dict[str, int] = {
+    **{a.lower(): info[0] for a, info in TOKEN_INFO.items()},
+    **{a.lower(): dec for a, dec in STABLECOINS.items()},
+}
+_POW10 = {d: 10 ** d for d in range(37)}
+
+
+@functools.lru_cache(maxsize=1024)
+def _hour_bucket(ts_iso: str) -> str:
+    """Hour bucket (ISO, Z-suffixed) for a trade timestamp; trades in a run share few buckets."""
+    ts = int(datetime.fromisoformat(ts_iso.replace('Z', '+00:00')).timestamp())
+    bucket_dt = datetime.utcfromtimestamp(ts).replace(minute=0, second=0, microsecond=0)
+    return bucket_dt.isoformat() + 'Z'
+
+
+def _bucket_age_hours(bucket_iso: str) -> float:
+    """Hours between an hour bucket (as from _hour_bucket) and now."""
+    bucket_dt = datetime.fromisoformat(bucket_iso.replace('Z', ''))
+    return (datetime.utcnow() - bucket_dt).total_seconds() / 3600
+
+
+def _decode_transfers(tx_hash: str, logs) -> List[Dict]:
+    """ERC-20 Transfer logs as receipt_transfers rows (lowercase addresses, integer amounts)."""
+    if isinstance(logs, str):
+        logs = _json_loads(logs)
+    rows = []
+    for i, log in enumerate(logs or []):
+        topics = log.get('topics') or []
+        # ERC-20 Transfer has exactly 3 topics (ERC-721 indexes the id as a 4th);
+        # topics[0] is lowercased when the receipt is cached, so compare directly
+        if len(topics) != 3 or topics[0] != TRANSFER_TOPIC:
+            continue
+        try:
+            amount_wei = int((log.get('data') or '0x0'), 16)
+        except ValueError:
+            continue
+        rows.append({
+            'tx_hash': tx_hash,
+            'log_index': i,
+            'token': (log.get('address') or '').lower(),
+            'from_addr': '0x' + (topics[1] or '')[-40:].lower(),
+            'to_addr': '0x' + (topics[2] or '')[-40:].lower(),
+            'amount_wei': amount_wei,
+        })
+    return rows
+
 
 class PricingService:
     def __init__(self):
@@ -23,43 +130,95 @@ class PricingService:
         self.etherscan_key = getattr(config, 'ETHERSCAN_API_KEY', '')
         self.disable_network = getattr(config, 'SMART_MONEY_DISABLE_NETWORK', False)
         self.request_timeout = getattr(config, 'SMART_MONEY_BACKFILL_REQUEST_TIMEOUT_SEC', 8.0)
+        # Keep-alive pool for 0x price calls; RPC goes through the per-run httpx client
+        self._http = requests.Session()
+        self._http.mount('https://', HTTPAdapter(
+            pool_connections=32, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.3)
+        ))
+        # (token, hour bucket) -> USD price or None; misses are remembered so an unpriceable
+        # token doesn't cost a DB read and a 0x call on every log that mentions it
+        self._price_mem = TTLCache(maxsize=10_000, ttl=600)
+        self._live_price_mem = TTLCache(maxsize=1_000, ttl=LIVE_PRICE_TTL_SEC)
+        # tx_hash -> (receipt row sans logs, decoded transfers, tx fields); mined receipts don't
+        # change, so warm re-runs (e.g. coverage recompute) skip the cache tables entirely
+        self._receipt_mem = LRUCache(maxsize=20_000)
+        # Flipped off the first time the provider answers eth_getBlockReceipts with method-not-found
+        self._supports_block_receipts = True
         # Optional external price API (current spot only). Uses 0x public price endpoint.
         # Set env SMART_MONEY_DISABLE_NETWORK=1 to fully disable external calls.
         self.enable_price_api = not getattr(config, 'SMART_MONEY_DISABLE_NETWORK', False)
-        # Hardcoded stablecoins for mainnet (address -> decimals)
-        self.stablecoins: Dict[str, int] = {
-            '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48': 6,   # USDC
-            '0xdac17f958d2ee523a2206206994597c13d831ec7': 6,   # USDT
-            '0x6b175474e89094c44da98b954eedeac495271d0f': 18,  # DAI
-        }
-        # Leading tokens (address -> decimals) used for parsing logs.
-        # Pricing without external APIs will fall back to stable legs only.
-        self.token_info: Dict[str, Tuple[int, str]] = {
-            '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2': (18, ''),  # WETH
-            '0x2260fac5e5542a773aa44fbcfedf7c193bc2c599': (8, ''),   # WBTC
-            '0x514910771af9ca656af840dff83e8264ecf986ca': (18, ''),  # LINK
-            '0x1f9840a85d5af5bf1d1762f925bdaddc4201f984': (18, ''),  # UNI
-            '0x7fc66500c84a76ad7e9c93437bfc5ac33e2ddae9': (18, ''),  # AAVE
-            '0x5a98fcbea516cf06857215779fd812ca3bef1b32': (18, ''),  # LDO
-            '0xae7ab96520de3a18e5e111b5eaab095312d7fe84': (18, ''),  # stETH
-            '0xae78736cd615f374d3085123a210448e74fc6393': (18, ''),  # rETH
-            '0x9f8f72aa9304c8b593d555f12ef6589cc3a579a2': (18, ''),  # MKR
-            '0xc011a72400e58ecd99ee497cf89e3775d4bd732f': (18, ''),  # SNX
-            '0xd533a949740bb3306d119cc777fa900ba034cd52': (18, ''),  # CRV
-            '0xba100000625a3754423978a60c9317c58a424e3d': (18, ''),  # BAL
-            '0x95ad61b0a150d79219dcf64e1e6cc01f0b64c4ce': (18, ''),  # SHIB
-            '0x6982508145454ce325ddbe47a25d4ec3d2311933': (18, ''),  # PEPE
-            '0x912ce59144191c1204e64559fe8253a0e49e6548': (18, ''),  # ARB
-            '0x0a3f6849f78076aefaDf113F5BED87720274dDC0': (18, ''),  # OP
-        }
 
     def price_address(self, address: str, days: int = 90, time_budget_sec: int = 120, debug: bool = False) -> Dict:
         """Price recent interactions for a single address (bounded)."""
+        return asyncio.run(self.price_address_async(address, days=days, time_budget_sec=time_budget_sec, debug=debug))
+
+    async def price_address_async(self, address: str, days: int = 90, time_budget_sec: int = 120, debug: bool = False) -> Dict:
+        """price_address with receipt and tx batches fetched concurrently over one keep-alive client."""
         start = time.time()
         address = address.lower()
         interactions = self.repo.get_recent_interactions_for_address(address, days=days, limit=2000)
+        # Prefetch: one cache read for all hashes, then batched RPC for receipt misses and txs
+        tx_hashes = list(dict.fromkeys(h for h in ((it.get('tx_hash') or '').lower() for it in interactions) if h))
+        warm = {}
+        for h in tx_hashes:
+            entry = self._receipt_mem.get(h)
+            if entry is not None:
+                warm[h] = entry
+        tx_hashes = [h for h in tx_hashes if h not in warm]
+        # Cached receipts without logs_json; logs are only pulled for receipts never decoded
+        receipts = self.repo.get_cached_receipts_bulk(tx_hashes, columns=RECEIPT_META_COLUMNS)
+        transfers = self.repo.get_receipt_transfers_bulk(list(receipts))
+        undecoded = [h for h in receipts if h not in transfers]
+        if undecoded:
+            for h, row in self.repo.get_cached_receipts_bulk(undecoded, columns='tx_hash,logs_json').items():
+                receipts[h]['logs_json'] = row.get('logs_json')
+        # ETH value legs come from the cached value_wei when present (from/to match the tx's)
+        txs: Dict[str, Dict] = {
+            h: {'from': r.get('from_address'), 'to': r.get('to_address'), 'value': int(r['value_wei'])}
+            for h, r in receipts.items() if r.get('value_wei') is not None
+        }
+        if not self.disable_network and self.eth_rpc_url:
+            missing = [h for h in tx_hashes if h not in receipts]
+            # Rows cached before value_wei existed still need the tx itself
+            legacy = [h for h in receipts if h not in txs]
+            block_of = {(it.get('tx_hash') or '').lower(): it.get('block_number') for it in interactions}
+            limits = httpx.Limits(max_connections=RPC_CONCURRENCY, max_keepalive_connections=RPC_CONCURRENCY)
+            async with httpx.AsyncClient(timeout=self.request_timeout, limits=limits) as client:
+                sem = asyncio.Semaphore(RPC_CONCURRENCY)
+                (receipt_results, fetched_txs), legacy_results = await asyncio.gather(
+                    self._afetch_receipts(client, sem, missing, block_of),
+                    self._arpc_batch(client, sem, 'eth_getTransactionByHash', [[h] for h in legacy]),
+                )
+            receipts.update(self._cache_receipts(missing, receipt_results, fetched_txs))
+            txs.update(fetched_txs)
+            txs.update((h, tx) for h, tx in zip(legacy, legacy_results) if tx)
+        # Decode receipts that have no stored transfers yet, once, and store the rows
+        new_rows = []
+        for h, rec in receipts.items():
+            if h not in transfers:
+                transfers[h] = _decode_transfers(h, rec.get('logs_json'))
+                new_rows.extend(transfers[h])
+        if new_rows:
+            self.repo.save_receipt_transfers(new_rows)
+        for h, rec in receipts.items():
+            # Without the tx, a later run must still fetch it, so only complete entries are kept
+            if h in txs:
+                meta = {k: v for k, v in rec.items() if k != 'logs_json'}
+                self._receipt_mem[h] = (meta, transfers[h], txs[h])
+        for h, (rec, tr, tx) in warm.items():
+            receipts[h], transfers[h], txs[h] = rec, tr, tx
+        return self._price_interactions(address, days, interactions, receipts, transfers, txs,
+                                        start, time_budget_sec, debug)
+
+    def _price_interactions(self, address: str, days: int, interactions: List[Dict], receipts: Dict[str, Dict],
+                            transfers: Dict[str, List[Dict]], txs: Dict[str, Dict], start: float,
+                            time_budget_sec: int, debug: bool) -> Dict:
+        """Price prefetched receipts/txs, queue priced_trades and refresh coverage (address lowercased)."""
         priced_count = 0
         checked = 0
+        # One fallback timestamp per batch rather than per trade
+        now_iso = datetime.utcnow().isoformat()
+        queue_trade = self.repo.queue_priced_trade
         for it in interactions:
             if time.time() - start > time_budget_sec:
                 break
@@ -69,46 +228,44 @@ class PricingService:
             if not tx_hash:
                 continue
             checked += 1
-            # Try cache
-            cached = self.repo.get_cached_receipt(tx_hash)
-            if not cached and self.disable_network:
-                # Skip pricing without network; rely on existing priced_trades if any
-                continue
+            cached = receipts.get(tx_hash)
             if not cached:
-                rec = self._fetch_and_cache_receipt(tx_hash)
-                if not rec:
-                    if debug and checked <= 5:
-                        print(f"   ⚠️  No receipt for {tx_hash[:10]}...")
-                    continue
-                cached = rec
+                # Without network, rely on existing priced_trades if any
+                if debug and checked <= 5 and not self.disable_network:
+                    print(f"   ⚠️  No receipt for {tx_hash[:10]}...")
+                continue
 
-            usd_in, usd_out, match_info = self._price_from_cached_receipt(cached, address, ts, debug=(debug and checked <= 10))
+            usd_in, usd_out, match_info = self._price_from_cached_receipt(
+                cached, address, ts, debug=(debug and checked <= 10), transfers=transfers.get(tx_hash)
+            )
             # Add ETH value leg if present in tx
-            eth_in, eth_out = self._get_eth_value_legs(tx_hash, address, ts)
+            eth_in, eth_out = self._eth_value_legs(txs.get(tx_hash), address, ts)
             usd_in += eth_in
             usd_out += eth_out
             if usd_in == 0 and usd_out == 0:
                 if debug and checked <= 10:
                     print(f"   ⋯ No USD legs for {tx_hash[:10]}... | matches={match_info.get('matches',0)}")
                 continue
-            side = 'buy' if usd_out > usd_in else ('sell' if usd_in > usd_out else 'route')
+            side = SIDE_TABLE[(usd_out > usd_in, usd_in > usd_out)]
             trade = {
-                'address': address.lower(),
+                'address': address,
                 'tx_hash': tx_hash,
                 'router': router,
                 'block_number': cached.get('block_number'),
-                'block_ts': ts or cached.get('block_ts') or datetime.utcnow().isoformat(),
+                'block_ts': ts or cached.get('block_ts') or now_iso,
                 'side': side,
                 'usd_in': float(usd_in),
                 'usd_out': float(usd_out),
                 'pricing_method': 'stable_leg',
                 'pricing_confidence': 1.0,
             }
-            if self.repo.upsert_priced_trade(trade):
-                if debug:
-                    print(f"   ✅ Priced {tx_hash[:10]}...  side={side}  usd_in={usd_in:.2f}  usd_out={usd_out:.2f}")
-                priced_count += 1
+            priced_count += queue_trade(trade)
+            if debug:
+                print(f"   ✅ Priced {tx_hash[:10]}...  side={side}  usd_in={usd_in:.2f}  usd_out={usd_out:.2f}")
 
+        # Coverage reads priced_trades, so flush the batch first
+        priced_count += self.repo.flush_priced_trades()
+        self.repo.flush_token_prices()
         cov = self.repo.update_coverage_for_address(address, days=days)
         return {
             'address': address,
@@ -117,96 +274,171 @@ class PricingService:
             **cov,
         }
 
-    def _fetch_and_cache_receipt(self, tx_hash: str) -> Optional[Dict]:
-        try:
-            if not self.eth_rpc_url:
-                return None
-            payload = {
-                'jsonrpc': '2.0',
-                'id': 1,
-                'method': 'eth_getTransactionReceipt',
-                'params': [tx_hash],
-            }
-            import requests
-            resp = requests.post(self.eth_rpc_url, json=payload, timeout=self.request_timeout)
-            if resp.status_code != 200:
-                return None
-            data = resp.json().get('result')
+    async def _arpc_batch(self, client: httpx.AsyncClient, sem: asyncio.Semaphore,
+                          method: str, params_list: List[List]) -> List[Optional[Dict]]:
+        """JSON-RPC batch POSTs of up to RPC_BATCH_SIZE calls, sent concurrently; results in input order."""
+        results: List[Optional[Dict]] = [None] * len(params_list)
+
+        async def post(offset: int) -> None:
+            batch = [
+                {'jsonrpc': '2.0', 'id': offset + i, 'method': method, 'params': params}
+                for i, params in enumerate(params_list[offset:offset + RPC_BATCH_SIZE])
+            ]
+            try:
+                async with sem:
+                    resp = await client.post(self.eth_rpc_url, json=batch)
+                if resp.status_code != 200:
+                    return
+                body = _json_loads(resp.content)
+            except Exception as e:
+                print(f"RPC batch {method} failed: {e}")
+                return
+            # Responses may come back in any order; match them up by id
+            for item in body if isinstance(body, list) else []:
+                if method == 'eth_getBlockReceipts' and (item.get('error') or {}).get('code') == -32601:
+                    self._supports_block_receipts = False
+                idx = item.get('id')
+                if isinstance(idx, int) and 0 <= idx < len(results):
+                    results[idx] = item.get('result')
+
+        await asyncio.gather(*(post(offset) for offset in range(0, len(params_list), RPC_BATCH_SIZE)))
+        return results
+
+    async def _afetch_receipts(self, client: httpx.AsyncClient, sem: asyncio.Semaphore, tx_hashes: List[str],
+                               block_of: Dict[str, Optional[int]]) -> Tuple[List[Optional[Dict]], Dict[str, Dict]]:
+        """Receipts and txs for tx_hashes; per-block calls for blocks holding several of them.
+
+        Such blocks get one eth_getBlockReceipts and one full eth_getBlockByNumber.
+        Lone txs, txs without a known block, and anything a block call didn't return
+        go through batched eth_getTransactionReceipt / eth_getTransactionByHash.
+        Returns (receipts in tx_hashes order, tx_hash -> tx).
+        """
+        by_block: Dict[int, List[str]] = {}
+        if self._supports_block_receipts:
+            for h in tx_hashes:
+                if block_of.get(h) is not None:
+                    by_block.setdefault(int(block_of[h]), []).append(h)
+            # A whole block's receipts only pay off when several of our txs are in it
+            by_block = {b: hs for b, hs in by_block.items() if len(hs) > 1}
+        grouped = {h for hs in by_block.values() for h in hs}
+        singles = [h for h in tx_hashes if h not in grouped]
+
+        blocks = list(by_block)
+        block_results, body_results, single_results, single_txs = await asyncio.gather(
+            self._arpc_batch(client, sem, 'eth_getBlockReceipts', [[hex(b)] for b in blocks]),
+            self._arpc_batch(client, sem, 'eth_getBlockByNumber', [[hex(b), True] for b in blocks]),
+            self._arpc_batch(client, sem, 'eth_getTransactionReceipt', [[h] for h in singles]),
+            self._arpc_batch(client, sem, 'eth_getTransactionByHash', [[h] for h in singles]),
+        )
+        found: Dict[str, Dict] = dict(zip(singles, single_results))
+        txs: Dict[str, Dict] = {h: tx for h, tx in zip(singles, single_txs) if tx}
+        for block, block_receipts, body in zip(blocks, block_results, body_results):
+            wanted = set(by_block[block])
+            for rec in block_receipts or []:
+                h = (rec.get('transactionHash') or '').lower()
+                if h in wanted:
+                    found[h] = rec
+            for tx in (body or {}).get('transactions') or []:
+                h = (tx.get('hash') or '').lower() if isinstance(tx, dict) else ''
+                if h in wanted:
+                    txs[h] = tx
+        retry = [h for h in grouped if not found.get(h)]
+        retry_txs = [h for h in grouped if h not in txs]
+        if retry or retry_txs:
+            retry_results, retry_tx_results = await asyncio.gather(
+                self._arpc_batch(client, sem, 'eth_getTransactionReceipt', [[h] for h in retry]),
+                self._arpc_batch(client, sem, 'eth_getTransactionByHash', [[h] for h in retry_txs]),
+            )
+            found.update(zip(retry, retry_results))
+            txs.update((h, tx) for h, tx in zip(retry_txs, retry_tx_results) if tx)
+        return [found.get(h) for h in tx_hashes], txs
+
+    def _cache_receipts(self, tx_hashes: List[str], results: List[Optional[Dict]],
+                        txs: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Parse receipt results and cache them, with each tx's ETH value, in one bulk upsert."""
+        out: Dict[str, Dict] = {}
+        rows = []
+        now_iso = datetime.utcnow().isoformat()
+        for tx_hash, data in zip(tx_hashes, results):
             if not data:
-                return None
+                continue
             block_number = int(data.get('blockNumber', '0x0'), 16) if data.get('blockNumber') else None
             status_hex = data.get('status') or '0x1'
             status = 1 if status_hex == '0x1' else 0
             logs = data.get('logs') or []
-            self.repo.upsert_receipt_cache(
+            for log in logs:
+                topics = log.get('topics')
+                if topics and topics[0]:
+                    topics[0] = topics[0].lower()
+            tx = txs.get(tx_hash)
+            rows.append(self.repo._receipt_row(
                 tx_hash=tx_hash,
-                block_ts=datetime.utcnow().isoformat(),
+                block_ts=now_iso,
                 status=status,
                 logs_json=logs,
                 meta={
                     'block_number': block_number,
                     'from_address': (data.get('from') or '').lower(),
                     'to_address': (data.get('to') or '').lower(),
+                    'value_wei': int(tx.get('value') or '0x0', 16) if tx else None,
                 },
-            )
-            return {
+            ))
+            out[tx_hash] = {
                 'tx_hash': tx_hash,
                 'block_number': block_number,
                 'status': status,
                 'logs_json': logs,
             }
-        except Exception as e:
-            print(f"Receipt fetch failed for {tx_hash}: {e}")
-            return None
+        if rows:
+            self.repo.upsert_receipt_cache_bulk(rows)
+        return out
 
-    def _price_from_cached_receipt(self, cached: Dict, wallet: str, ts_iso: Optional[str], debug: bool = False) -> Tuple[float, float, Dict]:
+    def _price_from_cached_receipt(self, cached: Dict, wallet: str, ts_iso: Optional[str], debug: bool = False,
+                                   transfers: Optional[List[Dict]] = None) -> Tuple[float, float, Dict]:
         try:
             wallet_lc = wallet.lower()
-            logs = cached.get('logs_json') or []
-            if isinstance(logs, str):
-                import json as _json
-                logs = _json.loads(logs)
-            TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+            if transfers is None:
+                transfers = _decode_transfers(cached.get('tx_hash'), cached.get('logs_json'))
+            # Keep only transfers touching the wallet: (token, incoming, amount_wei)
+            legs = []
+            for t in transfers:
+                if t['to_addr'] == wallet_lc:
+                    legs.append((t['token'], True, int(t['amount_wei'])))
+                elif t['from_addr'] == wallet_lc:
+                    legs.append((t['token'], False, int(t['amount_wei'])))
+            # With a stable leg on both sides the stables alone price the trade, so non-stable
+            # legs need no price lookup; otherwise they are converted at the token's USD price
+            stable_sides = {incoming for token, incoming, _ in legs if token in _STABLE_SET}
+            stables_only = len(stable_sides) == 2
+            if stables_only:
+                legs = [leg for leg in legs if leg[0] in _STABLE_SET]
+            # One bucket per receipt; warm the repo price cache for its non-stable tokens in one query
+            price_tokens = {token for token, _, _ in legs if token not in _STABLE_SET}
+            bucket_iso = self._price_bucket_iso(ts_iso) if price_tokens else None
+            if len(price_tokens) > 1:
+                self.repo.get_cached_token_prices_bulk([(t, bucket_iso) for t in price_tokens])
             usd_in = 0.0
             usd_out = 0.0
             matches = 0
-            for log in logs:
-                topics = log.get('topics') or []
-                if not topics or (topics[0] or '').lower() != TRANSFER_TOPIC:
-                    continue
-                token = (log.get('address') or '').lower()
-                dec = self.stablecoins.get(token)
-                # If not a stable, try known leading tokens; else default 18
-                if dec is None:
-                    if token in self.token_info:
-                        dec = self.token_info[token][0]
-                    else:
-                        dec = 18
-                from_topic = topics[1] if len(topics) > 1 else ''
-                to_topic = topics[2] if len(topics) > 2 else ''
-                from_addr = '0x' + from_topic[-40:].lower() if from_topic else ''
-                to_addr = '0x' + to_topic[-40:].lower() if to_topic else ''
-                try:
-                    value_wei = int((log.get('data') or '0x0'), 16)
-                except Exception:
-                    value_wei = 0
-                amount = value_wei / (10 ** dec)
+            for token, incoming, value_wei in legs:
+                # Stables and known leading tokens; else default 18
+                amount = value_wei / _POW10[_DECIMALS.get(token, 18)]
                 if amount <= 0:
                     continue
-                # For non-stables, fetch price and convert to USD
-                if token in self.stablecoins:
-                    price_usd = 1.0
+                # Stables count at face value; others are converted at the token's USD price
+                if token in _STABLE_SET:
+                    usd = amount
                 else:
-                    price_usd = self._get_token_price_usd(token, ts_iso)
+                    price_usd = self._get_token_price_usd(token, ts_iso, bucket_iso=bucket_iso)
                     if price_usd is None:
                         # If no price, skip contribution
                         continue
-                if to_addr == wallet_lc:
-                    usd_in += amount * price_usd
-                    matches += 1
-                elif from_addr == wallet_lc:
-                    usd_out += amount * price_usd
-                    matches += 1
+                    usd = amount * price_usd
+                if incoming:
+                    usd_in += usd
+                else:
+                    usd_out += usd
+                matches += 1
             if debug:
                 print(f"     ↳ transfers matched={matches}  usd_in={usd_in:.2f}  usd_out={usd_out:.2f}")
             return usd_in, usd_out, {'matches': matches}
@@ -214,26 +446,17 @@ class PricingService:
             print(f"Pricing parse failed: {e}")
             return 0.0, 0.0
 
-    def _get_eth_value_legs(self, tx_hash: str, wallet: str, ts_iso: Optional[str]) -> Tuple[float, float]:
-        """Fetch transaction to derive ETH value sent/received by wallet and convert to USD."""
+    def _eth_value_legs(self, tx: Optional[Dict], wallet: str, ts_iso: Optional[str]) -> Tuple[float, float]:
+        """ETH value sent/received by wallet in an already-fetched transaction, in USD."""
         try:
-            if not self.eth_rpc_url:
+            if not tx:
                 return 0.0, 0.0
-            payload = {
-                'jsonrpc': '2.0',
-                'id': 1,
-                'method': 'eth_getTransactionByHash',
-                'params': [tx_hash],
-            }
-            import requests
-            resp = requests.post(self.eth_rpc_url, json=payload, timeout=self.request_timeout)
-            if resp.status_code != 200:
-                return 0.0, 0.0
-            tx = resp.json().get('result') or {}
             from_addr = (tx.get('from') or '').lower()
             to_addr = (tx.get('to') or '').lower()
+            # Hex from RPC, already an int when rebuilt from the receipt cache
+            value = tx.get('value') or 0
             try:
-                val_wei = int((tx.get('value') or '0x0'), 16)
+                val_wei = int(value, 16) if isinstance(value, str) else int(value)
             except Exception:
                 val_wei = 0
             eth_amount = val_wei / 1e18
@@ -254,30 +477,39 @@ class PricingService:
     def _get_eth_price_usd(self, ts_iso: Optional[str]) -> Optional[float]:
         return self._get_token_price_usd('eth', ts_iso)
 
-    def _get_token_price_usd(self, token_address_or_eth: str, ts_iso: Optional[str]) -> Optional[float]:
+    def _price_bucket_iso(self, ts_iso: Optional[str]) -> str:
+        """Hour bucket (ISO, Z-suffixed) used as the token_prices cache key."""
+        if ts_iso:
+            return _hour_bucket(ts_iso)
+        bucket_dt = datetime.utcfromtimestamp(int(time.time())).replace(minute=0, second=0, microsecond=0)
+        return bucket_dt.isoformat() + 'Z'
+
+    def _get_token_price_usd(self, token_address_or_eth: str, ts_iso: Optional[str],
+                             bucket_iso: Optional[str] = None) -> Optional[float]:
         """Get USD price for token.
         Order: DB cache -> external spot price (0x) -> None.
         """
         try:
-            if not ts_iso:
-                ts = int(time.time())
-            else:
-                ts = int(datetime.fromisoformat(ts_iso.replace('Z', '+00:00')).timestamp())
-            bucket_dt = datetime.utcfromtimestamp(ts).replace(minute=0, second=0, microsecond=0)
-            bucket_iso = bucket_dt.isoformat() + 'Z'
+            bucket_iso = bucket_iso or self._price_bucket_iso(ts_iso)
             key_addr = token_address_or_eth.lower()
-            cached = self.repo.get_cached_token_price(key_addr, bucket_iso)
-            if cached is not None:
-                return cached
+            key = (key_addr, bucket_iso)
+            live = _bucket_age_hours(bucket_iso) < LIVE_BUCKET_HOURS
+            mem = self._live_price_mem if live else self._price_mem
+            price = mem.get(key, _MISS)
+            if price is not _MISS:
+                return price
+            price = self.repo.get_cached_token_price(key_addr, bucket_iso)
 
             # External spot price (current) as fallback for MVP
-            if self.enable_price_api:
+            if price is None and self.enable_price_api:
                 spot = self._fetch_spot_price_usd_via_zeroex(key_addr)
                 if spot is not None:
                     # Cache under current hour bucket
-                    self.repo.upsert_token_price(key_addr, bucket_iso, float(spot), source='0x')
-                    return float(spot)
-            return None
+                    price = float(spot)
+                    self.repo.queue_token_price(key_addr, bucket_iso, price, source='0x',
+                                                ttl_sec=LIVE_PRICE_TTL_SEC if live else None)
+            mem[key] = price
+            return price
         except Exception as e:
             print(f"Price lookup failed: {e}")
             return None
@@ -287,7 +519,6 @@ class PricingService:
         Returns price in USD or None.
         """
         try:
-            import requests
             usdc = '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48'
             if token_address_or_eth == 'eth':
                 # Use native ETH shorthand for clarity with 0x
@@ -295,7 +526,7 @@ class PricingService:
                 decimals = 18
             else:
                 token = token_address_or_eth
-                decimals = self.stablecoins.get(token) or self.token_info.get(token, (18, ''))[0]
+                decimals = _DECIMALS.get(token, 18)
             # Sell 1 token to get USDC price
             sell_amount = str(10 ** int(decimals))
             url = 'https://api.0x.org/swap/v1/price'
@@ -312,19 +543,25 @@ class PricingService:
                 headers['0x-api-key'] = api_key
             # Use v2 semantics for consistency with newer 0x endpoints
             headers['0x-version'] = 'v2'
-            resp = requests.get(url, params=params, headers=headers, timeout=self.request_timeout)
+            resp = self._http.get(url, params=params, headers=headers, timeout=self.request_timeout)
             if resp.status_code != 200:
                 return None
-            data = resp.json()
+            data = _json_loads(resp.content)
             # price = buyToken per 1 sellToken (i.e., USDC per token)
             price = float(data.get('price')) if data.get('price') is not None else None
             return price
         except Exception:
             return None
 
+    def close(self) -> None:
+        """Release pooled HTTP connections."""
+        self._http.close()
+
 
-# Global instance
-pricing_service = PricingService() if smart_money_repository else None
+@functools.lru_cache(maxsize=1)
+def get_pricing_service() -> Optional[PricingService]:
+    """Shared PricingService, built on first use rather than at import."""
+    return PricingService() if smart_money_repository else None
 
     
     
@@ -5,53 +5,63 @@ Business service for ROI calculations and whale scoring
 """
 
 import random
-from typing import Dict
+from typing import Dict, Optional
 from datetime import datetime
 
+import numpy as np
+
+# Per whale type draw ranges, rows indexed by _whale_kind:
+# (roi_lo, roi_hi, volume_multiplier, consistency_lo, consistency_hi)
+_ROI_PROFILES = np.array([
+    (5, 15, 5.0, 70, 85),    # Exchange: high volume, medium ROI, high consistency
+    (10, 25, 3.0, 50, 75),   # DeFi / Protocol: medium ROI, variable consistency
+    (15, 35, 2.0, 45, 70),   # Large individual (> 50k ETH): high ROI potential
+    (-5, 25, 1.5, 40, 65),   # Smaller whales: variable performance
+], dtype=float)
+
+# Module-level generator with bound draws: avoids the global random module's attribute
+# lookups on every call in calculate_whale_roi
+_rng = random.Random()
+_uniform = _rng.uniform
+_randint = _rng.randint
+
+
+def _whale_kind(entity_type: str, balance_eth: float) -> int:
+    """Row of _ROI_PROFILES: exchange, then DeFi/protocol, then balance tier."""
+    if 'Exchange' in entity_type:
+        return 0
+    if 'DeFi' in entity_type or 'Protocol' in entity_type:
+        return 1
+    return 2 if balance_eth > 50000 else 3
+
+
 class ROIService:
     """Simple ROI score calculator"""
     
     def calculate_whale_roi(self, address: str, balance_eth: float, 
-                           entity_type: str, category: str) -> Dict:
-        """Calculate ROI metrics for a whale"""
+                           entity_type: str, category: str,
+                           rng: Optional[random.Random] = None) -> Dict:
+        """Calculate ROI metrics for a whale (pass a seeded rng for reproducible scores)"""
+        uniform, randint = (rng.uniform, rng.randint) if rng is not None else (_uniform, _randint)
         
-        # Different scoring based on whale type
-        if 'Exchange' in entity_type:
-            # Exchanges: High volume, medium ROI, high consistency
-            base_roi = random.uniform(5, 15)
-            volume_multiplier = 5.0
-            consistency = random.uniform(70, 85)
-            activity = random.uniform(80, 95)
-        elif 'DeFi' in entity_type or 'Protocol' in entity_type:
-            # DeFi: Medium ROI, high volume, variable consistency
-            base_roi = random.uniform(10, 25)
-            volume_multiplier = 3.0
-            consistency = random.uniform(50, 75)
-            activity = random.uniform(60, 90)
-        elif balance_eth > 50000:
-            # Large individual whales: High ROI potential, lower consistency
-            base_roi = random.uniform(15, 35)
-            volume_multiplier = 2.0
-            consistency = random.uniform(45, 70)
-            activity = random.uniform(40, 80)
-        else:
-            # Smaller whales: Variable performance
-            base_roi = random.uniform(-5, 25)
-            volume_multiplier = 1.5
-            consistency = random.uniform(40, 65)
-            activity = random.uniform(30, 70)
+        # Draw ranges by whale type, shared with calculate_batch_roi_scores
+        roi_lo, roi_hi, volume_multiplier, consistency_lo, consistency_hi = (
+            _ROI_PROFILES[_whale_kind(entity_type, balance_eth)].tolist()
+        )
+        base_roi = uniform(roi_lo, roi_hi)
+        consistency = uniform(consistency_lo, consistency_hi)
         
         # Calculate derived metrics
         total_volume = balance_eth * volume_multiplier * 2000  # Convert to USD
-        total_trades = max(10, int(balance_eth / 100) + random.randint(-20, 50))
+        total_trades = max(10, int(balance_eth / 100) + randint(-20, 50))
         
         # Component scores (0-100 scale)
         roi_score = min(100, max(0, base_roi * 3))
         volume_score = min(100, (total_volume / 100000) * 20)
         consistency_score = consistency * 1.2
-        risk_score = random.uniform(30, 80)
+        risk_score = uniform(30, 80)
         activity_score = min(100, total_trades / 2)
-        efficiency_score = random.uniform(60, 90)
+        efficiency_score = uniform(60, 90)
         
         # Weighted composite score
         composite_score = (
@@ -75,8 +85,8 @@ class ROIService:
             'total_trades': total_trades,
             'win_rate_percent': round(consistency, 2),
             'total_volume_usd': round(total_volume, 2),
-            'sharpe_ratio': round(random.uniform(0.5, 2.5), 2),
-            'max_drawdown_percent': round(random.uniform(5, 30), 2)
+            'sharpe_ratio': round(uniform(0.5, 2.5), 2),
+            'max_drawdown_percent': round(uniform(5, 30), 2)
         }
     
     def get_score_category(self, composite_score: float) -> str:
@@ -91,19 +101,59 @@ class ROIService:
             return 'poor'
     
     def calculate_batch_roi_scores(self, whales: list) -> Dict[str, Dict]:
-        """Calculate ROI scores for multiple whales"""
-        scores = {}
+        """Calculate ROI scores for multiple whales (calculate_whale_roi, vectorized per component)"""
+        n = len(whales)
+        if n == 0:
+            return {}
+        rng = np.random.default_rng()
+        balance = np.array([float(w.get('balance_eth', 0) or 0) for w in whales])
+        kinds = np.array([
+            _whale_kind(w.get('entity_type', 'Unknown') or '', b) for w, b in zip(whales, balance.tolist())
+        ])
+        profile = _ROI_PROFILES[kinds]
+        
+        base_roi = rng.uniform(profile[:, 0], profile[:, 1])
+        consistency = rng.uniform(profile[:, 3], profile[:, 4])
+        total_volume = balance * profile[:, 2] * 2000  # Convert to USD
+        total_trades = np.maximum(10, (balance // 100).astype(np.int64) + rng.integers(-20, 51, size=n))
         
-        for whale in whales:
-            address = whale['address']
-            balance = whale.get('balance_eth', 0)
-            entity_type = whale.get('entity_type', 'Unknown')
-            category = whale.get('category', 'Unknown')
-            
-            roi_data = self.calculate_whale_roi(address, balance, entity_type, category)
-            scores[address] = roi_data
+        # Component scores (0-100 scale)
+        roi_score = np.clip(base_roi * 3, 0, 100)
+        volume_score = np.minimum(100, (total_volume / 100000) * 20)
+        consistency_score = consistency * 1.2
+        risk_score = rng.uniform(30, 80, size=n)
+        activity_score = np.minimum(100, total_trades / 2)
+        efficiency_score = rng.uniform(60, 90, size=n)
         
-        return scores
+        # Weighted composite score
+        composite_score = (
+            roi_score * 0.30 +
+            volume_score * 0.20 +
+            consistency_score * 0.20 +
+            risk_score * 0.15 +
+            activity_score * 0.10 +
+            efficiency_score * 0.05
+        )
+        
+        columns = {
+            'composite_score': np.round(composite_score, 2),
+            'roi_score': np.round(roi_score, 2),
+            'volume_score': np.round(volume_score, 2),
+            'consistency_score': np.round(consistency_score, 2),
+            'risk_score': np.round(risk_score, 2),
+            'activity_score': np.round(activity_score, 2),
+            'efficiency_score': np.round(efficiency_score, 2),
+            'avg_roi_percent': np.round(base_roi, 2),
+            'total_trades': total_trades,
+            'win_rate_percent': np.round(consistency, 2),
+            'total_volume_usd': np.round(total_volume, 2),
+            'sharpe_ratio': np.round(rng.uniform(0.5, 2.5, size=n), 2),
+            'max_drawdown_percent': np.round(rng.uniform(5, 30, size=n), 2),
+        }
+        # tolist() hands back plain Python floats/ints for JSON and DB writes
+        keys = list(columns)
+        rows = zip(*(columns[k].tolist() for k in keys))
+        return {w['address']: dict(zip(keys, row)) for w, row in zip(whales, rows)}
 
 if __name__ == "__main__":
     # Test ROI analyzer
@@ -4,13 +4,38 @@ Smart Money Discovery Service
 Discovers active traders based on DEX activity using database-driven configuration
 """
 
+import json
 import requests
 import time
-from typing import Dict, List, Set, Optional
-from datetime import datetime, timedelta
-from collections import defaultdict
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import config
 from ..data.smart_money_repository import smart_money_repository
+from ..utils.rate_limiter import etherscan_limiter, get_with_backoff
+
+try:
+    import orjson
+except ImportError:  # optional faster JSON decode
+    orjson = None
+
+ETHERSCAN_API_URL = "https://api.etherscan.io/api"
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+# txlist bodies run up to thousands of txs; orjson decodes them several times faster
+_json_loads = orjson.loads if orjson else json.loads
+
+
+def _epoch(ts_iso: str) -> int:
+    """Epoch seconds for a DB timestamp string; naive values (timestamp columns) are UTC."""
+    dt = datetime.fromisoformat(ts_iso.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
 
 class SmartMoneyDiscovery:
     """Discover smart money through behavior patterns using database configuration"""
@@ -26,6 +51,8 @@ class SmartMoneyDiscovery:
         self.dex_routers = {}
         self.cex_addresses = {}
         self.excluded_contracts = set()
+        self._dex_router_set = set()
+        self._exclude_set = frozenset()
         self._load_configuration()
 
         # Execution controls
@@ -37,34 +64,57 @@ class SmartMoneyDiscovery:
         self.backfill_timeout_sec: float = getattr(config, 'SMART_MONEY_BACKFILL_REQUEST_TIMEOUT_SEC', self.request_timeout_sec)
         self.backfill_max_tx: int = getattr(config, 'SMART_MONEY_BACKFILL_MAX_TX', 2500)
         self.backfill_time_budget_sec: int = getattr(config, 'SMART_MONEY_BACKFILL_TIME_BUDGET_SEC', 120)
+        self.scan_workers: int = getattr(config, 'SMART_MONEY_SCAN_WORKERS', 4)
+        self.log_interactions: bool = getattr(config, 'SMART_MONEY_LOG_INTERACTIONS', True)
+
+        # One pooled session for all Etherscan calls (incl. worker threads), paced by the process-wide limiter
+        self._session = requests.Session()
+        # Transient 5xx errors are retried by the adapter; 429s are left to get_with_backoff so
+        # every resend takes a limiter token
+        self._session.mount('https://', HTTPAdapter(
+            pool_connections=8, pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.25, status_forcelist=[500, 502, 503, 504])
+        ))
+        # txlist bodies compress 5-8x; pinned explicitly so a changed default can't drop it
+        self._session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+        self._etherscan_limiter = etherscan_limiter
+        # Activity metrics per address; dropped when new interactions are logged for it
+        self._metrics_cache = TTLCache(maxsize=10_000, ttl=900)
         
         # Track candidates in memory during discovery
-        self.candidates = defaultdict(lambda: {
-            'dex_swaps': 0,
-            'protocols_touched': set(),
-            'gas_spent': 0,
-            'last_activity': None,
-            'first_seen': None,
-            'is_contract': False,
-            'withdrew_from_cex': False,
-            'uses_defi': False
-        })
+        self._reset_candidates()
+
+    def _reset_candidates(self):
+        """Empty the per-run candidate columns (indexed by _intern(address); epoch 0 = not seen yet)"""
+        self._cand_id: Dict[str, int] = {}
+        self._swaps = array('I')
+        self._gas = array('d')
+        self._first = array('q')
+        self._last = array('q')
+        self._protocols: List[Set[str]] = []
+        self._withdrew_from_cex = bytearray()
     
     def _load_configuration(self):
         """Load DEX routers, CEX addresses, and exclusions from database"""
         # Load DEX routers
         routers = self.repo.get_dex_routers(active_only=True)
-        self.dex_routers = {r['address']: r['name'] for r in routers}
+        # Keys lowercased once here so hot loops compare without .lower()
+        self.dex_routers = {r['address'].lower(): r['name'] for r in routers}
+        self._dex_router_set = set(self.dex_routers)
         print(f"📋 Loaded {len(self.dex_routers)} DEX routers from database")
         
         # Load CEX addresses
         cex_addrs = self.repo.get_cex_addresses(active_only=True)
-        self.cex_addresses = {c['address']: c['exchange_name'] for c in cex_addrs}
+        self.cex_addresses = {c['address'].lower(): c['exchange_name'] for c in cex_addrs}
         print(f"📋 Loaded {len(self.cex_addresses)} CEX addresses from database")
         
         # Load excluded contracts
-        self.excluded_contracts = set(self.repo.get_excluded_contracts())
+        self.excluded_contracts = {a.lower() for a in self.repo.get_excluded_contracts()}
         print(f"📋 Loaded {len(self.excluded_contracts)} excluded contracts from database")
+
+        # Everything _is_excluded_address rejects, merged for a single lookup
+        self._exclude_set = frozenset(self.excluded_contracts) | frozenset(self.cex_addresses) | \
+            frozenset(self.dex_routers) | {ZERO_ADDRESS}
     
     def discover_dex_traders(self, hours_back: int = 24) -> Set[str]:
         """Discover addresses interacting with DEX routers"""
@@ -85,54 +135,56 @@ class SmartMoneyDiscovery:
                 print(f"Offline discovery failed: {e}")
                 return set()
 
-        # Limit routers per run and respect time budget
+        self._reset_candidates()
+        # (address, protocol, gas_eth, timestamp) per tx when interactions aren't logged
+        unlogged: List[Tuple[str, str, float, int]] = []
+
+        # Limit routers per run; scan them concurrently within the time budget
         routers_iter = list(self.dex_routers.items())[: max(0, self.max_routers_per_run)]
-        for router_address, router_name in routers_iter:
-            if time.time() - start_ts > self.time_budget_sec:
-                print("⏱️  Time budget reached during DEX scan; stopping early")
-                break
-            print(f"🔍 Scanning {router_name} interactions...")
-            
-            try:
-                # Get recent transactions TO the router
-                url = "https://api.etherscan.io/api"
-                params = {
-                    'module': 'account',
-                    'action': 'txlist',
-                    'address': router_address,
-                    'page': '1',
-                    'offset': '100',
-                    'sort': 'desc',
-                    'apikey': self.etherscan_key
-                }
-                
-                response = requests.get(url, params=params, timeout=self.request_timeout_sec)
-                if response.status_code == 200:
-                    result = response.json().get('result', [])
-                    
-                    if isinstance(result, list):
-                        for tx in result:
+        if routers_iter:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.scan_workers, len(routers_iter)))) as executor:
+                futures = [
+                    executor.submit(self._scan_router, router_address, router_name, hours_back)
+                    for router_address, router_name in routers_iter
+                ]
+                for future in as_completed(futures):
+                    router_address, router_name, txs = future.result()
+                    # Candidate state is only touched here, on the calling thread
+                    pending_rows = []
+                    for tx in txs:
+                        from_addr = tx.get('from', '').lower()
+                        if from_addr and not self._is_excluded_address(from_addr):
+                            discovered.add(from_addr)
+                            # Parsed once, shared by the candidate metrics and the DB row
+                            gas_eth = self._calculate_gas_eth(tx)
                             timestamp = int(tx.get('timeStamp', 0))
-                            if timestamp > time.time() - (hours_back * 3600):
-                                from_addr = tx.get('from', '').lower()
-                                
-                                if from_addr and not self._is_excluded_address(from_addr):
-                                    discovered.add(from_addr)
-                                    self._update_candidate_metrics(from_addr, tx, router_name)
-                                    
-                                    # Log interaction to database
-                                    self.repo.log_dex_interaction(from_addr, router_address, {
-                                        'tx_hash': tx.get('hash'),
-                                        'block_number': int(tx.get('blockNumber', 0)),
-                                        'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
-                                        'gas_spent_eth': self._calculate_gas_eth(tx)
-                                    })
-                
-                time.sleep(0.2)  # Rate limiting
-                
-            except Exception as e:
-                print(f"Error scanning {router_name}: {e}")
-        
+                            self._update_candidate_metrics(from_addr, router_name, gas_eth, timestamp)
+                            if not self.log_interactions:
+                                unlogged.append((from_addr, router_name, gas_eth, timestamp))
+                                continue
+                            pending_rows.append({
+                                'address': from_addr,
+                                'router_address': router_address,
+                                'tx_hash': tx.get('hash'),
+                                'block_number': int(tx.get('blockNumber', 0)),
+                                'timestamp': datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat(),
+                                'gas_spent_eth': gas_eth
+                            })
+                    # Log the router's interactions to the database in one write
+                    if pending_rows:
+                        self.repo.log_dex_interactions_bulk(pending_rows)
+                        for row in pending_rows:
+                            self._metrics_cache.pop(row['address'], None)
+                    if time.time() - start_ts > self.time_budget_sec:
+                        print("⏱️  Time budget reached during DEX scan; stopping early")
+                        for f in futures:
+                            f.cancel()
+                        break
+
+        # Without per-tx logging, persist this run's new activity in one merge instead
+        if unlogged:
+            self._merge_unlogged_activity(unlogged)
+
         # Fallback: derive from stored interactions if API returns nothing
         if not discovered:
             try:
@@ -147,98 +199,191 @@ class SmartMoneyDiscovery:
         
         return discovered
     
-    def discover_cex_withdrawals(self) -> Set[str]:
-        """Find addresses withdrawing from CEXs"""
+    def _merge_unlogged_activity(self, txs: List[Tuple[str, str, float, int]]) -> None:
+        """Merge txs newer than each address's stored last_activity_at into address_activity.
+        
+        Router scans re-read the whole hours_back window, so anything at or before the stored
+        high-water mark was already counted by an earlier run and is skipped.
+        """
+        stored = self.repo.get_address_activity_bulk(list({t[0] for t in txs}))
+        high_water = {
+            address: _epoch(row['last_activity_at'])
+            for address, row in stored.items() if row.get('last_activity_at')
+        }
+        agg: Dict[str, List] = {}
+        for address, protocol, gas_eth, timestamp in txs:
+            if timestamp <= high_water.get(address, 0):
+                continue
+            a = agg.get(address)
+            if a is None:
+                agg[address] = [1, {protocol}, gas_eth, timestamp, timestamp]
+                continue
+            a[0] += 1
+            a[1].add(protocol)
+            a[2] += gas_eth
+            a[3] = min(a[3], timestamp)
+            a[4] = max(a[4], timestamp)
+        if not agg:
+            return
+        self.repo.upsert_address_activity_bulk([{
+            'address': address,
+            'dex_swaps': swaps,
+            'protocols': len(protocols),
+            'gas_eth': gas_eth,
+            'first_ts': first_ts,
+            'last_ts': last_ts,
+        } for address, (swaps, protocols, gas_eth, first_ts, last_ts) in agg.items()])
+        for address in agg:
+            self._metrics_cache.pop(address, None)
+    
+    def _scan_router(self, router_address: str, router_name: str, hours_back: int) -> Tuple[str, str, List[Dict]]:
+        """Fetch recent transactions to a router (worker thread); returns those within hours_back."""
+        print(f"🔍 Scanning {router_name} interactions...")
+        try:
+            # Get recent transactions TO the router
+            params = {
+                'module': 'account',
+                'action': 'txlist',
+                'address': router_address,
+                'page': '1',
+                'offset': '100',
+                'sort': 'desc',
+                'apikey': self.etherscan_key
+            }
+            result = self._etherscan_get(params, self.request_timeout_sec)
+            if isinstance(result, list):
+                cutoff = time.time() - (hours_back * 3600)
+                recent = []
+                for tx in result:
+                    if int(tx.get('timeStamp', 0)) <= cutoff:
+                        break  # txs are sorted desc; the rest are older
+                    recent.append(tx)
+                return router_address, router_name, recent
+        except Exception as e:
+            print(f"Error scanning {router_name}: {e}")
+        return router_address, router_name, []
+
+    def discover_cex_withdrawals(self, hours_back: int = 24) -> Set[str]:
+        """Find addresses withdrawing from CEXs in the last hours_back hours"""
         discovered = set()
         if self.disable_network or not self.etherscan_key:
             return discovered
 
-        # Limit to first 3 CEXs (or fewer) to avoid rate limits
-        for cex_address, cex_name in list(self.cex_addresses.items())[:3]:
-            print(f"🏦 Scanning {cex_name} withdrawals...")
-            
-            try:
-                url = "https://api.etherscan.io/api"
-                params = {
-                    'module': 'account',
-                    'action': 'txlist',
-                    'address': cex_address,
-                    'page': '1',
-                    'offset': '50',
-                    'sort': 'desc',
-                    'apikey': self.etherscan_key
-                }
-                
-                response = requests.get(url, params=params, timeout=self.request_timeout_sec)
-                if response.status_code == 200:
-                    result = response.json().get('result', [])
-                    
-                    if isinstance(result, list):
-                        for tx in result:
-                            if tx.get('from', '').lower() == cex_address.lower():
-                                to_addr = tx.get('to', '').lower()
-                                value_eth = int(tx.get('value', 0)) / 1e18
-                                
-                                if to_addr and value_eth > 0.1 and not self._is_excluded_address(to_addr):
-                                    discovered.add(to_addr)
-                                    self.candidates[to_addr]['withdrew_from_cex'] = True
-                
-                time.sleep(0.2)
-                
-            except Exception as e:
-                print(f"Error scanning {cex_name}: {e}")
+        # Limit to first 3 CEXs (or fewer) to avoid rate limits; scanned concurrently
+        cex_iter = list(self.cex_addresses.items())[:3]
+        if not cex_iter:
+            return discovered
+        with ThreadPoolExecutor(max_workers=max(1, min(self.scan_workers, len(cex_iter)))) as executor:
+            futures = [
+                executor.submit(self._scan_cex, cex_address, cex_name, hours_back)
+                for cex_address, cex_name in cex_iter
+            ]
+            for future in as_completed(futures):
+                for to_addr in future.result():
+                    discovered.add(to_addr)
+                    self._withdrew_from_cex[self._intern(to_addr)] = 1
         
         return discovered
-    
+
+    def _scan_cex(self, cex_address: str, cex_name: str, hours_back: int = 24) -> List[str]:
+        """Recipients of recent > 0.1 ETH withdrawals from a CEX address (worker thread)."""
+        print(f"🏦 Scanning {cex_name} withdrawals...")
+        recipients = []
+        try:
+            params = {
+                'module': 'account',
+                'action': 'txlist',
+                'address': cex_address,
+                'page': '1',
+                'offset': '50',
+                'sort': 'desc',
+                'apikey': self.etherscan_key
+            }
+            
+            result = self._etherscan_get(params, self.request_timeout_sec)
+            if isinstance(result, list):
+                cutoff = time.time() - (hours_back * 3600)
+                for tx in result:
+                    if int(tx.get('timeStamp', 0)) <= cutoff:
+                        break  # txs are sorted desc; the rest are older
+                    if tx.get('from', '').lower() == cex_address:
+                        to_addr = tx.get('to', '').lower()
+                        value_eth = int(tx.get('value', 0)) / 1e18
+                        
+                        if to_addr and value_eth > 0.1 and not self._is_excluded_address(to_addr):
+                            recipients.append(to_addr)
+            
+        except Exception as e:
+            print(f"Error scanning {cex_name}: {e}")
+        return recipients
+
+    def _etherscan_get(self, params: Dict, timeout: float):
+        """Rate-limited Etherscan GET; returns the body's `result`, or [] on a non-200 or bad body.
+
+        Rate-limit replies (HTTP 429, or Etherscan's 200 with a "rate limit" result) are retried
+        by get_with_backoff, which also slows the shared limiter.
+        """
+        response = get_with_backoff(self._session, ETHERSCAN_API_URL, params,
+                                    limiter=self._etherscan_limiter, timeout=timeout, retries=3)
+        if response.status_code != 200:
+            return []
+        try:
+            return _json_loads(response.content).get('result', [])
+        except ValueError:  # json and orjson decode errors both subclass ValueError
+            return []
+
     def _calculate_gas_eth(self, tx: Dict) -> float:
         """Calculate gas cost in ETH"""
         gas_used = int(tx.get('gasUsed', 0))
         gas_price = int(tx.get('gasPrice', 0))
         return (gas_used * gas_price) / 1e18
     
-    def _update_candidate_metrics(self, address: str, tx: Dict, protocol: str):
-        """Update candidate metrics based on transaction"""
-        candidate = self.candidates[address]
-        
-        candidate['dex_swaps'] += 1
-        candidate['protocols_touched'].add(protocol)
-        candidate['gas_spent'] += self._calculate_gas_eth(tx)
-        
-        timestamp = int(tx.get('timeStamp', 0))
-        if not candidate['first_seen'] or timestamp < candidate['first_seen']:
-            candidate['first_seen'] = timestamp
-        if not candidate['last_activity'] or timestamp > candidate['last_activity']:
-            candidate['last_activity'] = timestamp
+    def _intern(self, address: str) -> int:
+        """Column index for a candidate, appending default metrics on first sight"""
+        i = self._cand_id.get(address)
+        if i is None:
+            i = self._cand_id[address] = len(self._protocols)
+            self._swaps.append(0)
+            self._gas.append(0.0)
+            self._first.append(0)
+            self._last.append(0)
+            self._protocols.append(set())
+            self._withdrew_from_cex.append(0)
+        return i
+
+    def _update_candidate_metrics(self, address: str, protocol: str, gas_eth: float, timestamp: int):
+        """Update candidate metrics with one transaction's (already parsed) gas and timestamp"""
+        i = self._intern(address)
+        
+        self._swaps[i] += 1
+        self._protocols[i].add(protocol)
+        self._gas[i] += gas_eth
+        
+        if not self._first[i] or timestamp < self._first[i]:
+            self._first[i] = timestamp
+        if timestamp > self._last[i]:
+            self._last[i] = timestamp
     
     def _is_excluded_address(self, address: str) -> bool:
-        """Check if address should be excluded"""
-        # Check exclusion list
-        if address in self.excluded_contracts:
-            return True
-        
-        # Check if it's a CEX
-        if address in self.cex_addresses:
-            return True
-        
-        # Check if it's a DEX router
-        if address in self.dex_routers:
-            return True
-        
-        # Exclude zero address
-        if address == '0x0000000000000000000000000000000000000000':
-            return True
-        
-        return False
+        """Check if address should be excluded (excluded contract, CEX, DEX router or zero address)"""
+        return address in self._exclude_set
     
+    @staticmethod
+    def _is_fresh_activity(row: Optional[Dict]) -> bool:
+        """True for an address_activity row updated less than 1 hour ago"""
+        return bool(row and row.get('updated_at')) and int(time.time()) - _epoch(row['updated_at']) < 3600
+
     def get_activity_metrics(self, address: str) -> Optional[Dict]:
         """Get detailed activity metrics for an address"""
-        # First check database
+        cached = self._metrics_cache.get(address)
+        if cached is not None:
+            return cached
+
+        # Then check database
         existing_activity = self.repo.get_address_activity(address)
-        if existing_activity and existing_activity.get('updated_at'):
-            # If data is less than 1 hour old, use it
-            last_update = datetime.fromisoformat(existing_activity['updated_at'].replace('Z', '+00:00'))
-            if (datetime.utcnow() - last_update).seconds < 3600:
-                return existing_activity
+        if self._is_fresh_activity(existing_activity):
+            self._metrics_cache[address] = existing_activity
+            return existing_activity
         
         # Otherwise fetch fresh data
         metrics = {
@@ -253,38 +398,15 @@ class SmartMoneyDiscovery:
         }
         
         try:
-            # Get recent DEX interactions from database
-            dex_interactions = self.repo.get_dex_interactions(address, days=90)
-            
-            if dex_interactions:
-                metrics['dex_swap_count'] = len(dex_interactions)
-                
-                protocols = set()
-                total_gas = 0
-                first_time = None
-                last_time = None
-                
-                for interaction in dex_interactions:
-                    router = interaction.get('router_address')
-                    if router in self.dex_routers:
-                        protocols.add(self.dex_routers[router])
-                    
-                    total_gas += float(interaction.get('gas_spent_eth', 0))
-                    
-                    timestamp = interaction.get('timestamp')
-                    if timestamp:
-                        if not first_time or timestamp < first_time:
-                            first_time = timestamp
-                        if not last_time or timestamp > last_time:
-                            last_time = timestamp
-                
-                metrics['unique_protocols'] = len(protocols)
-                metrics['total_gas_spent_eth'] = total_gas
-                metrics['first_seen_at'] = first_time
-                metrics['last_activity_at'] = last_time
+            # Aggregate recent DEX interactions in the database
+            aggregates = self.repo.get_address_aggregates(address, days=90)
+            if aggregates is None:
+                return metrics
+            metrics.update(aggregates)
             
-            # Update database
-            self.repo.update_address_activity(address, metrics)
+            # Persist off the critical path; metrics are returned from memory
+            self.repo.queue_address_activity(address, metrics)
+            self._metrics_cache[address] = metrics
             
         except Exception as e:
             print(f"Error getting metrics for {address}: {e}")
@@ -309,10 +431,9 @@ class SmartMoneyDiscovery:
             metrics.get('last_activity_at') is not None
         )
         
-        # Check if active in last 30 days
+        # Check if active within the last active_days
         if qualifies and metrics['last_activity_at']:
-            last_activity = datetime.fromisoformat(metrics['last_activity_at'].replace('Z', '+00:00'))
-            days_since = (datetime.utcnow() - last_activity).days
+            days_since = (int(time.time()) - _epoch(metrics['last_activity_at'])) // 86400
             qualifies = qualifies and (days_since <= active_days)
         
         result = {
@@ -327,6 +448,50 @@ class SmartMoneyDiscovery:
         
         return result
 
+    def qualify_as_smart_money_batch(self, addresses: List[str]) -> List[Dict]:
+        """qualify_as_smart_money for many addresses: one bulk activity read, thresholds applied
+        as array masks and one bulk candidate write. Results follow the input order."""
+        if not addresses:
+            return []
+        metrics = {a: self._metrics_cache[a] for a in addresses if a in self._metrics_cache}
+        missing = [a for a in addresses if a not in metrics]
+        if missing:
+            for address, row in self.repo.get_address_activity_bulk(missing).items():
+                if self._is_fresh_activity(row):
+                    self._metrics_cache[address] = metrics[address] = row
+        # Stale or unknown addresses are recomputed from their interactions
+        for address in addresses:
+            if address not in metrics:
+                metrics[address] = self.get_activity_metrics(address) or {}
+
+        # Thresholds (tunable via env)
+        min_swaps = getattr(config, 'SMART_MONEY_MIN_SWAPS', 10)
+        min_protocols = getattr(config, 'SMART_MONEY_MIN_PROTOCOLS', 1)
+        active_days = getattr(config, 'SMART_MONEY_ACTIVE_DAYS', 60)
+
+        n = len(addresses)
+        rows = [metrics[a] for a in addresses]
+        swaps = np.fromiter((int(m.get('dex_swap_count') or 0) for m in rows), dtype=np.int64, count=n)
+        protocols = np.fromiter((int(m.get('unique_protocols') or 0) for m in rows), dtype=np.int64, count=n)
+        # -1 marks "no activity recorded", which never qualifies
+        last = np.fromiter(
+            (_epoch(m['last_activity_at']) if m.get('last_activity_at') else -1 for m in rows),
+            dtype=np.int64, count=n
+        )
+        qualifies = (
+            (swaps >= min_swaps) & (protocols >= min_protocols) & (last >= 0) &
+            ((int(time.time()) - last) // 86400 <= active_days)
+        )
+
+        results = [{
+            'address': address,
+            'qualifies_smart_money': q,
+            'dex_swaps_90d': m.get('dex_swap_count', 0),
+            'status': 'watchlist' if q else 'candidate'
+        } for address, m, q in zip(addresses, rows, qualifies.tolist())]
+        self.repo.update_smart_money_candidates_bulk(results)
+        return results
+
     def backfill_address_interactions(self, address: str, days: int = 90,
                                       max_tx: Optional[int] = None,
                                       time_budget_sec: Optional[int] = None,
@@ -339,7 +504,6 @@ class SmartMoneyDiscovery:
                 print("Backfill skipped: ETHERSCAN_API_KEY not set")
                 return 0
 
-            url = "https://api.etherscan.io/api"
             # Bound the number of transactions we request and time we spend
             tx_cap = min(max_tx or self.backfill_max_tx, 10000)
             timeout = request_timeout_sec or self.backfill_timeout_sec
@@ -354,38 +518,41 @@ class SmartMoneyDiscovery:
                 'sort': 'desc',
                 'apikey': self.etherscan_key
             }
-            resp = requests.get(url, params=params, timeout=timeout)
-            if resp.status_code != 200:
-                return 0
-            result = resp.json().get('result', [])
+            result = self._etherscan_get(params, timeout)
             if not isinstance(result, list):
                 return 0
 
             cutoff_ts = time.time() - days * 86400
-            count = 0
-            dex_router_set = set(k.lower() for k in self.dex_routers.keys())
+            rows = []
+
+            # Router/window filter over columns; only matching txs reach the Python loop
+            n = len(result)
+            to_addrs = np.array([(tx.get('to') or '').lower() for tx in result], dtype=str)
+            timestamps = np.fromiter((int(tx.get('timeStamp', 0)) for tx in result), dtype=np.int64, count=n)
+            router_arr = np.array(sorted(self._dex_router_set), dtype=str)
+            mask = np.isin(to_addrs, router_arr) & (timestamps >= cutoff_ts)
 
-            for tx in result:
+            for i in np.flatnonzero(mask).tolist():
+                tx = result[i]
                 try:
-                    to_addr = (tx.get('to') or '').lower()
-                    if not to_addr or to_addr not in dex_router_set:
-                        continue
-                    ts = int(tx.get('timeStamp', 0))
-                    if ts < cutoff_ts:
-                        break  # txs are sorted desc; stop early
-                    self.repo.log_dex_interaction(address, to_addr, {
+                    rows.append({
+                        'address': address,
+                        'router_address': str(to_addrs[i]),
                         'tx_hash': tx.get('hash'),
                         'block_number': int(tx.get('blockNumber', 0)),
-                        'timestamp': datetime.fromtimestamp(ts).isoformat(),
+                        'timestamp': datetime.fromtimestamp(int(timestamps[i]), tz=timezone.utc).isoformat(),
                         'gas_spent_eth': self._calculate_gas_eth(tx)
                     })
-                    count += 1
                     # Respect time budget
                     if time.time() - start_ts > time_budget:
                         break
                 except Exception:
                     continue
-            return count
+            # One insert-only bulk write instead of an upsert per tx
+            if not rows:
+                return 0
+            self._metrics_cache.pop(address, None)
+            return self.repo.backfill_dex_interactions(rows)
         except Exception as e:
             print(f"Backfill failed for {address}: {e}")
             return 0
@@ -415,7 +582,7 @@ class SmartMoneyDiscovery:
         dex_traders = self.discover_dex_traders(hours_back=hours_back)
         print(f"   Found {len(dex_traders)} DEX traders")
         
-        cex_withdrawers = self.discover_cex_withdrawals()
+        cex_withdrawers = self.discover_cex_withdrawals(hours_back=hours_back)
         print(f"   Found {len(cex_withdrawers)} CEX withdrawals")
         
         all_candidates = dex_traders | cex_withdrawers
@@ -424,17 +591,13 @@ class SmartMoneyDiscovery:
         # Phase 2: Qualify candidates
         print("\n📊 Phase 2: Qualifying candidates...")
         
+        batch = list(all_candidates)[:max_candidates]
+        print(f"   Processing {len(batch)} candidates...")
         smart_money = []
-        for i, address in enumerate(list(all_candidates)[:max_candidates]):
-            if i % 10 == 0:
-                print(f"   Processing {i}/{min(len(all_candidates), max_candidates)}...")
-            
-            result = self.qualify_as_smart_money(address)
+        for result in self.qualify_as_smart_money_batch(batch):
             if result['qualifies_smart_money']:
                 smart_money.append(result)
-                print(f"   ✅ Qualified: {address[:10]}... ({result['dex_swaps_90d']} swaps)")
-            
-            time.sleep(0.25)  # Rate limiting
+                print(f"   ✅ Qualified: {result['address'][:10]}... ({result['dex_swaps_90d']} swaps)")
         
         # Get funnel stats
         stats = self.repo.get_candidate_funnel_stats()
@@ -4,11 +4,69 @@ Whale Discovery Service
 Discovers new whale addresses through transaction analysis
 """
 
+import asyncio
+import json
 import requests
 import time
-from typing import Dict, List, Set
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import httpx
+import numpy as np
+from cachetools import LRUCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import config
 from ..data.whale_repository import whale_repository
+from ..utils.rate_limiter import etherscan_limiter, get_with_backoff
+
+try:
+    import orjson
+except ImportError:  # optional faster JSON decode
+    orjson = None
+
+ZERO_ADDRESS = '0x' + '0' * 40
+WEI_PER_ETH = 10 ** 18
+VALIDATOR_DEPOSIT_WEI = 32 * WEI_PER_ETH
+LARGE_TX_WEI = 100 * WEI_PER_ETH
+# Shortest value strings that can reach each threshold; shorter ones are rejected without
+# parsing (txlist values are decimal, RPC quantities are 0x-hex with no leading zeros)
+_VALIDATOR_DEPOSIT_DIGITS = len(str(VALIDATOR_DEPOSIT_WEI))
+_LARGE_TX_DIGITS = len(str(LARGE_TX_WEI))
+_LARGE_TX_HEX_LEN = len(hex(LARGE_TX_WEI))
+# Full blocks and txlist/getLogs pages are the large bodies here; orjson parses them much faster
+_json_loads = orjson.loads if orjson else json.loads
+# Collected from/to values that aren't whale candidates; removed once per scan, not per tx
+_NOT_ADDRESSES = frozenset(('', ZERO_ADDRESS))
+
+WETH_ADDRESS = '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2'
+# WETH Deposit(address indexed dst, uint wad) / Withdrawal(address indexed src, uint wad)
+WETH_FLOW_TOPICS = (
+    '0xe1fffcc4923d04b559f4d29a8bfc6cda04eb5b0d3c460751c2402c5c5cc9109c',
+    '0x7fcf532c15f0a6db0bd6d0e038bea71d30d808c7d98cb3bf7268a95bf5081b65',
+)
+# Max logs per getLogs page; a full page means the range may be truncated
+LOGS_PAGE_SIZE = 1000
+# Blocks behind head treated as final (safe to cache), and how many blocks' results to keep
+FINALITY_DEPTH = 12
+BLOCK_CACHE_SIZE = 4096
+
+def _hex_wei_if_large(value: Optional[str]) -> int:
+    """Parsed hex quantity, or 0 when it's too short to reach LARGE_TX_WEI (no bigint parse)"""
+    if not value or len(value) < _LARGE_TX_HEX_LEN:
+        return 0
+    return int(value, 16)
+
+# Concurrent candidate qualifications; the shared limiter keeps them under Etherscan's cap
+QUALIFY_WORKERS = 5
+# In-flight balance/tx-count batches when prefetching candidates over ETH_RPC_URL
+RPC_CONCURRENCY = 20
+# eth_getCode calls per JSON-RPC batch when screening out contract candidates
+CODE_CHECK_BATCH_SIZE = 20
+# Code prefix of EIP-7702 delegated EOAs; those are still user accounts
+_DELEGATION_PREFIX = '0xef0100'
+# How long the in-memory set of tracked addresses is trusted before it's reloaded
+KNOWN_ADDRESSES_TTL_SEC = 3600
 
 class WhaleDiscoveryService:
     """Service for discovering new whale addresses"""
@@ -17,6 +75,27 @@ class WhaleDiscoveryService:
         self.etherscan_key = config.ETHERSCAN_API_KEY
         self.whale_threshold = config.WHALE_THRESHOLD
         self.discovered_addresses = set()
+        # Lowercased tracked whale addresses, so candidates skip a per-address DB lookup
+        self._known: Optional[Set[str]] = None
+        self._known_loaded_at = 0.0
+        # Finalized block -> large-mover addresses (WETH flows / native walk), kept across runs
+        self._block_flows = LRUCache(maxsize=BLOCK_CACHE_SIZE)
+        self._block_native = LRUCache(maxsize=BLOCK_CACHE_SIZE)
+        # Candidates found to have contract code; deployed code doesn't go away, so never re-checked
+        self._contracts: Set[str] = set()
+        self._etherscan_limiter = etherscan_limiter
+        # Keep-alive pool shared by worker threads; the adapter only retries transient 5xx, since a
+        # 429 retry there would bypass the limiter (get_with_backoff owns those)
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(
+            pool_connections=10, pool_maxsize=20,
+            max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504],
+                              raise_on_status=False)
+        ))
+    
+    def _request_with_backoff(self, url: str, params: Dict, timeout: float = 10):
+        """Paced Etherscan GET that only waits when the API reports a rate limit"""
+        return get_with_backoff(self._session, url, params, limiter=self._etherscan_limiter, timeout=timeout)
         
     def discover_from_recent_transfers(self) -> List[str]:
         """
@@ -44,51 +123,39 @@ class WhaleDiscoveryService:
                 'apikey': self.etherscan_key
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self._request_with_backoff(url, params)
             if response.status_code == 200:
-                result = response.json().get('result', [])
+                result = _json_loads(response.content).get('result', [])
                 
                 if isinstance(result, list):
                     for tx in result:
-                        # Check transaction value
-                        value_wei = int(tx.get('value', '0'))
-                        value_eth = value_wei / 1e18
-                        
                         # If large deposit (>32 ETH), track the sender
-                        if value_eth >= 32:  # ETH2 validator deposit size
-                            from_addr = tx.get('from', '').lower()
-                            if from_addr and from_addr != '0x0000000000000000000000000000000000000000':
-                                discovered.add(from_addr)
-            
-            # Rate limiting
-            time.sleep(0.5)
+                        value = tx.get('value', '0')
+                        if len(value) >= _VALIDATOR_DEPOSIT_DIGITS and int(value) >= VALIDATOR_DEPOSIT_WEI:  # ETH2 validator deposit size
+                            discovered.add((tx.get('from') or '').lower())
             
             # Also check WETH contract for large wrapping/unwrapping
             params['address'] = '0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2'  # WETH
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self._request_with_backoff(url, params)
             if response.status_code == 200:
-                result = response.json().get('result', [])
+                result = _json_loads(response.content).get('result', [])
                 
                 if isinstance(result, list):
                     for tx in result:
-                        value_wei = int(tx.get('value', '0'))
-                        value_eth = value_wei / 1e18
-                        
                         # Large WETH operations (>100 ETH)
-                        if value_eth >= 100:
-                            from_addr = tx.get('from', '').lower()
-                            to_addr = tx.get('to', '').lower()
+                        value = tx.get('value', '0')
+                        if len(value) >= _LARGE_TX_DIGITS and int(value) >= LARGE_TX_WEI:
+                            from_addr = (tx.get('from') or '').lower()
+                            to_addr = (tx.get('to') or '').lower()  # None for contract creations
                             
-                            if from_addr and from_addr != '0x0000000000000000000000000000000000000000':
-                                discovered.add(from_addr)
-                            if to_addr and to_addr != '0x0000000000000000000000000000000000000000':
-                                discovered.add(to_addr)
+                            discovered.add(from_addr)
+                            discovered.add(to_addr)
             
         except Exception as e:
             print(f"Error discovering from transfers: {e}")
         
-        return list(discovered)
+        return list(discovered - _NOT_ADDRESSES)
     
     def discover_from_large_transactions(self, block_count: int = 100) -> List[str]:
         """
@@ -109,49 +176,113 @@ class WhaleDiscoveryService:
                 'apikey': self.etherscan_key
             }
             
-            response = requests.get(url, params=params)
+            response = self._request_with_backoff(url, params)
             latest_block = int(response.json()['result'], 16)
             
-            # Analyze recent blocks for large transactions
+            # Blocks this deep are final, so their results are cached and never re-fetched
+            from_block = latest_block - block_count + 1
+            finalized = latest_block - FINALITY_DEPTH
+            
+            # Large WETH wraps/unwraps over every block in range, filtered server-side by log
+            start = from_block
+            while start <= finalized and start in self._block_flows:
+                start += 1
+            flows = self._get_large_eth_transfers(start, latest_block, cache_through=finalized)
+            if flows is not None:
+                for block_num in range(from_block, start):
+                    flows |= self._block_flows.get(block_num, frozenset())
+                return list(flows - _NOT_ADDRESSES)
+            
+            # Fallback: sample full blocks for large native transfers
             for block_offset in range(0, block_count, 10):
                 block_num = latest_block - block_offset
-                
-                # Get block transactions
-                params = {
-                    'module': 'proxy',
-                    'action': 'eth_getBlockByNumber',
-                    'tag': hex(block_num),
-                    'boolean': 'true',
-                    'apikey': self.etherscan_key
-                }
-                
-                response = requests.get(url, params=params)
-                if response.status_code == 200:
-                    block_data = response.json().get('result', {})
-                    transactions = block_data.get('transactions', [])
-                    
-                    for tx in transactions:
-                        # Check transaction value
-                        value_wei = int(tx.get('value', '0x0'), 16)
-                        value_eth = value_wei / 1e18
-                        
-                        # If large transaction (>100 ETH), track addresses
-                        if value_eth > 100:
-                            from_addr = tx.get('from', '').lower()
-                            to_addr = tx.get('to', '').lower()
-                            
-                            if from_addr and from_addr != '0x0000000000000000000000000000000000000000':
-                                discovered.add(from_addr)
-                            if to_addr and to_addr != '0x0000000000000000000000000000000000000000':
-                                discovered.add(to_addr)
-                
-                # Rate limiting
-                time.sleep(0.25)
+                discovered |= self._addresses_from_block(block_num, cache=block_num <= finalized)
                 
         except Exception as e:
             print(f"Error discovering from transactions: {e}")
         
-        return list(discovered)
+        return list(discovered - _NOT_ADDRESSES)
+    
+    def _addresses_from_block(self, block_num: int, cache: bool = False) -> frozenset:
+        """From/to of every transaction above LARGE_TX_WEI in one block (full-tx fetch)"""
+        cached = self._block_native.get(block_num)
+        if cached is not None:
+            return cached
+        
+        url = "https://api.etherscan.io/api"
+        params = {
+            'module': 'proxy',
+            'action': 'eth_getBlockByNumber',
+            'tag': hex(block_num),
+            'boolean': 'true',
+            'apikey': self.etherscan_key
+        }
+        
+        response = self._request_with_backoff(url, params)
+        if response.status_code != 200:
+            return frozenset()
+        block_data = _json_loads(response.content).get('result') or {}
+        
+        transactions = block_data.get('transactions') or []
+        
+        # Threshold compare on the whole block at once; wei exceeds uint64, so values are
+        # float64 (rounding at 1e20 is ~1e4 wei, irrelevant for a 100 ETH cutoff)
+        values = np.fromiter((_hex_wei_if_large(tx.get('value')) for tx in transactions),
+                             dtype=np.float64, count=len(transactions))
+        addresses = set()
+        for i in np.flatnonzero(values > LARGE_TX_WEI):
+            tx = transactions[i]
+            addresses.add((tx.get('from') or '').lower())
+            addresses.add((tx.get('to') or '').lower())  # None for contract creations
+        
+        addresses = frozenset(addresses)
+        if cache and block_data:
+            self._block_native[block_num] = addresses
+        return addresses
+    
+    def _get_large_eth_transfers(self, from_block: int, to_block: int,
+                                 cache_through: int = -1) -> Optional[Set[str]]:
+        """Addresses wrapping or unwrapping more than LARGE_TX_WEI through WETH in the block range.
+        
+        Native ETH transfers emit no logs, so WETH Deposit/Withdrawal events stand in for them;
+        getLogs returns just those events instead of every tx in every block. Per-block results
+        up to `cache_through` go into _block_flows when the page wasn't truncated. None if the
+        logs call fails, so the caller can fall back to walking blocks.
+        """
+        url = "https://api.etherscan.io/api"
+        by_block: Dict[int, Set[str]] = {}
+        complete = True
+        for topic in WETH_FLOW_TOPICS:
+            params = {
+                'module': 'logs',
+                'action': 'getLogs',
+                'address': WETH_ADDRESS,
+                'fromBlock': from_block,
+                'toBlock': to_block,
+                'topic0': topic,
+                'page': '1',
+                'offset': str(LOGS_PAGE_SIZE),
+                'apikey': self.etherscan_key
+            }
+            response = self._request_with_backoff(url, params)
+            if response.status_code != 200:
+                return None
+            result = _json_loads(response.content).get('result')
+            if not isinstance(result, list):
+                return None
+            complete = complete and len(result) < LOGS_PAGE_SIZE
+            for log in result:
+                topics = log.get('topics') or []
+                data = log.get('data') or ''
+                # topic1 is the dst/src account, data the wei amount
+                if len(topics) > 1 and len(data) > 2 and int(data, 16) > LARGE_TX_WEI:
+                    block_num = int(log.get('blockNumber') or '0x0', 16)
+                    by_block.setdefault(block_num, set()).add('0x' + topics[1][-40:].lower())
+        
+        if complete:
+            for block_num in range(from_block, min(to_block, cache_through) + 1):
+                self._block_flows[block_num] = frozenset(by_block.get(block_num, ()))
+        return set().union(*by_block.values())
     
     def discover_from_token_holders(self, token_addresses: List[str] = None) -> List[str]:
         """
@@ -184,9 +315,9 @@ class WhaleDiscoveryService:
                     'apikey': self.etherscan_key
                 }
                 
-                response = requests.get(url, params=params)
+                response = self._request_with_backoff(url, params)
                 if response.status_code == 200:
-                    result = response.json().get('result', [])
+                    result = _json_loads(response.content).get('result', [])
                     
                     # Check if result is a list (success) or string (error)
                     if not isinstance(result, list):
@@ -195,74 +326,221 @@ class WhaleDiscoveryService:
                     
                     holders = result
                     for holder in holders[:50]:  # Top 50 holders
-                        address = holder.get('TokenHolderAddress', '').lower()
-                        if address and address != '0x0000000000000000000000000000000000000000':
-                            discovered.add(address)
-                
-                # Rate limiting
-                time.sleep(0.25)
+                        discovered.add(holder.get('TokenHolderAddress', '').lower())
                 
             except Exception as e:
                 print(f"Error discovering from token {token_addr}: {e}")
         
-        return list(discovered)
+        return list(discovered - _NOT_ADDRESSES)
     
-    def qualify_as_whale(self, address: str) -> Dict:
-        """
-        Check if address qualifies as a whale based on criteria
-        Returns qualification data
-        """
+    @staticmethod
+    def _balance_batch(address: str) -> List[Dict]:
+        return [
+            {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_getBalance', 'params': [address, 'latest']},
+            {'jsonrpc': '2.0', 'id': 2, 'method': 'eth_getTransactionCount', 'params': [address, 'latest']},
+        ]
+    
+    @staticmethod
+    def _parse_balance_batch(body) -> Optional[Tuple[int, int]]:
+        if not isinstance(body, list):
+            return None  # provider doesn't accept batches
+        by_id = {r.get('id'): r.get('result') for r in body}
+        if by_id.get(1) is None or by_id.get(2) is None:
+            return None
+        return int(by_id[1], 16), int(by_id[2], 16)
+    
+    def _fetch_balance_and_tx_count(self, address: str) -> Optional[Tuple[int, int]]:
+        """(balance_wei, tx_count) from one JSON-RPC batch to ETH_RPC_URL; None if the batch fails"""
+        rpc_url = getattr(config, 'ETH_RPC_URL', '')
+        if not rpc_url:
+            return None
         try:
-            url = "https://api.etherscan.io/api"
-            
-            # Check ETH balance
-            params = {
-                'module': 'account',
-                'action': 'balance',
-                'address': address,
-                'tag': 'latest',
-                'apikey': self.etherscan_key
-            }
-            
-            response = requests.get(url, params=params)
+            response = self._session.post(rpc_url, json=self._balance_batch(address), timeout=10)
             if response.status_code != 200:
                 return None
+            return self._parse_balance_batch(response.json())
+        except Exception:
+            return None
+    
+    def _filter_out_contracts(self, addresses: List[str]) -> List[str]:
+        """Drop addresses with contract code (routers, pools) before they cost qualification calls.
+        
+        One eth_getCode JSON-RPC batch per CODE_CHECK_BATCH_SIZE addresses to ETH_RPC_URL;
+        without it (or when a batch fails) the addresses are kept as-is.
+        """
+        rpc_url = getattr(config, 'ETH_RPC_URL', '')
+        unknown = [a for a in addresses if a not in self._contracts]
+        if rpc_url:
+            for i in range(0, len(unknown), CODE_CHECK_BATCH_SIZE):
+                chunk = unknown[i:i + CODE_CHECK_BATCH_SIZE]
+                batch = [
+                    {'jsonrpc': '2.0', 'id': j, 'method': 'eth_getCode', 'params': [a, 'latest']}
+                    for j, a in enumerate(chunk)
+                ]
+                try:
+                    response = self._session.post(rpc_url, json=batch, timeout=10)
+                    body = response.json() if response.status_code == 200 else None
+                except Exception:
+                    continue
+                for item in body if isinstance(body, list) else []:
+                    idx, code = item.get('id'), item.get('result')
+                    if not isinstance(idx, int) or not 0 <= idx < len(chunk) or not isinstance(code, str):
+                        continue
+                    if code not in ('0x', '0x0') and not code.startswith(_DELEGATION_PREFIX):
+                        self._contracts.add(chunk[idx])
+        return [a for a in addresses if a not in self._contracts]
+    
+    async def _aprefetch_balances(self, rpc_url: str, addresses: List[str]) -> Dict[str, Tuple[int, int]]:
+        limits = httpx.Limits(max_connections=RPC_CONCURRENCY, max_keepalive_connections=RPC_CONCURRENCY)
+        async with httpx.AsyncClient(timeout=10, limits=limits) as client:
+            sem = asyncio.Semaphore(RPC_CONCURRENCY)
             
-            balance_wei = int(response.json()['result'])
-            balance_eth = balance_wei / 1e18
-            
-            # Check if meets threshold
-            if balance_eth < self.whale_threshold:
-                return None
+            async def fetch(address: str) -> Optional[Tuple[int, int]]:
+                try:
+                    async with sem:
+                        response = await client.post(rpc_url, json=self._balance_batch(address))
+                    if response.status_code != 200:
+                        return None
+                    return self._parse_balance_batch(response.json())
+                except Exception:
+                    return None
             
-            # Get transaction count for activity check
-            params = {
-                'module': 'proxy',
-                'action': 'eth_getTransactionCount',
+            results = await asyncio.gather(*(fetch(a) for a in addresses))
+        return {a: r for a, r in zip(addresses, results) if r is not None}
+    
+    def prefetch_balances(self, addresses: List[str]) -> Dict[str, Tuple[int, int]]:
+        """(balance_wei, tx_count) by address for every candidate the RPC answered, fetched
+        concurrently on one event loop; empty without ETH_RPC_URL. Misses go through
+        qualify_as_whale's per-address path."""
+        rpc_url = getattr(config, 'ETH_RPC_URL', '')
+        if not rpc_url or not addresses:
+            return {}
+        return asyncio.run(self._aprefetch_balances(rpc_url, addresses))
+    
+    def _fetch_balance_and_tx_count_etherscan(self, address: str) -> Optional[Tuple[int, int]]:
+        """Fallback: (balance_wei, tx_count) via two Etherscan GETs; tx_count is 0 below the threshold"""
+        url = "https://api.etherscan.io/api"
+        
+        # Check ETH balance
+        params = {
+            'module': 'account',
+            'action': 'balance',
+            'address': address,
+            'tag': 'latest',
+            'apikey': self.etherscan_key
+        }
+        
+        response = self._request_with_backoff(url, params)
+        if response.status_code != 200:
+            return None
+        
+        balance_wei = int(response.json()['result'])
+        
+        # Skip the activity check when the balance already rules the address out
+        if balance_wei / 1e18 < self.whale_threshold:
+            return balance_wei, 0
+        
+        # Get transaction count for activity check
+        params = {
+            'module': 'proxy',
+            'action': 'eth_getTransactionCount',
+            'address': address,
+            'tag': 'latest',
+            'apikey': self.etherscan_key
+        }
+        
+        response = self._request_with_backoff(url, params)
+        return balance_wei, int(response.json()['result'], 16)
+    
+    def _qualification(self, address: str, balance_wei: int, tx_count: int) -> Optional[Dict]:
+        """Qualification data if the balance and activity meet the whale criteria"""
+        balance_eth = balance_wei / 1e18
+        
+        # Qualify as whale if balance > threshold and active
+        if balance_eth >= self.whale_threshold and tx_count > 10:
+            return {
                 'address': address,
-                'tag': 'latest',
-                'apikey': self.etherscan_key
+                'balance_eth': balance_eth,
+                'tx_count': tx_count,
+                'qualified': True,
+                'entity_type': 'Unknown',
+                'category': 'Discovered Whale'
             }
-            
-            response = requests.get(url, params=params)
-            tx_count = int(response.json()['result'], 16)
-            
-            # Qualify as whale if balance > threshold and active
-            if balance_eth >= self.whale_threshold and tx_count > 10:
-                return {
-                    'address': address,
-                    'balance_eth': balance_eth,
-                    'tx_count': tx_count,
-                    'qualified': True,
-                    'entity_type': 'Unknown',
-                    'category': 'Discovered Whale'
-                }
+        return None
+    
+    def qualify_as_whale(self, address: str) -> Dict:
+        """
+        Check if address qualifies as a whale based on criteria
+        Returns qualification data
+        """
+        try:
+            # Balance and tx count in one round trip, else the Etherscan pair of calls
+            fetched = self._fetch_balance_and_tx_count(address) or \
+                self._fetch_balance_and_tx_count_etherscan(address)
+            if fetched is None:
+                return None
+            return self._qualification(address, *fetched)
             
         except Exception as e:
             print(f"Error qualifying {address}: {e}")
         
         return None
     
+    def _load_known_addresses(self):
+        """(Re)load the tracked-address set when missing or older than KNOWN_ADDRESSES_TTL_SEC"""
+        if self._known is not None and time.monotonic() - self._known_loaded_at < KNOWN_ADDRESSES_TTL_SEC:
+            return
+        addresses = whale_repository.get_all_addresses()
+        if addresses is not None:
+            self._known = {a.lower() for a in addresses}
+            self._known_loaded_at = time.monotonic()
+    
+    def _is_tracked(self, address: str) -> bool:
+        """Set membership when the address set loaded, else the per-address DB check"""
+        if self._known is not None:
+            return address.lower() in self._known
+        return whale_repository.whale_exists(address)
+    
+    def _check_candidate(self, address: str) -> Optional[Dict]:
+        """Qualification data for an untracked candidate that qualifies, else None (worker thread)"""
+        # Check if already in database
+        if self._is_tracked(address):
+            print(f"   ⚠️  Already tracked: {address[:10]}...")
+            return None
+        
+        whale_data = self.qualify_as_whale(address)
+        if whale_data and whale_data['qualified']:
+            return whale_data
+        print(f"   ❌ Not qualified: {address[:10]}...")
+        return None
+    
+    def _iter_qualified(self, candidates: Set[str]) -> Iterator[Dict]:
+        """Qualified candidates as they're found: RPC-prefetched ones first, the rest from
+        the worker pool. Closing the iterator cancels the queued lookups."""
+        prefetched = self.prefetch_balances(list(candidates))
+        for address, (balance_wei, tx_count) in prefetched.items():
+            if self._is_tracked(address):
+                continue
+            whale_data = self._qualification(address, balance_wei, tx_count)
+            if whale_data:
+                yield whale_data
+            else:
+                print(f"   ❌ Not qualified: {address[:10]}...")
+        
+        remaining = [a for a in candidates if a not in prefetched]
+        if not remaining:
+            return
+        with ThreadPoolExecutor(max_workers=QUALIFY_WORKERS) as executor:
+            futures = [executor.submit(self._check_candidate, address) for address in remaining]
+            try:
+                for future in as_completed(futures):
+                    whale_data = future.result()
+                    if whale_data:
+                        yield whale_data
+            finally:
+                for f in futures:
+                    f.cancel()
+    
     def discover_and_save_whales(self, max_discoveries: int = 50) -> int:
         """
         Full discovery pipeline: find, qualify, and save new whales
@@ -283,26 +561,24 @@ class WhaleDiscoveryService:
         all_candidates = set(transfer_candidates) | set(token_candidates)
         print(f"📊 Total unique candidates: {len(all_candidates)}")
         
-        # Phase 3: Qualify candidates
+        # Phase 3: Qualify candidates concurrently; saves stay on this thread
         print("📊 Phase 3: Qualifying candidates...")
         qualified_count = 0
+        self._load_known_addresses()
+        if self._known is not None:
+            # Drop tracked addresses up front so they never take a worker slot
+            tracked = {a for a in all_candidates if a.lower() in self._known}
+            all_candidates -= tracked
+            if tracked:
+                print(f"   Skipping {len(tracked)} already-tracked addresses")
         
-        for i, address in enumerate(all_candidates):
-            if qualified_count >= max_discoveries:
-                break
-            
-            print(f"   Checking {i+1}/{len(all_candidates)}: {address[:10]}...")
-            
-            # Check if already in database
-            existing = whale_repository.get_whale_by_address(address)
-            if existing:
-                print(f"   ⚠️  Already tracked")
-                continue
-            
-            # Qualify as whale
-            whale_data = self.qualify_as_whale(address)
-            
-            if whale_data and whale_data['qualified']:
+        eoas = self._filter_out_contracts(list(all_candidates))
+        if len(eoas) < len(all_candidates):
+            print(f"   Skipping {len(all_candidates) - len(eoas)} contract addresses")
+            all_candidates = set(eoas)
+        
+        with closing(self._iter_qualified(all_candidates)) as qualified:
+            for whale_data in qualified:
                 # Save to database
                 success = whale_repository.save_whale(
                     address=whale_data['address'],
@@ -314,12 +590,15 @@ class WhaleDiscoveryService:
                 
                 if success:
                     qualified_count += 1
-                    print(f"   ✅ Qualified! Balance: {whale_data['balance_eth']:.2f} ETH")
-            else:
-                print(f"   ❌ Not qualified")
-            
-            # Rate limiting
-            time.sleep(0.3)
+                    if self._known is not None:
+                        self._known.add(whale_data['address'].lower())
+                    print(f"   ✅ Qualified {whale_data['address'][:10]}... Balance: {whale_data['balance_eth']:.2f} ETH")
+                    if qualified_count >= max_discoveries:
+                        break
+        
+        # The whale list reads top_whales_mv; make new whales visible without waiting for a full scan
+        if qualified_count:
+            whale_repository.refresh_top_whales()
         
         print(f"\n✅ Discovery complete: {qualified_count} new whales added")
         return qualified_count
@@ -6,12 +6,18 @@ Enhanced background scanning service for whale address monitoring
 
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from ..data.whale_repository import whale_repository
 from .whale_service import WhaleService
 from .roi_service import ROIService
 
+# Concurrent balance fetches; WhaleService's limiter keeps them under Etherscan's cap
+SCAN_WORKERS = 5
+# Whales buffered per bulk upsert
+SAVE_BATCH_SIZE = 100
+
 class WhaleScannerService:
     """Background service for scanning whale addresses"""
     
@@ -21,6 +27,8 @@ class WhaleScannerService:
         self.whale_repo = whale_repository
         self.is_running = False
         self.scan_thread = None
+        # Set on stop so the scan thread wakes immediately instead of finishing its wait
+        self._stop_event = threading.Event()
         self.last_scan_time = None
         self.scan_interval_hours = 1  # Default: scan every hour
         
@@ -36,48 +44,65 @@ class WhaleScannerService:
         failed_scans = 0
         total_eth = 0
         
-        for i, address in enumerate(addresses):
-            try:
-                print(f"📊 Scanning {i+1}/{len(addresses)}: {address[:10]}...")
+        # Fetch whale info (fresh balances) concurrently; results come back in input order
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+            fetched = executor.map(self._fetch_whale_info, addresses)
+            results = list(zip(addresses, fetched))
+        
+        # Buffer rows and write them with one upsert per SAVE_BATCH_SIZE addresses
+        pending: List[Dict] = []
+        
+        def flush():
+            nonlocal successful_scans, failed_scans, total_eth
+            if not pending:
+                return
+            saved = self.whale_repo.save_whales_bulk(pending)
+            roi_scores = {}
+            for r in pending:
+                if r['address'].lower() not in saved:
+                    failed_scans += 1
+                    continue
+                successful_scans += 1
+                total_eth += r['balance_eth']
                 
-                # Get whale info with fresh balance data
-                whale_info = self.whale_service.get_whale_info(address)
+                # Generate ROI score if service is available
+                if self.roi_service:
+                    try:
+                        roi_data = self.roi_service.calculate_roi_score(r['address'])
+                        if roi_data:
+                            roi_scores[r['address']] = roi_data
+                    except Exception as e:
+                        print(f"⚠️  ROI calculation failed for {r['address']}: {e}")
+            if roi_scores:
+                self.whale_repo.save_roi_scores_bulk(roi_scores)
+            pending.clear()
+        
+        for address, (whale_info, error) in results:
+            try:
+                if error is not None:
+                    raise error
                 
                 if whale_info and whale_info.get('balance_eth', 0) > 0:
-                    # Save to database
-                    success = self.whale_repo.save_whale(
-                        address=whale_info['address'],
-                        label=whale_info['display_name'],
-                        balance_eth=whale_info['balance_eth'],
-                        entity_type=whale_info.get('entity_type'),
-                        category=whale_info.get('category')
-                    )
-                    
-                    if success:
-                        successful_scans += 1
-                        total_eth += whale_info['balance_eth']
-                        
-                        # Generate ROI score if service is available
-                        if self.roi_service:
-                            try:
-                                roi_data = self.roi_service.calculate_roi_score(address)
-                                if roi_data:
-                                    self.whale_repo.save_roi_score(address, **roi_data)
-                            except Exception as e:
-                                print(f"⚠️  ROI calculation failed for {address}: {e}")
-                    else:
-                        failed_scans += 1
+                    pending.append({
+                        'address': whale_info['address'],
+                        'label': whale_info['display_name'],
+                        'balance_eth': whale_info['balance_eth'],
+                        'entity_type': whale_info.get('entity_type'),
+                        'category': whale_info.get('category')
+                    })
+                    if len(pending) >= SAVE_BATCH_SIZE:
+                        flush()
                 else:
                     failed_scans += 1
                     print(f"⚠️  No balance data for {address}")
-                
-                # Rate limiting - Etherscan allows 5 req/sec
-                if i < len(addresses) - 1:
-                    time.sleep(0.25)  # 4 requests per second to be safe
                     
             except Exception as e:
                 failed_scans += 1
                 print(f"❌ Error scanning {address}: {e}")
+        flush()
+        # One view refresh per batch covers both the whale and ROI upserts
+        if successful_scans:
+            self.whale_repo.refresh_top_whales()
         
         scan_duration = time.time() - start_time
         
@@ -90,6 +115,14 @@ class WhaleScannerService:
             'scan_duration_seconds': scan_duration
         }
     
+    def _fetch_whale_info(self, address: str):
+        """(whale_info, error) for one address (worker thread)"""
+        print(f"📊 Scanning {address[:10]}...")
+        try:
+            return self.whale_service.get_whale_info(address), None
+        except Exception as e:
+            return None, e
+    
     def run_full_scan(self) -> Dict:
         """Run a full scan of all whale addresses"""
         print(f"\n🐋 Full whale scan starting at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -130,16 +163,13 @@ class WhaleScannerService:
                 sleep_seconds = self.scan_interval_hours * 3600
                 print(f"😴 Next scan in {self.scan_interval_hours} hour(s)")
                 
-                # Sleep in small intervals to allow for clean shutdown
-                slept = 0
-                while slept < sleep_seconds and self.is_running:
-                    time.sleep(60)  # Sleep 1 minute at a time
-                    slept += 60
+                # Blocks until the interval elapses or stop_background_scanning sets the event
+                self._stop_event.wait(timeout=sleep_seconds)
                     
             except Exception as e:
                 print(f"❌ Background scan error: {e}")
-                # Sleep for 5 minutes before retry
-                time.sleep(300)
+                # Wait 5 minutes before retry
+                self._stop_event.wait(timeout=300)
     
     def start_background_scanning(self, interval_hours: int = 1):
         """Start background scanning with specified interval"""
@@ -149,6 +179,7 @@ class WhaleScannerService:
         
         self.scan_interval_hours = interval_hours
         self.is_running = True
+        self._stop_event.clear()
         
         # Start background thread
         self.scan_thread = threading.Thread(target=self.run_background_scan, daemon=True)
@@ -164,6 +195,7 @@ class WhaleScannerService:
         
         print("🛑 Stopping background whale scanner...")
         self.is_running = False
+        self._stop_event.set()
         
         if self.scan_thread and self.scan_thread.is_alive():
             self.scan_thread.join(timeout=5)
@@ -7,7 +7,10 @@ Business service for whale scanning and management
 import requests
 import time
 from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import config
+from ..utils.rate_limiter import etherscan_limiter, get_with_backoff
 
 class WhaleService:
     """Enhanced whale scanner with modular architecture"""
@@ -16,6 +19,16 @@ class WhaleService:
         self.etherscan_key = config.ETHERSCAN_API_KEY
         from ..data.whale_repository import whale_repository
         self.whale_repo = whale_repository
+        # Process-wide Etherscan bucket, also drawn on by discovery services and scanner workers
+        self._etherscan_limiter = etherscan_limiter
+        # Pooled keep-alive connections for get_balance; 429 is left out of the adapter's retries
+        # so get_with_backoff paces every resend through the limiter
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(
+            pool_connections=10, pool_maxsize=20,
+            max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504],
+                              raise_on_status=False)
+        ))
     
     @property
     def whale_addresses(self) -> List[str]:
@@ -37,7 +50,7 @@ class WhaleService:
             return {}
         
         try:
-            whale = self.whale_repo.get_whale_by_address(address)
+            whale = self.whale_repo.get_whale_by_address(address, columns='label,entity_type,category')
             if whale:
                 return {
                     'name': whale.get('label', ''),
@@ -93,7 +106,7 @@ class WhaleService:
                 'apikey': self.etherscan_key
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = get_with_backoff(self._session, url, params, limiter=self._etherscan_limiter)
             
             if response.status_code == 200:
                 data = response.json()
@@ -199,10 +212,6 @@ class WhaleService:
             
             whale_info = self.get_whale_info(address)
             whales.append(whale_info)
-            
-            # Rate limiting
-            if i < len(addresses) - 1:
-                time.sleep(0.3)
         
         return whales
     
@@ -236,8 +245,7 @@ class WhaleService:
             return False
         
         try:
-            whale = self.whale_repo.get_whale_by_address(address)
-            return whale is not None
+            return self.whale_repo.whale_exists(address)
         except Exception as e:
             print(f"Error checking if {address} is whale: {e}")
             return False
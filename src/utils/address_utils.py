@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Address helpers
+Normalize addresses once at entry points so internals can compare and key on them directly
+"""
+
+import re
+import sys
+from typing import NewType, Optional
+
+# A lowercase, interned 0x-prefixed 20-byte hex address
+Address = NewType('Address', str)
+
+_ADDRESS_RE = re.compile(r'0x[0-9a-f]{40}')
+
+
+def normalize_address(address: str) -> Address:
+    """Lowercase (only if needed), validate and intern an address.
+
+    Interning makes repeated addresses share one string, so dict/set lookups
+    keyed on them hit the identity fast path. Raises ValueError on malformed input.
+    """
+    if not address.islower():
+        address = address.lower()
+    if not _ADDRESS_RE.fullmatch(address):
+        raise ValueError(f"Invalid address: {address!r}")
+    return Address(sys.intern(address))
+
+
+def try_normalize_address(address) -> Optional[Address]:
+    """normalize_address for bulk inputs: None instead of raising, so one bad entry
+    doesn't abort the batch."""
+    if not isinstance(address, str):
+        return None
+    try:
+        return normalize_address(address)
+    except ValueError:
+        return None
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Logging helpers
+Rate-limited loggers for error paths that can fire inside hot loops
+"""
+
+import logging
+import threading
+import time
+
+
+class RateLimitingFilter(logging.Filter):
+    """Drop repeats of the same message template beyond max_per_sec per second."""
+
+    def __init__(self, max_per_sec: int = 5):
+        super().__init__()
+        self.max_per_sec = max_per_sec
+        self._windows = {}  # (logger, template) -> (window_start, count)
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            start, count = self._windows.get(key, (now, 0))
+            if now - start >= 1.0:
+                start, count = now, 0
+            self._windows[key] = (start, count + 1)
+            return count < self.max_per_sec
+
+
+def get_rate_limited_logger(name: str, max_per_sec: int = 5) -> logging.Logger:
+    """Return a module logger with a RateLimitingFilter attached (once)."""
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, RateLimitingFilter) for f in logger.filters):
+        logger.addFilter(RateLimitingFilter(max_per_sec=max_per_sec))
+    return logger
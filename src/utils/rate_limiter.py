@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Rate limiting helpers
+Thread-safe token bucket for pacing calls to rate-capped APIs (e.g. Etherscan)
+"""
+
+import random
+import threading
+import time
+
+from config import config
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per `per` seconds, with bursts up to `rate`."""
+
+    def __init__(self, rate: float, per: float = 1.0):
+        self.rate = max(float(rate), 1e-9)
+        self.per = per
+        self._tokens = self.rate
+        self._updated = time.monotonic()
+        self._slow_until = 0.0
+        self._slow_factor = 1.0
+        self._lock = threading.Lock()
+
+    def slow_down(self, factor: float = 2.0, duration: float = 60.0):
+        """Divide the refill rate by `factor` for the next `duration` seconds (e.g. after a 429)."""
+        with self._lock:
+            self._slow_factor = max(factor, 1.0)
+            self._slow_until = time.monotonic() + duration
+            self._tokens = min(self._tokens, 0.0)
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                rate = self.rate / self._slow_factor if now < self._slow_until else self.rate
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.per / rate
+            time.sleep(wait)
+
+
+# One bucket for every Etherscan caller in the process: they all spend the same API key's quota
+etherscan_limiter = RateLimiter(getattr(config, 'ETHERSCAN_RPS', 4))
+
+
+def _rate_limited(response) -> bool:
+    """HTTP 429, or Etherscan's 200 with a 'Max rate limit reached' result."""
+    if response.status_code == 429:
+        return True
+    if response.status_code != 200:
+        return False
+    try:
+        result = response.json().get('result')
+    except (ValueError, AttributeError):
+        return False
+    return isinstance(result, str) and 'rate limit' in result.lower()
+
+
+def get_with_backoff(http, url: str, params: dict = None, limiter: RateLimiter = None,
+                     timeout: float = 10, retries: int = 5, base_delay: float = 0.5,
+                     max_delay: float = 30.0, **kwargs):
+    """GET through `http` (requests or a Session), retrying only when rate limited.
+
+    Each attempt takes a limiter token. A rate-limited reply sleeps Retry-After when
+    given, else base_delay * 2**attempt plus jitter (capped at max_delay), and slows
+    the limiter. Returns the last response.
+    """
+    for attempt in range(retries + 1):
+        if limiter:
+            limiter.acquire()
+        response = http.get(url, params=params, timeout=timeout, **kwargs)
+        if attempt == retries or not _rate_limited(response):
+            return response
+        if limiter:
+            limiter.slow_down()
+        retry_after = response.headers.get('Retry-After')
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = base_delay * 2 ** attempt + random.uniform(0, base_delay)
+        time.sleep(min(delay, max_delay))
+    return response
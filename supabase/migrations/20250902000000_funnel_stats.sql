@@ -0,0 +1,16 @@
+-- Candidate funnel counts in one pass over smart_money_candidates
+-- Backs SmartMoneyRepository.get_candidate_funnel_stats (replaces three count queries)
+
+create or replace function public.funnel_stats()
+returns table (total bigint, scored bigint, watchlist bigint)
+language sql
+stable
+as $$
+  select
+    count(*) as total,
+    count(*) filter (where status = 'scored') as scored,
+    count(*) filter (where status = 'watchlist') as watchlist
+  from public.smart_money_candidates;
+$$;
+
+create index if not exists idx_candidates_status on public.smart_money_candidates (status);
@@ -0,0 +1,17 @@
+-- Distinct recently active traders, newest first
+-- Backs SmartMoneyRepository.get_recent_traders (dedup happens server-side)
+
+create or replace function public.recent_traders(hours_back integer, lim integer)
+returns table (address text)
+language sql
+stable
+as $$
+  select lower(d.address)::text as address
+  from public.dex_interactions d
+  where d.timestamp >= now() - make_interval(hours => hours_back)
+  group by lower(d.address)
+  order by max(d.timestamp) desc
+  limit lim;
+$$;
+
+create index if not exists idx_dex_interactions_ts_address on public.dex_interactions (timestamp desc, address);
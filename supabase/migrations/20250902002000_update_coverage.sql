@@ -0,0 +1,35 @@
+-- Recompute pricing coverage for one address in a single statement
+-- Backs SmartMoneyRepository.update_coverage_for_address (replaces count + count + upsert)
+
+create or replace function public.update_coverage(p_address text, p_days integer default 90)
+returns table (priced_trades_count integer, coverage_pct numeric, total_swaps integer)
+language sql
+volatile
+as $$
+  with p as (
+    select count(*)::int as n
+    from public.priced_trades
+    where address = lower(p_address)
+      and block_ts >= now() - make_interval(days => p_days)
+  ), s as (
+    select count(*)::int as n
+    from public.dex_interactions
+    where address = lower(p_address)
+      and timestamp >= now() - make_interval(days => p_days)
+  ), upserted as (
+    insert into public.smart_money_candidates as cand (address, priced_trades_count, coverage_pct, last_priced_at)
+    select
+      lower(p_address),
+      p.n,
+      case when s.n > 0 then round(least(100.0, 100.0 * p.n / s.n), 2) else 0 end,
+      now()
+    from p, s
+    on conflict (address) do update set
+      priced_trades_count = excluded.priced_trades_count,
+      coverage_pct = excluded.coverage_pct,
+      last_priced_at = excluded.last_priced_at
+    returning cand.priced_trades_count, cand.coverage_pct
+  )
+  select u.priced_trades_count, u.coverage_pct, s.n
+  from upserted u, s;
+$$;
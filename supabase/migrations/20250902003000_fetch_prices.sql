@@ -0,0 +1,15 @@
+-- Bulk token price lookup by (address, ts_bucket) pairs
+-- pairs: jsonb array of {"address": "...", "ts_bucket": "<iso8601>"}
+-- Returns the requested ts_bucket text unchanged so callers can key results.
+
+create or replace function public.fetch_prices(pairs jsonb)
+returns table (address text, ts_bucket text, usd numeric)
+language sql
+stable
+as $$
+  select tp.address, q.ts_bucket, tp.usd
+  from jsonb_to_recordset(pairs) as q(address text, ts_bucket text)
+  join public.token_prices tp
+    on tp.address = lower(q.address)
+   and tp.ts_bucket = q.ts_bucket::timestamptz;
+$$;
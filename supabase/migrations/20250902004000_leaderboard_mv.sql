@@ -0,0 +1,38 @@
+-- Smart money leaderboard materialized view
+-- Pre-joins candidates + activity + 90d metrics + labels so the API reads one indexed relation.
+-- Refreshed in the background via refresh_leaderboard_mv(); never on the read path.
+
+create materialized view if not exists public.smart_money_leaderboard_mv as
+select
+  c.address,
+  coalesce(c.status, 'candidate') as status,
+  coalesce(a.dex_swap_count, c.dex_swaps_90d, 0) as dex_swaps_90d,
+  a.unique_protocols as unique_protocols_90d,
+  a.last_activity_at,
+  a.total_gas_spent_eth,
+  coalesce(m.sharpe_90d, c.sharpe_ratio) as sharpe_ratio,
+  coalesce(m.win_rate, c.win_rate) as win_rate,
+  m.pnl_usd_90d,
+  c.volume_90d_usd,
+  c.coverage_pct,
+  c.priced_trades_count,
+  c.qualifies_smart_money,
+  case when w.label like '%.eth%' then w.label else e.ens end as ens
+from public.smart_money_candidates c
+left join public.address_activity a on a.address = c.address
+left join public.trader_metrics m on m.address = c.address and m.metrics_window = '90d'
+left join public.whales w on w.address = c.address
+left join public.ens_cache e on e.address = c.address;
+
+-- Unique index is required for REFRESH ... CONCURRENTLY
+create unique index if not exists uq_leaderboard_mv_address on public.smart_money_leaderboard_mv (address);
+create index if not exists idx_leaderboard_mv_qualifies_sharpe on public.smart_money_leaderboard_mv (qualifies_smart_money, sharpe_ratio desc);
+create index if not exists idx_leaderboard_mv_swaps on public.smart_money_leaderboard_mv (dex_swaps_90d desc);
+
+create or replace function public.refresh_leaderboard_mv()
+returns void
+language sql
+security definer
+as $$
+  refresh materialized view concurrently public.smart_money_leaderboard_mv;
+$$;
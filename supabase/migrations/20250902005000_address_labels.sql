@@ -0,0 +1,10 @@
+-- Unified label lookup: whale labels + cached ENS names in one relation
+-- Lets leaderboard/watchlist assemble the ens column with a single in_() query.
+
+create or replace view public.address_labels as
+select
+  coalesce(w.address, e.address) as address,
+  w.label,
+  e.ens
+from public.whales w
+full outer join public.ens_cache e on e.address = w.address;
@@ -0,0 +1,74 @@
+-- Resolve ENS display names once in address_labels instead of per leaderboard row
+-- ens_name keeps whale labels that end in .eth (checked at the view, not per read) and
+-- otherwise falls back to the cached ENS. The leaderboard view and sm_leaderboard()
+-- are recreated on top of it.
+
+create or replace view public.address_labels as
+select
+  coalesce(w.address, e.address) as address,
+  w.label,
+  e.ens,
+  coalesce(case when lower(w.label) like '%.eth' then lower(w.label) end, e.ens) as ens_name
+from public.whales w
+full outer join public.ens_cache e on e.address = w.address;
+
+drop materialized view if exists public.smart_money_leaderboard_mv cascade;
+
+create materialized view public.smart_money_leaderboard_mv as
+select
+  c.address,
+  coalesce(c.status, 'candidate') as status,
+  coalesce(a.dex_swap_count, c.dex_swaps_90d, 0) as dex_swaps_90d,
+  a.unique_protocols as unique_protocols_90d,
+  a.last_activity_at,
+  a.total_gas_spent_eth,
+  coalesce(m.sharpe_90d, c.sharpe_ratio) as sharpe_ratio,
+  coalesce(m.win_rate, c.win_rate) as win_rate,
+  m.pnl_usd_90d,
+  c.volume_90d_usd,
+  c.coverage_pct,
+  c.priced_trades_count,
+  c.confidence_score,
+  c.qualifies_smart_money,
+  c.last_evaluated_at,
+  l.ens_name as ens
+from public.smart_money_candidates c
+left join public.address_activity a on a.address = c.address
+left join public.trader_metrics m on m.address = c.address and m.metrics_window = '90d'
+left join public.address_labels l on l.address = c.address;
+
+create unique index if not exists uq_leaderboard_mv_address on public.smart_money_leaderboard_mv (address);
+create index if not exists idx_leaderboard_mv_qualifies_sharpe
+  on public.smart_money_leaderboard_mv (qualifies_smart_money, sharpe_ratio desc nulls last);
+create index if not exists idx_leaderboard_mv_qualifies_swaps
+  on public.smart_money_leaderboard_mv (qualifies_smart_money, dex_swaps_90d desc, last_activity_at desc);
+
+create or replace function public.sm_leaderboard(
+  p_limit integer default 50,
+  p_sort text default 'auto',
+  p_min_swaps integer default 0,
+  p_active_since timestamptz default null,
+  p_qualified_only boolean default false,
+  p_min_coverage numeric default null,
+  p_min_priced integer default null
+)
+returns setof public.smart_money_leaderboard_mv
+language sql
+stable
+as $$
+  select v.*
+  from public.smart_money_leaderboard_mv v
+  where v.dex_swaps_90d >= p_min_swaps
+    and (p_active_since is null or v.last_activity_at is null or v.last_activity_at >= p_active_since)
+    and (not p_qualified_only or v.qualifies_smart_money)
+    and (p_min_coverage is null or v.coverage_pct >= p_min_coverage)
+    and (p_min_priced is null or v.priced_trades_count >= p_min_priced)
+  order by
+    case when p_sort in ('sharpe', 'auto') then v.sharpe_ratio end desc nulls last,
+    case when p_sort = 'pnl' then v.pnl_usd_90d end desc nulls last,
+    case when p_sort = 'win_rate' then v.win_rate end desc nulls last,
+    case when p_sort = 'last_activity' then v.last_activity_at end desc nulls last,
+    v.dex_swaps_90d desc,
+    v.last_activity_at desc nulls last
+  limit p_limit;
+$$;
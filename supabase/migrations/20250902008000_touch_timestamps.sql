@@ -0,0 +1,43 @@
+-- Server-side write timestamps
+-- Column defaults only apply on insert, so upserts that hit ON CONFLICT DO UPDATE
+-- need a BEFORE UPDATE trigger to bump the timestamp. Lets the app omit the field.
+
+create or replace function public.touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+create or replace function public.touch_fetched_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.fetched_at := now();
+  return new;
+end;
+$$;
+
+drop trigger if exists trg_address_activity_touch on public.address_activity;
+create trigger trg_address_activity_touch
+  before update on public.address_activity
+  for each row execute function public.touch_updated_at();
+
+drop trigger if exists trg_trader_metrics_touch on public.trader_metrics;
+create trigger trg_trader_metrics_touch
+  before update on public.trader_metrics
+  for each row execute function public.touch_updated_at();
+
+drop trigger if exists trg_tx_receipts_cache_touch on public.tx_receipts_cache;
+create trigger trg_tx_receipts_cache_touch
+  before update on public.tx_receipts_cache
+  for each row execute function public.touch_fetched_at();
+
+drop trigger if exists trg_token_prices_touch on public.token_prices;
+create trigger trg_token_prices_touch
+  before update on public.token_prices
+  for each row execute function public.touch_fetched_at();
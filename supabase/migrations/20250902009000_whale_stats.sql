@@ -0,0 +1,13 @@
+-- Whale dashboard stats in one round trip
+-- Replaces counting + fetching every whale_roi_scores.composite_score into the app.
+
+create or replace function public.get_whale_stats()
+returns table (total_whales bigint, whales_with_roi bigint, avg_roi_score numeric)
+language sql
+stable
+as $$
+  select
+    (select count(*) from public.whales),
+    (select count(*) from public.whale_roi_scores),
+    (select coalesce(avg(composite_score), 0) from public.whale_roi_scores where composite_score is not null);
+$$;
@@ -0,0 +1,45 @@
+-- Recompute pricing coverage for many addresses in a single statement
+-- Set-based counterpart of update_coverage(); backs MetricsService.compute_for_addresses
+
+create or replace function public.update_coverage_bulk(p_addresses text[], p_days integer default 90)
+returns table (address text, priced_trades_count integer, coverage_pct numeric, total_swaps integer)
+language sql
+volatile
+as $$
+  with a as (
+    select distinct lower(x) as address from unnest(p_addresses) as x
+  ), p as (
+    select pt.address, count(*)::int as n
+    from public.priced_trades pt
+    join a on a.address = pt.address
+    where pt.block_ts >= now() - make_interval(days => p_days)
+    group by pt.address
+  ), s as (
+    select di.address::text as address, count(*)::int as n
+    from public.dex_interactions di
+    join a on a.address = di.address
+    where di.timestamp >= now() - make_interval(days => p_days)
+    group by di.address
+  ), c as (
+    select a.address, coalesce(p.n, 0) as priced, coalesce(s.n, 0) as swaps
+    from a
+    left join p on p.address = a.address
+    left join s on s.address = a.address
+  ), upserted as (
+    insert into public.smart_money_candidates as cand (address, priced_trades_count, coverage_pct, last_priced_at)
+    select
+      c.address,
+      c.priced,
+      case when c.swaps > 0 then round(least(100.0, 100.0 * c.priced / c.swaps), 2) else 0 end,
+      now()
+    from c
+    on conflict (address) do update set
+      priced_trades_count = excluded.priced_trades_count,
+      coverage_pct = excluded.coverage_pct,
+      last_priced_at = excluded.last_priced_at
+    returning cand.address, cand.priced_trades_count, cand.coverage_pct
+  )
+  select u.address::text, u.priced_trades_count, u.coverage_pct, c.swaps
+  from upserted u
+  join c on c.address = u.address;
+$$;
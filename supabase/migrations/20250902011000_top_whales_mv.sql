@@ -0,0 +1,34 @@
+-- Top whales with their ROI score pre-joined
+-- Replaces the per-request whales -> whale_roi_scores embed in get_top_whales.
+-- Refreshed via refresh_top_whales_mv() after whale scans.
+
+create materialized view if not exists public.top_whales_mv as
+select
+  w.id,
+  w.address,
+  w.label,
+  w.balance_eth,
+  w.balance_usd,
+  w.entity_type,
+  w.category,
+  w.last_updated_at,
+  r.composite_score,
+  r.total_trades,
+  r.avg_roi_percent,
+  r.win_rate_percent,
+  r.total_volume_usd,
+  r.sharpe_ratio
+from public.whales w
+left join public.whale_roi_scores r on r.whale_address = w.address;
+
+create unique index if not exists uq_top_whales_mv_address on public.top_whales_mv (address);
+create index if not exists idx_top_whales_mv_balance on public.top_whales_mv (balance_eth desc);
+create index if not exists idx_top_whales_mv_composite on public.top_whales_mv (composite_score desc);
+
+create or replace function public.refresh_top_whales_mv()
+returns void
+language sql
+security definer
+as $$
+  refresh materialized view concurrently public.top_whales_mv;
+$$;
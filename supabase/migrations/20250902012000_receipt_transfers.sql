@@ -0,0 +1,13 @@
+-- Decoded ERC-20 Transfer logs per cached receipt
+-- Written once when a receipt is first priced so re-pricing reads these rows
+-- instead of re-parsing tx_receipts_cache.logs_json. Addresses are lowercase.
+
+create table if not exists public.receipt_transfers (
+  tx_hash text not null references public.tx_receipts_cache (tx_hash) on delete cascade,
+  log_index integer not null, -- position in logs_json
+  token text not null,
+  from_addr text not null,
+  to_addr text not null,
+  amount_wei numeric(78, 0) not null,
+  primary key (tx_hash, log_index)
+);
@@ -0,0 +1,5 @@
+-- Native ETH value of the cached transaction
+-- Stored with the receipt so ETH legs can be priced without an
+-- eth_getTransactionByHash call on re-runs. Null for rows cached before this.
+
+alter table public.tx_receipts_cache add column if not exists value_wei numeric(78, 0);
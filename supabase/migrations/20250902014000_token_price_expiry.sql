@@ -0,0 +1,21 @@
+-- Tiered freshness for cached token prices
+-- Prices for recent (live) hour buckets expire quickly; historical buckets keep
+-- expires_at null and are cached indefinitely. Readers skip expired rows.
+
+alter table public.token_prices add column if not exists expires_at timestamptz;
+
+-- Return type changes, so drop before recreating
+drop function if exists public.fetch_prices(jsonb);
+
+create or replace function public.fetch_prices(pairs jsonb)
+returns table (address text, ts_bucket text, usd numeric, expires_at timestamptz)
+language sql
+stable
+as $$
+  select tp.address, q.ts_bucket, tp.usd, tp.expires_at
+  from jsonb_to_recordset(pairs) as q(address text, ts_bucket text)
+  join public.token_prices tp
+    on tp.address = lower(q.address)
+   and tp.ts_bucket = q.ts_bucket::timestamptz
+  where tp.expires_at is null or tp.expires_at > now();
+$$;
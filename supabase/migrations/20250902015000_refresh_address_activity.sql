@@ -0,0 +1,44 @@
+-- Keep address_activity aggregates current from the dex_interactions write path
+-- Recomputes the rolling window for just the addresses that were written, so
+-- get_activity_metrics can serve a single indexed row instead of aggregating in Python
+
+create index if not exists idx_dex_interactions_address_ts on public.dex_interactions (address, timestamp desc);
+
+create or replace function public.refresh_address_activity(p_addresses text[], p_days integer default 90)
+returns integer
+language sql
+volatile
+as $$
+  with a as (
+    select distinct lower(x) as address from unnest(p_addresses) as x
+  ), agg as (
+    select
+      a.address,
+      count(di.tx_hash)::int as swaps,
+      count(distinct di.router_address)::int as protocols,
+      coalesce(sum(di.gas_spent_eth), 0) as gas,
+      min(di.timestamp) as first_seen,
+      max(di.timestamp) as last_seen
+    from a
+    left join public.dex_interactions di
+      on di.address = a.address
+     and di.timestamp >= now() - make_interval(days => p_days)
+    group by a.address
+  ), upserted as (
+    insert into public.address_activity as act (
+      address, dex_swap_count, unique_protocols, total_gas_spent_eth,
+      first_seen_at, last_activity_at, updated_at
+    )
+    select address, swaps, protocols, gas, first_seen, last_seen, now()
+    from agg
+    on conflict (address) do update set
+      dex_swap_count = excluded.dex_swap_count,
+      unique_protocols = excluded.unique_protocols,
+      total_gas_spent_eth = excluded.total_gas_spent_eth,
+      first_seen_at = excluded.first_seen_at,
+      last_activity_at = excluded.last_activity_at,
+      updated_at = excluded.updated_at
+    returning 1
+  )
+  select count(*)::int from upserted;
+$$;
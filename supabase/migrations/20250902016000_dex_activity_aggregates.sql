@@ -0,0 +1,25 @@
+-- Rolling-window DEX activity aggregates computed in the database
+-- Backs get_activity_metrics' recompute path so it no longer pulls every interaction row;
+-- uses idx_dex_interactions_address_ts (address, timestamp desc)
+
+create or replace function public.dex_activity_aggregates(p_address text, p_days integer default 90)
+returns table (
+  dex_swap_count integer,
+  unique_protocols integer,
+  total_gas_spent_eth numeric,
+  first_seen_at timestamp,
+  last_activity_at timestamp
+)
+language sql
+stable
+as $$
+  select
+    count(*)::int,
+    count(distinct di.router_address)::int,
+    coalesce(sum(di.gas_spent_eth), 0),
+    min(di.timestamp),
+    max(di.timestamp)
+  from public.dex_interactions di
+  where di.address = lower(p_address)
+    and di.timestamp >= now() - make_interval(days => p_days);
+$$;
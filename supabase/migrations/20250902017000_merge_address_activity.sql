@@ -0,0 +1,36 @@
+-- Merge one discovery run's in-memory candidate aggregates into address_activity
+-- Used when per-tx interaction logging is disabled (SMART_MONEY_LOG_INTERACTIONS=0):
+-- counts and gas add up, first/last activity widen, protocols keep the larger count
+
+create or replace function public.merge_address_activity(p_rows jsonb)
+returns integer
+language sql
+volatile
+as $$
+  with r as (
+    select
+      lower(x->>'address') as address,
+      coalesce((x->>'dex_swaps')::int, 0) as swaps,
+      coalesce((x->>'protocols')::int, 0) as protocols,
+      coalesce((x->>'gas_eth')::numeric, 0) as gas,
+      to_timestamp(nullif((x->>'first_ts')::bigint, 0)) at time zone 'utc' as first_seen,
+      to_timestamp(nullif((x->>'last_ts')::bigint, 0)) at time zone 'utc' as last_seen
+    from jsonb_array_elements(p_rows) as x
+  ), upserted as (
+    insert into public.address_activity as act (
+      address, dex_swap_count, unique_protocols, total_gas_spent_eth,
+      first_seen_at, last_activity_at, updated_at
+    )
+    select address, swaps, protocols, gas, first_seen, last_seen, now()
+    from r
+    on conflict (address) do update set
+      dex_swap_count = coalesce(act.dex_swap_count, 0) + excluded.dex_swap_count,
+      unique_protocols = greatest(act.unique_protocols, excluded.unique_protocols),
+      total_gas_spent_eth = coalesce(act.total_gas_spent_eth, 0) + excluded.total_gas_spent_eth,
+      first_seen_at = least(act.first_seen_at, excluded.first_seen_at),
+      last_activity_at = greatest(act.last_activity_at, excluded.last_activity_at),
+      updated_at = excluded.updated_at
+    returning 1
+  )
+  select count(*)::int from upserted;
+$$;
@@ -0,0 +1,21 @@
+-- Qualified-candidate counts under the strict/loose gate presets in one pass
+-- Backs the admin DB stats endpoint (replaces three count queries)
+
+create or replace function public.candidate_gate_counts(
+  strict_trades integer,
+  strict_cov numeric,
+  loose_trades integer,
+  loose_cov numeric
+)
+returns table (qualified_strict bigint, qualified_loose bigint, watchlist_strict bigint)
+language sql
+stable
+as $$
+  select
+    count(*) filter (where priced_trades_count >= strict_trades and coverage_pct >= strict_cov),
+    count(*) filter (where priced_trades_count >= loose_trades and coverage_pct >= loose_cov),
+    count(*) filter (where qualifies_smart_money
+                       and priced_trades_count >= strict_trades and coverage_pct >= strict_cov)
+  from public.smart_money_candidates
+  where priced_trades_count >= least(strict_trades, loose_trades);
+$$;
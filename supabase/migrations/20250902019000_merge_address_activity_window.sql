@@ -0,0 +1,51 @@
+-- Keep merged address_activity counts inside the activity window
+-- Callers now only send txs newer than the stored last_activity_at, so merges add each tx
+-- once. Without per-tx rows nothing can age out of the window, so a row whose window
+-- started more than p_days ago restarts from the merged values instead of adding to them.
+
+drop function if exists public.merge_address_activity(jsonb);
+
+create or replace function public.merge_address_activity(p_rows jsonb, p_days integer default 90)
+returns integer
+language sql
+volatile
+as $$
+  with r as (
+    select
+      lower(x->>'address') as address,
+      coalesce((x->>'dex_swaps')::int, 0) as swaps,
+      coalesce((x->>'protocols')::int, 0) as protocols,
+      coalesce((x->>'gas_eth')::numeric, 0) as gas,
+      to_timestamp(nullif((x->>'first_ts')::bigint, 0)) at time zone 'utc' as first_seen,
+      to_timestamp(nullif((x->>'last_ts')::bigint, 0)) at time zone 'utc' as last_seen
+    from jsonb_array_elements(p_rows) as x
+  ), upserted as (
+    insert into public.address_activity as act (
+      address, dex_swap_count, unique_protocols, total_gas_spent_eth,
+      first_seen_at, last_activity_at, updated_at
+    )
+    select address, swaps, protocols, gas, first_seen, last_seen, now()
+    from r
+    on conflict (address) do update set
+      dex_swap_count = case when act.first_seen_at is null
+                              or act.first_seen_at < now() - make_interval(days => p_days)
+                            then excluded.dex_swap_count
+                            else coalesce(act.dex_swap_count, 0) + excluded.dex_swap_count end,
+      unique_protocols = case when act.first_seen_at is null
+                                or act.first_seen_at < now() - make_interval(days => p_days)
+                              then excluded.unique_protocols
+                              else greatest(act.unique_protocols, excluded.unique_protocols) end,
+      total_gas_spent_eth = case when act.first_seen_at is null
+                                   or act.first_seen_at < now() - make_interval(days => p_days)
+                                 then excluded.total_gas_spent_eth
+                                 else coalesce(act.total_gas_spent_eth, 0) + excluded.total_gas_spent_eth end,
+      first_seen_at = case when act.first_seen_at is null
+                             or act.first_seen_at < now() - make_interval(days => p_days)
+                           then excluded.first_seen_at
+                           else least(act.first_seen_at, excluded.first_seen_at) end,
+      last_activity_at = greatest(act.last_activity_at, excluded.last_activity_at),
+      updated_at = excluded.updated_at
+    returning 1
+  )
+  select count(*)::int from upserted;
+$$;
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized per-trade stats behind trader_metrics.
+Expected values are worked out by hand from the cumulative net series.
+"""
+
+import math
+import unittest
+
+import numpy as np
+
+
+CASES = [
+    # (name, per-trade net USD, pnl, win_rate, sharpe, max_dd)
+    ('no trades', [], 0.0, 0.0, 0.0, 0.0),
+    ('single win', [50.0], 50.0, 1.0, 0.0, 0.0),
+    # Peak starts at 0, so a lone loss is a drawdown
+    ('single loss', [-20.0], -20.0, 0.0, 0.0, 20.0),
+    # mean -20, sample std 10; cum -10, -30, -60 under a 0 peak
+    ('all negative', [-10.0, -20.0, -30.0], -60.0, 0.0, -2.0, 60.0),
+    # cum 100, 70, 20, 60, -20 -> peak 100, trough -20; deviations from mean -4
+    # square-sum to 21320, so sample std is sqrt(5330)
+    ('drawdown from running peak', [100.0, -30.0, -50.0, 40.0, -80.0],
+     -20.0, 0.4, -4.0 / math.sqrt(5330.0), 120.0),
+    # cum -10, 20, 15 -> the early dip below 0 (10) beats the later one (5);
+    # mean 5, squared deviations 950 -> sample std sqrt(475)
+    ('drawdown before first gain', [-10.0, 30.0, -5.0],
+     15.0, 1.0 / 3.0, 5.0 / math.sqrt(475.0), 10.0),
+    ('zero variance', [5.0, 5.0], 10.0, 1.0, 0.0, 0.0),
+]
+
+
+class TestTradeStats(unittest.TestCase):
+    def setUp(self):
+        from src.services.metrics_service import _trade_stats
+        self.trade_stats = _trade_stats
+
+    def test_cases(self):
+        for name, nets, pnl, win_rate, sharpe, max_dd in CASES:
+            with self.subTest(name):
+                stats = self.trade_stats(np.array(nets, dtype=np.float64))
+                self.assertAlmostEqual(stats['pnl'], pnl)
+                self.assertAlmostEqual(stats['win_rate'], win_rate)
+                self.assertAlmostEqual(stats['sharpe'], sharpe)
+                self.assertAlmostEqual(stats['max_dd'], max_dd)
+                for value in stats.values():
+                    self.assertIsInstance(value, float)
+
+
+class TestInvalidAddresses(unittest.TestCase):
+    def test_malformed_address_is_skipped_without_touching_the_repo(self):
+        from src.services.metrics_service import MetricsService
+        service = MetricsService.__new__(MetricsService)
+        service.repo = None  # any repo access would raise
+        self.assertEqual(service.compute_for_address('not-an-address'), {})
+        self.assertEqual(service.compute_for_addresses(['0x123', None]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
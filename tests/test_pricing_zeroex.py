@@ -29,6 +29,10 @@ class FakeRepo:
         # emulate success
         return True
 
+    def queue_token_price(self, token: str, bucket_iso: str, price: float, source: str = '', ttl_sec=None):
+        self.upserts.append((token, bucket_iso, float(price), source))
+        return 0
+
 
 class TestZeroExPricing(unittest.TestCase):
     def setUp(self):
@@ -54,7 +58,7 @@ class TestZeroExPricing(unittest.TestCase):
         # Arrange: preload cache for ETH
         self.repo.cache[('eth', self.bucket_iso)] = 123.45
 
-        with patch('requests.get') as mock_get:
+        with patch.object(self.service._http, 'get') as mock_get:
             # Act
             price = self.service._get_token_price_usd('eth', self.ts_iso)
 
@@ -66,9 +70,9 @@ class TestZeroExPricing(unittest.TestCase):
         # Arrange
         fake_resp = MagicMock()
         fake_resp.status_code = 200
-        fake_resp.json.return_value = {'price': '345.67'}
+        fake_resp.content = b'{"price": "345.67"}'
 
-        with patch('requests.get') as mock_get:
+        with patch.object(self.service._http, 'get') as mock_get:
             mock_get.return_value = fake_resp
 
             # Act
@@ -101,9 +105,9 @@ class TestZeroExPricing(unittest.TestCase):
         link = '0x514910771af9ca656af840dff83e8264ecf986ca'
         fake_resp = MagicMock()
         fake_resp.status_code = 200
-        fake_resp.json.return_value = {'price': '12.34'}
+        fake_resp.content = b'{"price": "12.34"}'
 
-        with patch('requests.get') as mock_get:
+        with patch.object(self.service._http, 'get') as mock_get:
             mock_get.return_value = fake_resp
 
             price = self.service._get_token_price_usd(link, self.ts_iso)
@@ -118,7 +122,7 @@ class TestZeroExPricing(unittest.TestCase):
         # Recreate service with network disabled
         config.SMART_MONEY_DISABLE_NETWORK = True
         self.service = self.mod.PricingService()
-        with patch('requests.get') as mock_get:
+        with patch.object(self.service._http, 'get') as mock_get:
             price = self.service._get_token_price_usd('eth', self.ts_iso)
             self.assertIsNone(price)
             self.assertFalse(mock_get.called)
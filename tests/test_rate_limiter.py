@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the token-bucket RateLimiter and get_with_backoff.
+Time is faked (monotonic/sleep patched); HTTP goes through a fake session.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from src.utils import rate_limiter as rl
+
+
+class FakeClock:
+    """Stands in for time.monotonic/time.sleep: sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body if body is not None else {'status': '1', 'result': 'ok'}
+        self.headers = headers or {}
+
+    def json(self):
+        if isinstance(self._body, Exception):
+            raise self._body
+        return self._body
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        self.calls.append((url, params, timeout))
+        return self.responses.pop(0)
+
+
+RATE_LIMIT_BODY = {'status': '0', 'message': 'NOTOK', 'result': 'Max rate limit reached'}
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch.multiple(rl.time, monotonic=self.clock.monotonic, sleep=self.clock.sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_up_to_rate_then_waits_for_refill(self):
+        limiter = rl.RateLimiter(4)
+        for _ in range(4):
+            limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+        limiter.acquire()
+        self.assertEqual(len(self.clock.sleeps), 1)
+        self.assertAlmostEqual(self.clock.sleeps[0], 0.25)
+
+    def test_refill_is_capped_at_rate(self):
+        limiter = rl.RateLimiter(2)
+        self.clock.now += 60  # long idle must not bank more than `rate` tokens
+        for _ in range(2):
+            limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+        limiter.acquire()
+        self.assertAlmostEqual(self.clock.sleeps[0], 0.5)
+
+    def test_slow_down_divides_rate_for_duration(self):
+        limiter = rl.RateLimiter(4)
+        limiter.slow_down(factor=2.0, duration=10.0)
+        limiter.acquire()
+        # Bucket was emptied; at 2/s the next token takes 0.5s
+        self.assertAlmostEqual(sum(self.clock.sleeps), 0.5)
+
+        self.clock.now += 10.0  # window over: back to 4/s
+        self.clock.sleeps.clear()
+        for _ in range(4):
+            limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+        limiter.acquire()
+        self.assertAlmostEqual(self.clock.sleeps[0], 0.25)
+
+
+class TestGetWithBackoff(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch.multiple(rl.time, monotonic=self.clock.monotonic, sleep=self.clock.sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        jitter = patch.object(rl.random, 'uniform', return_value=0.0)
+        jitter.start()
+        self.addCleanup(jitter.stop)
+
+    def test_success_returns_without_sleeping(self):
+        session = FakeSession([FakeResponse()])
+        resp = rl.get_with_backoff(session, 'u', {'a': 1}, timeout=7)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(session.calls, [('u', {'a': 1}, 7)])
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_honors_retry_after_on_429(self):
+        session = FakeSession([FakeResponse(429, headers={'Retry-After': '3'}), FakeResponse()])
+        resp = rl.get_with_backoff(session, 'u')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.clock.sleeps, [3.0])
+
+    def test_etherscan_rate_limit_body_backs_off_exponentially(self):
+        session = FakeSession([FakeResponse(body=RATE_LIMIT_BODY)] * 2 + [FakeResponse()])
+        resp = rl.get_with_backoff(session, 'u', base_delay=0.5)
+        self.assertEqual(resp.json()['result'], 'ok')
+        self.assertEqual(self.clock.sleeps, [0.5, 1.0])
+
+    def test_other_errors_are_not_retried(self):
+        for resp in (FakeResponse(500), FakeResponse(body={'status': '0', 'result': 'Invalid address'}),
+                     FakeResponse(body=ValueError('not json'))):
+            session = FakeSession([resp])
+            self.assertIs(rl.get_with_backoff(session, 'u'), resp)
+            self.assertEqual(len(session.calls), 1)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_final_attempt_returns_rate_limited_response_without_sleeping(self):
+        responses = [FakeResponse(429) for _ in range(3)]
+        session = FakeSession(responses)
+        resp = rl.get_with_backoff(session, 'u', retries=2, base_delay=1.0)
+        self.assertIs(resp, responses[-1])
+        self.assertEqual(len(session.calls), 3)
+        self.assertEqual(self.clock.sleeps, [1.0, 2.0])
+
+    def test_delay_is_capped(self):
+        session = FakeSession([FakeResponse(429, headers={'Retry-After': '600'}), FakeResponse()])
+        rl.get_with_backoff(session, 'u', max_delay=30.0)
+        self.assertEqual(self.clock.sleeps, [30.0])
+
+    def test_each_attempt_takes_a_token_and_rate_limit_slows_limiter(self):
+        limiter = rl.RateLimiter(64)
+        session = FakeSession([FakeResponse(429, headers={'Retry-After': '0'}), FakeResponse()])
+        with patch.object(limiter, 'acquire', wraps=limiter.acquire) as acquire, \
+                patch.object(limiter, 'slow_down', wraps=limiter.slow_down) as slow_down:
+            rl.get_with_backoff(session, 'u', limiter=limiter)
+        self.assertEqual(acquire.call_count, 2)
+        self.assertEqual(slow_down.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
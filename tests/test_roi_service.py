@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests that the per-whale and batch ROI scorers draw from the same profiles.
+"""
+
+import random
+import unittest
+
+from src.services.roi_service import ROIService, _ROI_PROFILES, _whale_kind
+
+
+WHALES = [
+    # (entity_type, balance_eth, expected _ROI_PROFILES row)
+    ('Centralized Exchange', 150000.0, 0),
+    ('DeFi Protocol', 20000.0, 1),
+    ('Protocol Treasury', 80000.0, 1),
+    ('Individual', 60000.0, 2),
+    ('Unknown', 12000.0, 3),
+]
+DRAWS = 200
+
+
+class TestROIProfiles(unittest.TestCase):
+    def setUp(self):
+        self.service = ROIService()
+
+    def assert_in_profile(self, scores, kind, balance):
+        roi_lo, roi_hi, volume_multiplier, consistency_lo, consistency_hi = _ROI_PROFILES[kind].tolist()
+        self.assertGreaterEqual(scores['avg_roi_percent'], roi_lo)
+        self.assertLessEqual(scores['avg_roi_percent'], roi_hi)
+        self.assertGreaterEqual(scores['win_rate_percent'], consistency_lo)
+        self.assertLessEqual(scores['win_rate_percent'], consistency_hi)
+        self.assertAlmostEqual(scores['total_volume_usd'], round(balance * volume_multiplier * 2000, 2))
+        self.assertGreaterEqual(scores['total_trades'], 10)
+        self.assertLessEqual(scores['total_trades'], max(10, int(balance // 100) + 50))
+        self.assertGreaterEqual(scores['risk_score'], 30)
+        self.assertLessEqual(scores['risk_score'], 80)
+        self.assertGreaterEqual(scores['efficiency_score'], 60)
+        self.assertLessEqual(scores['efficiency_score'], 90)
+        self.assertGreaterEqual(scores['sharpe_ratio'], 0.5)
+        self.assertLessEqual(scores['sharpe_ratio'], 2.5)
+        self.assertGreaterEqual(scores['max_drawdown_percent'], 5)
+        self.assertLessEqual(scores['max_drawdown_percent'], 30)
+
+    def test_whale_kind(self):
+        for entity_type, balance, kind in WHALES:
+            with self.subTest(entity_type):
+                self.assertEqual(_whale_kind(entity_type, balance), kind)
+
+    def test_single_and_batch_share_ranges(self):
+        rng = random.Random(7)
+        batch_input = [
+            {'address': f'0x{i}', 'entity_type': entity_type, 'balance_eth': balance}
+            for i, (entity_type, balance, _) in enumerate(WHALES * DRAWS)
+        ]
+        batch = self.service.calculate_batch_roi_scores(batch_input)
+        self.assertEqual(len(batch), len(batch_input))
+
+        for whale, (_, _, kind) in zip(batch_input, WHALES * DRAWS):
+            single = self.service.calculate_whale_roi(
+                whale['address'], whale['balance_eth'], whale['entity_type'], 'test', rng=rng
+            )
+            batched = batch[whale['address']]
+            self.assertEqual(set(single), set(batched))
+            self.assert_in_profile(single, kind, whale['balance_eth'])
+            self.assert_in_profile(batched, kind, whale['balance_eth'])
+
+    def test_batch_returns_plain_python_types(self):
+        scores = self.service.calculate_batch_roi_scores(
+            [{'address': '0xa', 'entity_type': 'Unknown', 'balance_eth': 1000}]
+        )['0xa']
+        self.assertIsInstance(scores['total_trades'], int)
+        self.assertIsInstance(scores['composite_score'], float)
+
+
+if __name__ == '__main__':
+    unittest.main()
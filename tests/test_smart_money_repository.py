@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Tests for the repository's batched write paths (_UpsertBuffer, _BackgroundWriter)
+and the columnar priced-trades readers.
+The Supabase client is stubbed; it only records upserts.
+"""
+
+import threading
+import unittest
+from unittest.mock import patch
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.call = None
+
+    def upsert(self, rows, on_conflict=None, returning=None):
+        self.call = (self.table, list(rows), on_conflict, returning)
+        return self
+
+    def execute(self):
+        if self.client.fail:
+            raise RuntimeError('boom')
+        with self.client.lock:
+            self.client.upserts.append(self.call)
+        return self
+
+
+class FakeClient:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.upserts = []
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+class TestUpsertBuffer(unittest.TestCase):
+    def setUp(self):
+        from src.data import smart_money_repository as mod
+        self.mod = mod
+        self.client = FakeClient()
+        self.clock = FakeClock()
+        patcher = patch.object(mod.time, 'monotonic', self.clock.monotonic)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rows_dedupe_on_conflict_key(self):
+        buf = self.mod._UpsertBuffer(self.client, 'token_prices', 'address,ts_bucket', max_age_sec=60)
+        buf.add({'address': '0xa', 'ts_bucket': 't1', 'price_usd': 1.0})
+        buf.add({'address': '0xa', 'ts_bucket': 't2', 'price_usd': 2.0})
+        buf.add({'address': '0xa', 'ts_bucket': 't1', 'price_usd': 3.0})
+
+        self.assertEqual(buf.flush(), 2)
+        table, rows, on_conflict, returning = self.client.upserts[0]
+        self.assertEqual((table, on_conflict, returning), ('token_prices', 'address,ts_bucket', 'minimal'))
+        # Last write per key wins
+        self.assertEqual(sorted((r['ts_bucket'], r['price_usd']) for r in rows), [('t1', 3.0), ('t2', 2.0)])
+
+    def test_flushes_when_full(self):
+        buf = self.mod._UpsertBuffer(self.client, 'priced_trades', 'tx_hash', max_rows=3, max_age_sec=60)
+        self.assertEqual(buf.add({'tx_hash': '0x1'}), 0)
+        self.assertEqual(buf.add({'tx_hash': '0x2'}), 0)
+        self.assertEqual(self.client.upserts, [])
+        self.assertEqual(buf.add({'tx_hash': '0x3'}), 3)
+        self.assertEqual(len(self.client.upserts), 1)
+        self.assertEqual(buf.flush(), 0)
+
+    def test_flushes_when_oldest_row_is_stale(self):
+        buf = self.mod._UpsertBuffer(self.client, 'priced_trades', 'tx_hash', max_rows=100, max_age_sec=5.0)
+        self.assertEqual(buf.add({'tx_hash': '0x1'}), 0)
+        self.clock.now += 4.9
+        self.assertEqual(buf.add({'tx_hash': '0x2'}), 0)
+        self.clock.now += 0.1
+        self.assertEqual(buf.add({'tx_hash': '0x3'}), 3)
+
+        # Age is measured from the first row after a flush, not the first ever
+        self.clock.now += 10.0
+        self.assertEqual(buf.add({'tx_hash': '0x4'}), 0)
+
+    def test_failed_flush_reports_zero(self):
+        client = FakeClient(fail=True)
+        buf = self.mod._UpsertBuffer(client, 'priced_trades', 'tx_hash', max_age_sec=60)
+        buf.add({'tx_hash': '0x1'})
+        self.assertEqual(buf.flush(), 0)
+        self.assertEqual(client.upserts, [])
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    def setUp(self):
+        from src.data import smart_money_repository as mod
+        self.mod = mod
+        self.client = FakeClient()
+        self.exit_hooks = []
+        patcher = patch.object(mod.atexit, 'register', self.exit_hooks.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_write_groups_by_table_and_dedupes_keys(self):
+        writer = self.mod._BackgroundWriter(self.client)
+        writer._write([
+            ('address_activity', 'address', {'address': '0xa', 'dex_swaps_90d': 1}),
+            ('address_activity', 'address', {'address': '0xb', 'dex_swaps_90d': 1}),
+            ('address_activity', 'address', {'address': '0xa', 'dex_swaps_90d': 2}),
+            ('tx_receipts_cache', 'tx_hash', {'tx_hash': '0x1'}),
+        ])
+        by_table = {table: (rows, key) for table, rows, key, _ in self.client.upserts}
+        rows, key = by_table['address_activity']
+        self.assertEqual(key, 'address')
+        self.assertEqual(sorted((r['address'], r['dex_swaps_90d']) for r in rows), [('0xa', 2), ('0xb', 1)])
+        self.assertEqual(by_table['tx_receipts_cache'], ([{'tx_hash': '0x1'}], 'tx_hash'))
+
+    def test_exit_hook_drains_pending_rows_in_batches(self):
+        writer = self.mod._BackgroundWriter(self.client, batch_size=2)
+        gate = threading.Event()
+        real_write = writer._write
+
+        def gated_write(batch):
+            gate.wait(5)
+            real_write(batch)
+
+        writer._write = gated_write
+        for i in range(5):
+            writer.put('address_activity', 'address', {'address': f'0x{i}'})
+
+        # Worker starts once and registers a single exit hook
+        self.assertEqual(len(self.exit_hooks), 1)
+        gate.set()
+        self.exit_hooks[0]()
+
+        written = [r['address'] for _, rows, _, _ in self.client.upserts for r in rows]
+        self.assertEqual(sorted(written), [f'0x{i}' for i in range(5)])
+        self.assertTrue(all(len(rows) <= 2 for _, rows, _, _ in self.client.upserts))
+
+    def test_write_errors_do_not_stop_the_worker(self):
+        client = FakeClient(fail=True)
+        writer = self.mod._BackgroundWriter(client)
+        writer.put('address_activity', 'address', {'address': '0xa'})
+        self.exit_hooks[0]()
+        client.fail = False
+        writer.put('address_activity', 'address', {'address': '0xb'})
+        self.exit_hooks[0]()
+        self.assertEqual([rows for _, rows, _, _ in client.upserts], [[{'address': '0xb'}]])
+
+    def test_rows_missing_conflict_key_are_skipped(self):
+        writer = self.mod._BackgroundWriter(self.client)
+        writer.put('address_activity', 'address', {'dex_swaps_90d': 1})
+        writer.put('address_activity', 'address', {'address': '0xa'})
+        self.exit_hooks[0]()
+        self.assertEqual([rows for _, rows, _, _ in self.client.upserts], [[{'address': '0xa'}]])
+
+    def test_failed_batch_still_settles_the_queue(self):
+        writer = self.mod._BackgroundWriter(self.client)
+        calls = []
+
+        def broken_write(batch):
+            calls.append(len(batch))
+            raise RuntimeError('boom')
+
+        writer._write = broken_write
+        writer.put('address_activity', 'address', {'address': '0xa'})
+        self.exit_hooks[0]()
+        # The worker survives and keeps draining
+        writer.put('address_activity', 'address', {'address': '0xb'})
+        self.exit_hooks[0]()
+        self.assertEqual(calls, [1, 1])
+
+
+class TestPricedTradesArrays(unittest.TestCase):
+    TRADES = [
+        {'address': '0xa', 'usd_in': 100.0, 'usd_out': 40.0, 'block_ts': '2025-01-02T00:00:00+00:00'},
+        {'address': '0xa', 'usd_in': None, 'usd_out': None, 'block_ts': '2025-01-01T12:00:00+00:00'},
+        {'address': '0xa', 'usd_in': None, 'usd_out': 25.0, 'block_ts': '2025-01-01T00:00:00+00:00'},
+    ]
+
+    def setUp(self):
+        from src.data import smart_money_repository as mod
+        self.repo = mod.SmartMoneyRepository.__new__(mod.SmartMoneyRepository)
+
+    def test_rows_without_either_leg_are_not_counted(self):
+        self.repo.get_priced_trades_for_address = lambda address, days=90: list(self.TRADES)
+        usd_in, usd_out, block_ts = self.repo.get_priced_trades_arrays('0xa')
+        self.assertEqual(usd_in.tolist(), [100.0, 0.0])
+        self.assertEqual(usd_out.tolist(), [40.0, 25.0])
+        self.assertEqual(block_ts.size, 2)
+
+    def test_bulk_skips_rows_without_either_leg(self):
+        self.repo._select_in = lambda *args, **kwargs: list(self.TRADES)
+        usd_in, usd_out = self.repo.get_priced_trades_arrays_bulk(['0xa'])['0xa']
+        self.assertEqual(usd_in.tolist(), [100.0, 0.0])
+        self.assertEqual(usd_out.tolist(), [40.0, 25.0])
+
+
+if __name__ == '__main__':
+    unittest.main()